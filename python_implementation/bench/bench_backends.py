@@ -0,0 +1,37 @@
+"""
+Checks every decoder backend against the trie walker on every encoding the config
+allows and on the example binaries, and prints how their throughput compares.
+
+    python -m python_implementation.bench.bench_backends
+"""
+
+from pathlib import Path
+
+from python_implementation.src.backends import (
+    BACKENDS,
+    REFERENCE_BACKEND,
+    DifferentialRunner,
+)
+from python_implementation.src.base.config_loader import (
+    get_parsable_instructions_from_config,
+)
+from python_implementation.src.vectorized import np
+
+EXAMPLE_BINARIES = Path(__file__).parent / ".." / ".." / "example_asm" / "assembled"
+
+
+def main():
+    parsable_instructions = get_parsable_instructions_from_config()
+    binaries = [(p.name, p.read_bytes()) for p in sorted(EXAMPLE_BINARIES.iterdir())]
+    for backend in BACKENDS:
+        if backend == REFERENCE_BACKEND or (backend == "vectorized" and np is None):
+            continue
+        runner = DifferentialRunner(parsable_instructions, backend)
+        print(f"== {backend}, every encoding")
+        print(runner.run_encodings())
+        print(f"== {backend}, example binaries")
+        print(runner.run(binaries))
+
+
+if __name__ == "__main__":
+    main()
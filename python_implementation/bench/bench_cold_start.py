@@ -0,0 +1,82 @@
+"""
+Wall time of a fresh process that disassembles a tiny file, from the generated frozen
+tables and from the json config.
+
+    python -m python_implementation.bench.bench_cold_start
+
+Fails (exit code 1) when the frozen tables path takes over COLD_START_BUDGET of the
+time of the fastest json config path. The paths are timed in turns, so load on the
+machine slows them all alike. Bytecode caching is forced on, since that is what the
+frozen tables rely on.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+COLD_START_BUDGET = 0.98
+TINY_BINARY = "b'\\x89\\xd9'"
+
+SCRIPTS = {
+    "bare interpreter": "pass",
+    "frozen tables": f"""
+from python_implementation.src.frozen_tables import FrozenDisassembler
+str(FrozenDisassembler.load().decode({TINY_BINARY}))
+""",
+    "json config": f"""
+from python_implementation.src.disassembler import Disassembler
+str(Disassembler.from_config().decode({TINY_BINARY}))
+""",
+    "json parse_binary": f"""
+from python_implementation.src.base.config_loader import (
+    get_parsable_instructions_from_config,
+)
+from python_implementation.src.parser import parse_binary
+str(parse_binary(get_parsable_instructions_from_config(), {TINY_BINARY}))
+""",
+}
+JSON_PATHS = ("json config", "json parse_binary")
+
+
+def measure_cold_start(
+    runs: int, env: dict[str, str] | None = None
+) -> dict[str, float]:
+    """:returns: Median wall time in ms of each of SCRIPTS"""
+    env = {
+        k: v
+        for k, v in (os.environ if env is None else env).items()
+        if k != "PYTHONDONTWRITEBYTECODE"
+    }
+    timings: dict[str, list[float]] = {name: [] for name in SCRIPTS}
+    # the first round warms the bytecode and frozen table caches and is not counted
+    for round_ind in range(runs + 1):
+        for name, script in SCRIPTS.items():
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", script], env=env, check=True)
+            if round_ind:
+                timings[name].append((time.perf_counter() - start) * 1000)
+    return {name: statistics.median(times) for name, times in timings.items()}
+
+
+def budget_ms(medians: dict[str, float]) -> float:
+    return COLD_START_BUDGET * min(medians[name] for name in JSON_PATHS)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--runs", type=int, default=10)
+    args = arg_parser.parse_args()
+
+    medians = measure_cold_start(args.runs)
+    for name, median in medians.items():
+        print(f"{name:<18} {median:7.1f} ms")
+    print(f"budget for the frozen tables {budget_ms(medians):.1f} ms")
+    if medians["frozen tables"] > budget_ms(medians):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Round trip latency of the disassembly daemon for a small binary, over one persistent
+connection, against decoding in process.
+
+    python -m python_implementation.bench.bench_daemon
+"""
+
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from python_implementation.src.daemon import DisassemblyClient, DisassemblyServer
+from python_implementation.src.disassembler import Disassembler
+
+EXAMPLE_BINARIES = Path(__file__).parent / ".." / ".." / "example_asm" / "assembled"
+
+
+def percentiles_us(timings: list[float]) -> str:
+    quantiles = statistics.quantiles(timings, n=100)
+    return (
+        f"median {statistics.median(timings) * 1e6:8.1f} us  "
+        f"p99 {quantiles[98] * 1e6:8.1f} us"
+    )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--requests", type=int, default=2000)
+    args = arg_parser.parse_args()
+
+    disassembler = Disassembler.from_config()
+    binary = (EXAMPLE_BINARIES / "listing_0039_more_movs").read_bytes()
+    in_process = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        str(disassembler.decode(binary))
+        in_process.append(time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        socket_path = str(Path(temp_dir) / "disasm.sock")
+        with DisassemblyServer(socket_path, disassembler) as server:
+            server_thread = threading.Thread(target=server.serve_forever)
+            server_thread.start()
+            round_trips = []
+            with DisassemblyClient(socket_path) as client:
+                client.disassemble(binary)
+                for _ in range(args.requests):
+                    start = time.perf_counter()
+                    client.disassemble(binary)
+                    round_trips.append(time.perf_counter() - start)
+            server.shutdown()
+            server_thread.join()
+
+    print(f"{len(binary)} byte binary, {args.requests} requests")
+    print(f"in process  {percentiles_us(in_process)}")
+    print(f"daemon      {percentiles_us(round_trips)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Setup plus first decode of a small binary with every opcode built up front, and with
+only the opcodes the binary uses built lazily. Prints the per group build cost.
+
+    python -m python_implementation.bench.bench_lazy
+"""
+
+import time
+from pathlib import Path
+
+from python_implementation.src.base.config_loader import (
+    get_parsable_instructions_from_config,
+)
+from python_implementation.src.compact_trie import CompactTrie
+from python_implementation.src.lazy_decoder import LazyDecoder
+
+EXAMPLE_BINARIES = Path(__file__).parent / ".." / ".." / "example_asm" / "assembled"
+
+
+def main():
+    parsable_instructions = get_parsable_instructions_from_config()
+    binary = (EXAMPLE_BINARIES / "listing_0039_more_movs").read_bytes()
+
+    start = time.perf_counter()
+    CompactTrie.from_parsable_instructions(parsable_instructions).decode(binary)
+    eager_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    lazy = LazyDecoder(parsable_instructions)
+    lazy.decode(binary)
+    lazy_ms = (time.perf_counter() - start) * 1000
+
+    print(lazy.build_report())
+    print(f"eager {eager_ms:7.3f} ms, lazy {lazy_ms:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Decode time of a workload with the decoder specialized for its profile, against the
+same decoder without a profile and the other backends, and the cost of recording the
+profile.
+
+    python -m python_implementation.bench.bench_profile_guided
+
+Fails (exit code 1) when the specialized decoder is not faster than the unprofiled one.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from python_implementation.src.backends import create_backend
+from python_implementation.src.base.config_loader import (
+    get_parsable_instructions_from_config,
+    get_schemas_hash,
+)
+from python_implementation.src.profile_guided import (
+    DecodeProfile,
+    ProfilingBackend,
+    SpecializedDecoder,
+)
+
+EXAMPLE_BINARIES = Path(__file__).parent / ".." / ".." / "example_asm" / "assembled"
+
+
+def time_decode(backend, workload: bytes, runs: int) -> float:
+    """:returns: Median ms of a full decode"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for _ in backend.iter_decode(workload):
+            pass
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--runs", type=int, default=5)
+    arg_parser.add_argument("--repeat", type=int, default=200)
+    args = arg_parser.parse_args()
+
+    parsable_instructions = get_parsable_instructions_from_config()
+    workload = (
+        b"".join(p.read_bytes() for p in sorted(EXAMPLE_BINARIES.iterdir()))
+        * args.repeat
+    )
+    profile = DecodeProfile(get_schemas_hash(parsable_instructions))
+    profiling = ProfilingBackend(parsable_instructions, profile)
+    profiling_ms = time_decode(profiling, workload, 1)
+
+    timings = {
+        "trie": time_decode(
+            create_backend("trie", parsable_instructions), workload, args.runs
+        ),
+        "opcode_table": time_decode(
+            create_backend("opcode_table", parsable_instructions), workload, args.runs
+        ),
+        "unprofiled": time_decode(
+            SpecializedDecoder(parsable_instructions, None), workload, args.runs
+        ),
+        "specialized": time_decode(
+            SpecializedDecoder(parsable_instructions, profile), workload, args.runs
+        ),
+    }
+    print(f"{len(workload)} bytes, {profile.counts.total()} instructions")
+    print(f"{'profiling':<14} {profiling_ms:8.1f} ms (one decode, recorded)")
+    for name, ms in timings.items():
+        speedup = timings["unprofiled"] / ms
+        print(f"{name:<14} {ms:8.1f} ms, {speedup:.2f}x the unprofiled throughput")
+    if timings["specialized"] >= timings["unprofiled"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Thread scaling of `Disassembler.decode_batch`.
+
+    python -m python_implementation.bench.bench_threads
+
+Near linear speedup is only expected on a free-threaded (no GIL) build, e.g. python3.13t.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from python_implementation.src.disassembler import Disassembler
+
+EXAMPLE_BINARY = (
+    Path(__file__).parent / ".." / ".." / "example_asm" / "assembled" / "listing_0039_more_movs"
+)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--inputs", type=int, default=64)
+    arg_parser.add_argument("--repeat", type=int, default=200)
+    arg_parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = arg_parser.parse_args()
+
+    disassembler = Disassembler.from_config()
+    binary = EXAMPLE_BINARY.read_bytes() * args.repeat
+    inputs = [binary] * args.inputs
+    gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"python {sys.version.split()[0]}, GIL enabled: {gil_enabled}")
+
+    baseline = None
+    for num_threads in args.threads:
+        start = time.perf_counter()
+        disassembler.decode_batch(inputs, max_workers=num_threads)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(
+            f"threads={num_threads:<3} {elapsed:8.3f}s "
+            f"{len(binary) * len(inputs) / elapsed / 1e6:6.2f} MB/s "
+            f"speedup={baseline / elapsed:5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Node count, build time and decode throughput of the object trie and the compact trie.
+
+    python -m python_implementation.bench.bench_trie
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from python_implementation.src.base.config_loader import (
+    get_parsable_instructions_from_config,
+)
+from python_implementation.src.compact_trie import CompactTrie
+from python_implementation.src.parser import parse_binary_with_trie
+from python_implementation.src.trie import Node, Trie
+
+EXAMPLE_BINARIES = Path(__file__).parent / ".." / ".." / "example_asm" / "assembled"
+
+
+def count_nodes(node: Node | None) -> int:
+    if node is None:
+        return 0
+    return 1 + sum(count_nodes(child) for child in node.children)
+
+
+def best_of_ms(fn, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--repeat", type=int, default=200)
+    arg_parser.add_argument("--runs", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    parsable_instructions = get_parsable_instructions_from_config()
+    binary = (EXAMPLE_BINARIES / "listing_0039_more_movs").read_bytes() * args.repeat
+    trie = Trie.from_parsable_instructions(parsable_instructions)
+    compact = CompactTrie.from_parsable_instructions(parsable_instructions)
+
+    for name, num_nodes, build, decode in (
+        (
+            "object trie ",
+            count_nodes(trie.dummy_head),
+            lambda: Trie.from_parsable_instructions(parsable_instructions),
+            lambda: parse_binary_with_trie(trie, binary),
+        ),
+        (
+            "compact trie",
+            len(compact),
+            lambda: CompactTrie.from_parsable_instructions(parsable_instructions),
+            lambda: compact.decode(binary),
+        ),
+    ):
+        build_ms = best_of_ms(build, args.runs)
+        decode_s = best_of_ms(decode, 3) / 1000
+        print(
+            f"{name} nodes={num_nodes:<4} build={build_ms:6.3f} ms "
+            f"decode={len(binary) / decode_s / 1e6:6.3f} MB/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
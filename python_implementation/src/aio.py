@@ -0,0 +1,82 @@
+import asyncio
+import itertools
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import Executor
+from pathlib import Path
+
+from python_implementation.src.compressed_io import read_file
+from python_implementation.src.disassembled import (
+    DisassembledInstruction,
+    Disassembly,
+)
+from python_implementation.src.disassembler import Disassembler
+
+
+def _take(instructions: Iterator[DisassembledInstruction], count: int):
+    return list(itertools.islice(instructions, count))
+
+
+class AsyncDisassembler:
+    """
+    asyncio front end for a `Disassembler`.
+
+    File reads and decoding run in `executor` (the loop's default executor when None),
+    which must be thread based since a decode is resumed across several submissions.
+    Decoding happens `batch_size` instructions at a time so large inputs hand control
+    back to the loop between batches and stop promptly when cancelled.
+    At most `max_concurrency` batches are decoded at once. The limit is only held
+    while a batch decodes, so an iterator the caller stops consuming holds nothing.
+    """
+
+    def __init__(
+        self,
+        disassembler: Disassembler,
+        executor: Executor | None = None,
+        max_concurrency: int = 4,
+        batch_size: int = 4096,
+    ) -> None:
+        assert batch_size > 0
+        self.disassembler = disassembler
+        self.executor = executor
+        self.batch_size = batch_size
+        self._limit = asyncio.Semaphore(max_concurrency)
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, fn, *args
+        )
+
+    async def _iter_batches(
+        self, file_contents: bytes
+    ) -> AsyncIterator[list[DisassembledInstruction]]:
+        instructions = self.disassembler.iter_decode(file_contents)
+        while True:
+            async with self._limit:
+                batch = await self._run(_take, instructions, self.batch_size)
+            if not batch:
+                return
+            yield batch
+
+    async def iter_instructions(
+        self, file_contents: bytes
+    ) -> AsyncIterator[DisassembledInstruction]:
+        async for batch in self._iter_batches(file_contents):
+            for instruction in batch:
+                yield instruction
+
+    async def decode_async(self, file_contents: bytes) -> Disassembly:
+        instructions = []
+        async for batch in self._iter_batches(file_contents):
+            instructions.extend(batch)
+        return Disassembly(instructions)
+
+    async def read_file_async(self, path: str | Path) -> bytes:
+        return await self._run(read_file, path)
+
+    async def decode_file_async(self, path: str | Path) -> Disassembly:
+        return await self.decode_async(await self.read_file_async(path))
+
+    async def decode_files_async(self, paths: list[str | Path]) -> list[Disassembly]:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(self.decode_file_async(p)) for p in paths]
+        return [task.result() for task in tasks]
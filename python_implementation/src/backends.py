@@ -0,0 +1,299 @@
+"""
+Interchangeable decoders, and a runner that checks one against another.
+
+Every backend turns bytes into the same unlabelled DisassembledInstructions, so two
+of them can be compared instruction by instruction. The trie walker in parser.py is
+the reference, the others are faster paths that have to agree with it.
+
+enumerate_encodings lists the encodings the config allows: every opcode and ModRM
+byte that matches a schema, followed by the displacement and data bytes that header
+needs. Trailing bytes are filled from a few patterns that cover sign and byte order,
+or with every possible value when exhaustive, which is only practical for schemas
+without many trailing bytes.
+"""
+
+import time
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from dataclasses import dataclass, field
+from itertools import islice, product
+from typing import Protocol
+
+from python_implementation.src.base.schema import InstructionSchema
+from python_implementation.src.columnar import ColumnarDisassembly
+from python_implementation.src.compact_trie import CompactTrie
+from python_implementation.src.disassembled import DisassembledInstruction
+from python_implementation.src.field_plan import FieldPlan
+from python_implementation.src.lazy_decoder import LazyDecoder
+from python_implementation.src.opcode_table import OpcodeTable
+from python_implementation.src.parser import iter_parse_binary
+from python_implementation.src.profile_guided import (
+    ProfilingBackend,
+    SpecializedDecoder,
+)
+from python_implementation.src.trie import Trie
+from python_implementation.src.vectorized import VectorizedDecoder
+
+REFERENCE_BACKEND = "trie"
+# repeated or cut to the number of trailing bytes an encoding needs
+DEFAULT_TRAILING_PATTERNS = (b"\x00", b"\xff", b"\x7f\x80", b"\x80\x7f", b"\x01\x02")
+MAX_ENCODING_SIZE = 6
+
+
+class DecoderBackend(Protocol):
+    """
+    A backend that decodes the whole input before returning any instruction, and so
+    raises without yielding any on undecodable input, says so by having a true
+    decodes_all_at_once attribute
+    """
+
+    def iter_decode(self, file_contents: bytes) -> Iterator[DisassembledInstruction]:
+        """Unlabelled instructions in order, raises on undecodable input"""
+        ...
+
+
+class TrieBackend:
+    def __init__(self, parsable_instructions: list[InstructionSchema]) -> None:
+        self.trie = Trie.from_parsable_instructions(parsable_instructions)
+
+    def iter_decode(self, file_contents: bytes) -> Iterator[DisassembledInstruction]:
+        return iter_parse_binary(self.trie, file_contents)
+
+
+class ColumnarBackend:
+    """Decodes to columns first, with the pure python or the numpy builder"""
+
+    decodes_all_at_once = True
+
+    def __init__(
+        self, parsable_instructions: list[InstructionSchema], vectorized: bool = False
+    ) -> None:
+        self.opcode_table = OpcodeTable.from_parsable_instructions(
+            parsable_instructions
+        )
+        self.vectorized = VectorizedDecoder(self.opcode_table) if vectorized else None
+
+    def iter_decode(self, file_contents: bytes) -> Iterator[DisassembledInstruction]:
+        columnar = (
+            self.vectorized.decode(file_contents)
+            if self.vectorized is not None
+            else ColumnarDisassembly.from_bytes(self.opcode_table, file_contents)
+        )
+        return (columnar.instruction(i) for i in range(len(columnar)))
+
+
+BACKENDS: dict[str, Callable[[list[InstructionSchema]], DecoderBackend]] = {
+    REFERENCE_BACKEND: TrieBackend,
+    "compact_trie": CompactTrie.from_parsable_instructions,
+    "lazy": LazyDecoder,
+    "opcode_table": ColumnarBackend,
+    "vectorized": lambda instructions: ColumnarBackend(instructions, vectorized=True),
+    # start from and specialize for the profile in the user's cache directory, which
+    # only changes when a caller saves the profiling backend's
+    "profiling": ProfilingBackend.from_saved_profile,
+    "specialized": SpecializedDecoder.from_saved_profile,
+}
+
+
+def register_backend(
+    name: str, factory: Callable[[list[InstructionSchema]], DecoderBackend]
+):
+    BACKENDS[name] = factory
+
+
+def create_backend(
+    name: str, parsable_instructions: list[InstructionSchema]
+) -> DecoderBackend:
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown backend {name}, known ones are {', '.join(BACKENDS)}"
+        )
+    return BACKENDS[name](parsable_instructions)
+
+
+def enumerate_encodings(
+    parsable_instructions: list[InstructionSchema],
+    trailing_patterns: Sequence[bytes] = DEFAULT_TRAILING_PATTERNS,
+    exhaustive: bool = False,
+) -> Iterator[bytes]:
+    """
+    Every header the config allows, each with its trailing bytes from every pattern,
+    or every value of them when exhaustive
+    """
+    for schema in parsable_instructions:
+        plan = FieldPlan.from_schema(schema)
+        byte_values = [plan.matching_byte_values(i) for i in range(plan.header_size)]
+        for header in product(*byte_values):
+            num_trailing = len(plan.needed_trailing_fields(plan.extract_header(header)))
+            assert plan.header_size + num_trailing <= MAX_ENCODING_SIZE
+            if exhaustive:
+                trailers = (bytes(t) for t in product(range(256), repeat=num_trailing))
+            elif num_trailing == 0:
+                trailers = iter([b""])
+            else:
+                trailers = (
+                    (pattern * num_trailing)[:num_trailing]
+                    for pattern in trailing_patterns
+                )
+            for trailer in trailers:
+                yield bytes(header) + trailer
+
+
+@dataclass(frozen=True)
+class Divergence:
+    """
+    The first instruction the backends disagree on. An entry is the exception a
+    backend raised there, or None if its output had already ended
+    """
+
+    input_name: str
+    offset: int
+    reference: DisassembledInstruction | Exception | None
+    candidate: DisassembledInstruction | Exception | None
+
+    def __str__(self) -> str:
+        def describe(decoded: DisassembledInstruction | Exception | None) -> str:
+            if decoded is None:
+                return "<end of output>"
+            if isinstance(decoded, Exception):
+                return f"<{type(decoded).__name__}: {decoded}>"
+            return str(decoded)
+
+        return (
+            f"{self.input_name} at offset {self.offset}: "
+            f"reference {describe(self.reference)}, "
+            f"candidate {describe(self.candidate)}"
+        )
+
+
+@dataclass
+class DifferentialReport:
+    reference: str
+    candidate: str
+    inputs: int = 0
+    bytes: int = 0
+    instructions: int = 0
+    reference_seconds: float = 0.0
+    candidate_seconds: float = 0.0
+    divergences: list[Divergence] = field(default_factory=list)
+
+    @property
+    def relative_throughput(self) -> float:
+        """How many times faster the candidate decoded than the reference"""
+        if not self.candidate_seconds:
+            return 0.0
+        return self.reference_seconds / self.candidate_seconds
+
+    def __str__(self) -> str:
+        lines = [
+            f"{self.inputs} inputs, {self.bytes} bytes, {self.instructions} instructions",
+            f"{self.reference}: {self.reference_seconds * 1000:.1f} ms, "
+            f"{self.candidate}: {self.candidate_seconds * 1000:.1f} ms, "
+            f"{self.candidate} is {self.relative_throughput:.2f}x the throughput",
+            f"{len(self.divergences)} diverging inputs",
+        ]
+        lines.extend(f"  {divergence}" for divergence in self.divergences)
+        return "\n".join(lines)
+
+
+def _decode_all(
+    backend: DecoderBackend, file_contents: bytes
+) -> tuple[list[DisassembledInstruction], Exception | None, float]:
+    """Instructions up to the first error, that error, and the seconds taken"""
+    instructions: list[DisassembledInstruction] = []
+    error = None
+    start = time.perf_counter()
+    try:
+        instructions.extend(backend.iter_decode(file_contents))
+    except Exception as e:
+        error = e
+    return instructions, error, time.perf_counter() - start
+
+
+class DifferentialRunner:
+    def __init__(
+        self,
+        parsable_instructions: list[InstructionSchema],
+        candidate: str,
+        reference: str = REFERENCE_BACKEND,
+    ) -> None:
+        self.parsable_instructions = parsable_instructions
+        self.reference_name, self.candidate_name = reference, candidate
+        self.reference = create_backend(reference, parsable_instructions)
+        self.candidate = create_backend(candidate, parsable_instructions)
+
+    def run(self, inputs: Iterable[tuple[str, bytes]]) -> DifferentialReport:
+        """:param inputs: (name, contents) pairs, each reported on its own"""
+        report = DifferentialReport(self.reference_name, self.candidate_name)
+        for name, file_contents in inputs:
+            expected, expected_error, reference_seconds = _decode_all(
+                self.reference, file_contents
+            )
+            actual, actual_error, candidate_seconds = _decode_all(
+                self.candidate, file_contents
+            )
+            report.inputs += 1
+            report.bytes += len(file_contents)
+            report.instructions += len(expected)
+            report.reference_seconds += reference_seconds
+            report.candidate_seconds += candidate_seconds
+
+            divergence = self._first_divergence(
+                name, expected, expected_error, actual, actual_error
+            )
+            if divergence is not None:
+                report.divergences.append(divergence)
+        return report
+
+    def _first_divergence(
+        self,
+        name: str,
+        expected: list[DisassembledInstruction],
+        expected_error: Exception | None,
+        actual: list[DisassembledInstruction],
+        actual_error: Exception | None,
+    ) -> Divergence | None:
+        offset = 0
+        for inst, actual_inst in zip(expected, actual):
+            if actual_inst != inst:
+                return Divergence(name, offset, inst, actual_inst)
+            offset += inst.inst_size
+
+        if len(actual) > len(expected):
+            return Divergence(name, offset, expected_error, actual[len(expected)])
+        if len(actual) < len(expected):
+            # a backend that decodes all at once has no output when it raises, which
+            # agrees as long as the reference raised somewhere too, anything else that
+            # stops short gave up before the reference did
+            if not (
+                expected_error is not None
+                and actual_error is not None
+                and not actual
+                and getattr(self.candidate, "decodes_all_at_once", False)
+            ):
+                return Divergence(name, offset, expected[len(actual)], actual_error)
+        elif (expected_error is None) != (actual_error is None):
+            # both stopped at the same offset, there both or neither must raise
+            return Divergence(name, offset, expected_error, actual_error)
+        return None
+
+    def run_encodings(
+        self,
+        trailing_patterns: Sequence[bytes] = DEFAULT_TRAILING_PATTERNS,
+        exhaustive: bool = False,
+        batch_size: int = 4096,
+    ) -> DifferentialReport:
+        """
+        Every encoding from enumerate_encodings, decoded in batches of batch_size
+        encodings laid end to end so per call overhead doesn't skew the throughput
+        """
+        encodings = enumerate_encodings(
+            self.parsable_instructions, trailing_patterns, exhaustive
+        )
+
+        def batches() -> Iterator[tuple[str, bytes]]:
+            batch_ind = 0
+            while batch := list(islice(encodings, batch_size)):
+                yield f"encodings batch {batch_ind}", b"".join(batch)
+                batch_ind += 1
+
+        return self.run(batches())
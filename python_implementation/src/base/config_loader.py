@@ -1,4 +1,3 @@
-import json
 import re
 from pathlib import Path
 
@@ -51,10 +50,42 @@ def get_parsable_instructions(json_data_from_file: dict) -> list[InstructionSche
 
 
 PARSABLE_INSTRUCTION_FILE = "asm_config.json"
+DEFAULT_CONFIG_PATH = (
+    Path(__file__).parent / ".." / ".." / ".." / PARSABLE_INSTRUCTION_FILE
+)
+
 
+def get_parsable_instructions_from_config(config_path: Path = DEFAULT_CONFIG_PATH):
+    # imported here so the frozen tables, which only need the config hash, skip it
+    import json
 
-def get_parsable_instructions_from_config():
-    config_path = Path(__file__).parent / ".." / ".." / ".." / PARSABLE_INSTRUCTION_FILE
     with open(config_path, "r") as file:
         json_data_from_file = json.load(file)
     return get_parsable_instructions(json_data_from_file)
+
+
+def get_config_hash(config_path: Path = DEFAULT_CONFIG_PATH) -> str:
+    """Identifies the ISA config, anything derived from the config should be keyed by this"""
+    # imported here, the frozen tables only hash the config when it has changed
+    import hashlib
+
+    with open(config_path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def get_cache_directory() -> Path:
+    """Where artifacts derived from the config are kept between runs, per user"""
+    import os
+
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "perf-aware"
+
+
+def get_schemas_hash(parsable_instructions: list[InstructionSchema]) -> str:
+    """
+    Identifies a set of parsed schemas, for results keyed by what a disassembler
+    actually decodes with rather than by which config file it might have come from
+    """
+    import hashlib
+
+    return hashlib.sha256(repr(parsable_instructions).encode()).hexdigest()
@@ -1,4 +1,3 @@
-import logging
 from dataclasses import dataclass
 from enum import Enum
 
@@ -23,6 +22,7 @@ class LiteralField:
 class NamedField(Enum):
     bit_width: int  # for type checker, this exists
     always_needed: bool  # for type checker, this exists
+    ordinal: int  # for type checker, this exists, position in definition order
 
     D = ("d", 1, True)
     W = ("w", 1, True)
@@ -45,9 +45,12 @@ class NamedField(Enum):
         obj._value_ = field_name
         obj.bit_width = bit_width
         obj.always_needed = always_needed
+        obj.ordinal = len(cls.__members__)
         return obj
 
 
+NUM_NAMED_FIELDS = len(NamedField)
+
 type SchemaField = LiteralField | NamedField
 type ParsedNamedField = dict[NamedField, int]
 
@@ -0,0 +1,285 @@
+"""
+Batch disassembly that survives being killed and picks up where it stopped.
+
+Progress goes to a journal, one JSON object per line, only ever appended to and
+fsynced after every entry:
+
+    {"type": "chunk", "input": ..., "input_size": ..., "input_mtime_ns": ...,
+     "index": 3, "start": ..., "end": ..., "sha256": ...}
+    {"type": "file", "input": ..., "input_size": ..., "input_mtime_ns": ...,
+     "output": ..., "sha256": ...}
+
+A file entry means the listing was written, the hash being that of the listing file,
+which is compressed when output_suffix ends in .gz, .xz or .bz2, as inputs may be.
+Inputs bigger than chunk_size are decoded a chunk at a time, each chunk cut at an
+instruction boundary and its columnar decode written to a checkpoint file, so a
+resumed job only decodes the chunks it had not finished. Labels are resolved once
+all chunks of an input are joined.
+
+Outputs keep the inputs' paths relative to the directory all inputs share, so inputs
+with the same name in different directories get outputs of their own, and a job whose
+inputs would still share an output is rejected before anything is written.
+
+Every output and checkpoint is written to a temp file and renamed into place. On
+resume a file or chunk is only skipped if its input has the same size and mtime as
+when it was journaled and the bytes on disk still hash to the journaled sha256,
+anything else is redone. A line cut short by a crash is dropped.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from bisect import bisect_left
+from dataclasses import dataclass
+from pathlib import Path
+
+from python_implementation.src.columnar import ColumnarDisassembly
+from python_implementation.src.compressed_io import (
+    read_file,
+    strip_compression_suffix,
+    write_lines_atomically,
+)
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.result_cache import (
+    deserialize_columnar,
+    serialize_columnar,
+)
+
+DEFAULT_JOURNAL_NAME = ".batch_journal.jsonl"
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+CHUNK_DIRECTORY_SUFFIX = ".chunks"
+DEFAULT_OUTPUT_SUFFIX = ".asm"
+
+
+def _write_atomically(path: Path, data: bytes):
+    with tempfile.NamedTemporaryFile(
+        dir=path.parent, suffix=".tmp", delete=False
+    ) as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(file.name, path)
+
+
+def _sha256_of_file(path: Path) -> str | None:
+    try:
+        with open(path, "rb") as file:
+            return hashlib.file_digest(file, "sha256").hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def output_paths(
+    input_paths: list[Path], output_directory: Path, output_suffix: str
+) -> list[Path]:
+    """
+    An output per input, the same input given twice gets the same output.
+
+    :raises ValueError: If two different inputs would be written to the same output
+    """
+    if not input_paths:
+        return []
+    absolute_paths = [Path(os.path.abspath(input_path)) for input_path in input_paths]
+    common_directory = os.path.commonpath([path.parent for path in absolute_paths])
+    outputs: list[Path] = []
+    written_from: dict[Path, Path] = {}
+    for input_path, absolute_path in zip(input_paths, absolute_paths):
+        relative_path = strip_compression_suffix(
+            absolute_path.relative_to(common_directory)
+        )
+        output_path = output_directory / relative_path.with_name(
+            relative_path.name + output_suffix
+        )
+        other_input = written_from.setdefault(output_path, absolute_path)
+        if other_input != absolute_path:
+            raise ValueError(
+                f"{other_input} and {absolute_path} would both be written to {output_path}"
+            )
+        outputs.append(output_path)
+    return outputs
+
+
+def instruction_aligned_edges(
+    disassembler: Disassembler, file_contents: bytes, chunk_size: int
+) -> list[int]:
+    """Chunk end offsets, every chunk_size bytes moved on to an instruction boundary"""
+    boundaries = disassembler.scan(file_contents)
+    edges = []
+    for cut in range(chunk_size, len(file_contents), chunk_size):
+        ind = bisect_left(boundaries, cut)
+        if ind == len(boundaries):
+            break
+        if not edges or boundaries[ind] > edges[-1]:
+            edges.append(boundaries[ind])
+    if not edges or edges[-1] != len(file_contents):
+        edges.append(len(file_contents))
+    return edges
+
+
+class Journal:
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+
+    def entries(self) -> list[dict]:
+        """Every whole entry in the order they were appended"""
+        try:
+            data = self.path.read_bytes()
+        except FileNotFoundError:
+            return []
+        whole, _, torn = data.rpartition(b"\n")
+        if torn:
+            # a crash mid append, cut it off so the next entry starts on its own line
+            with open(self.path, "r+b") as file:
+                file.truncate(len(whole) + 1 if whole else 0)
+        return [json.loads(line) for line in whole.splitlines() if line]
+
+    def append(self, entry: dict):
+        with open(self.path, "a") as file:
+            file.write(json.dumps(entry) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def reset(self):
+        self.path.unlink(missing_ok=True)
+
+
+@dataclass
+class BatchStats:
+    files_done: int = 0
+    files_skipped: int = 0
+    chunks_done: int = 0
+    chunks_skipped: int = 0
+    # journaled but missing or changed on disk, so done again
+    redone: int = 0
+
+
+class BatchJob:
+    def __init__(
+        self,
+        disassembler: Disassembler,
+        output_directory: str | Path,
+        journal_path: str | Path | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        output_suffix: str = DEFAULT_OUTPUT_SUFFIX,
+    ) -> None:
+        self.disassembler = disassembler
+        self.output_directory = Path(output_directory)
+        self.journal = Journal(
+            journal_path or self.output_directory / DEFAULT_JOURNAL_NAME
+        )
+        self.chunk_size = chunk_size
+        self.output_suffix = output_suffix
+        self.stats = BatchStats()
+
+    def chunk_edges(self, file_contents: bytes) -> list[int]:
+        return instruction_aligned_edges(
+            self.disassembler, file_contents, self.chunk_size
+        )
+
+    def run(self, input_paths: list[str | Path], resume: bool = False) -> BatchStats:
+        input_paths = list(map(Path, input_paths))
+        outputs = output_paths(input_paths, self.output_directory, self.output_suffix)
+        self.output_directory.mkdir(parents=True, exist_ok=True)
+        if not resume:
+            self.journal.reset()
+        files: dict[str, dict] = {}
+        chunks: dict[tuple[str, int], dict] = {}
+        for entry in self.journal.entries():
+            if entry["type"] == "file":
+                files[entry["input"]] = entry
+            else:
+                chunks[entry["input"], entry["index"]] = entry
+
+        for input_path, output_path in zip(input_paths, outputs):
+            stat = input_path.stat()
+            identity = {
+                "input": str(input_path),
+                "input_size": stat.st_size,
+                "input_mtime_ns": stat.st_mtime_ns,
+            }
+            done = files.get(str(input_path))
+            if done is not None and _matches(done, identity):
+                if _sha256_of_file(output_path) == done["sha256"]:
+                    self.stats.files_skipped += 1
+                    continue
+                self.stats.redone += 1
+
+            file_contents = read_file(input_path)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            chunk_directory = self._chunk_directory(output_path)
+            if len(file_contents) > self.chunk_size:
+                disassembly = self._decode_in_chunks(
+                    input_path, chunk_directory, file_contents, identity, chunks
+                ).to_disassembly()
+            else:
+                disassembly = self.disassembler.decode(file_contents)
+            write_lines_atomically(output_path, disassembly.iter_lines())
+            self.journal.append(
+                {
+                    "type": "file",
+                    **identity,
+                    "output": str(output_path),
+                    "sha256": _sha256_of_file(output_path),
+                }
+            )
+            shutil.rmtree(chunk_directory, ignore_errors=True)
+            self.stats.files_done += 1
+        return self.stats
+
+    def _chunk_directory(self, output_path: Path) -> Path:
+        """Next to the output, so it is as unique as the output is"""
+        return output_path.with_name(output_path.name + CHUNK_DIRECTORY_SUFFIX)
+
+    def _decode_in_chunks(
+        self,
+        input_path: Path,
+        chunk_directory: Path,
+        file_contents: bytes,
+        identity: dict,
+        chunks: dict[tuple[str, int], dict],
+    ) -> ColumnarDisassembly:
+        chunk_directory.mkdir(exist_ok=True)
+        schemas = self.disassembler.parsable_instructions
+        parts = []
+        chunk_start = 0
+        for index, chunk_end in enumerate(self.chunk_edges(file_contents)):
+            chunk_path = chunk_directory / f"{index}.chunk"
+            done = chunks.get((str(input_path), index))
+            columnar = None
+            if (
+                done is not None
+                and _matches(done, identity)
+                and (done["start"], done["end"]) == (chunk_start, chunk_end)
+            ):
+                if _sha256_of_file(chunk_path) == done["sha256"]:
+                    columnar = deserialize_columnar(chunk_path.read_bytes(), schemas)
+                    self.stats.chunks_skipped += 1
+                else:
+                    self.stats.redone += 1
+
+            if columnar is None:
+                columnar = self.disassembler.decode_columnar(
+                    file_contents[chunk_start:chunk_end]
+                )
+                data = serialize_columnar(columnar)
+                _write_atomically(chunk_path, data)
+                self.journal.append(
+                    {
+                        "type": "chunk",
+                        **identity,
+                        "index": index,
+                        "start": chunk_start,
+                        "end": chunk_end,
+                        "sha256": hashlib.sha256(data).hexdigest(),
+                    }
+                )
+                self.stats.chunks_done += 1
+            parts.append((chunk_start, columnar))
+            chunk_start = chunk_end
+        return ColumnarDisassembly.concatenate(schemas, parts)
+
+
+def _matches(entry: dict, identity: dict) -> bool:
+    return all(entry[key] == value for key, value in identity.items())
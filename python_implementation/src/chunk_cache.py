@@ -0,0 +1,154 @@
+"""
+Decoding that reuses work across slightly different versions of a binary.
+
+The input is cut into content-defined chunks with a gear rolling hash: a cut goes
+where the hash of the last 32 bytes has its low bits all zero, so an edit only moves
+the cuts near it and the chunks elsewhere keep the same bytes as in the previous
+version. Each cut is then snapped forward to the next instruction boundary, found
+with the cheap OpcodeTable scan, so every chunk decodes on its own.
+
+A chunk's columnar decode is cached under the hash of its bytes. Jump displacements
+are relative, so a cached chunk is valid wherever it lands, and labels are resolved
+over the whole binary once the chunks are joined back together. Chunks persisted in
+a ResultCache are stored under their own key namespace, apart from whole binaries.
+"""
+
+import hashlib
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from python_implementation.src.columnar import ColumnarDisassembly
+from python_implementation.src.disassembled import Disassembly
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.result_cache import ResultCache
+
+GEAR = tuple(
+    int.from_bytes(hashlib.sha256(bytes([b])).digest()[:4], "little")
+    for b in range(256)
+)
+DEFAULT_AVG_CHUNK_BITS = 12  # 4 KiB
+DEFAULT_MIN_CHUNK_SIZE = 1024
+DEFAULT_MAX_CHUNK_SIZE = 16 * 1024
+DEFAULT_MAX_CACHED_CHUNKS = 4096
+# chunk entries hold no listing, a chunk that is also a whole binary must not hit one
+RESULT_CACHE_NAMESPACE = "chunk"
+
+
+def content_defined_cuts(
+    file_contents: bytes,
+    avg_chunk_bits: int = DEFAULT_AVG_CHUNK_BITS,
+    min_chunk_size: int = DEFAULT_MIN_CHUNK_SIZE,
+    max_chunk_size: int = DEFAULT_MAX_CHUNK_SIZE,
+) -> list[int]:
+    """Byte offsets where a chunk would end by content alone, before snapping"""
+    mask = (1 << avg_chunk_bits) - 1
+    cuts = []
+    chunk_start = gear_hash = 0
+    for ind, byte in enumerate(file_contents):
+        gear_hash = ((gear_hash << 1) + GEAR[byte]) & 0xFFFFFFFF
+        chunk_len = ind + 1 - chunk_start
+        if chunk_len >= max_chunk_size or (
+            chunk_len >= min_chunk_size and gear_hash & mask == 0
+        ):
+            cuts.append(ind + 1)
+            chunk_start = ind + 1
+    return cuts
+
+
+@dataclass
+class ChunkStats:
+    chunks: int = 0
+    reused_chunks: int = 0
+    decoded_bytes: int = 0
+    reused_bytes: int = 0
+
+
+class ChunkedDecoder:
+    """
+    Chunks are kept in memory up to max_cached_chunks, least recently used dropped
+    first, and in a ResultCache when one is given so they outlive the process.
+    """
+
+    def __init__(
+        self,
+        disassembler: Disassembler,
+        result_cache: ResultCache | None = None,
+        max_cached_chunks: int = DEFAULT_MAX_CACHED_CHUNKS,
+        avg_chunk_bits: int = DEFAULT_AVG_CHUNK_BITS,
+        min_chunk_size: int = DEFAULT_MIN_CHUNK_SIZE,
+        max_chunk_size: int = DEFAULT_MAX_CHUNK_SIZE,
+    ) -> None:
+        self.disassembler = disassembler
+        self.result_cache = result_cache
+        self.max_cached_chunks = max_cached_chunks
+        self.avg_chunk_bits = avg_chunk_bits
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.chunks: OrderedDict[bytes, ColumnarDisassembly] = OrderedDict()
+        self.stats = ChunkStats()
+
+    def chunk_edges(self, file_contents: bytes) -> list[int]:
+        """Chunk end offsets, each on an instruction boundary, the last one the end of input"""
+        boundaries = self.disassembler.scan(file_contents)
+        edges = []
+        for cut in content_defined_cuts(
+            file_contents, self.avg_chunk_bits, self.min_chunk_size, self.max_chunk_size
+        ):
+            ind = bisect_left(boundaries, cut)
+            if ind == len(boundaries):
+                break
+            if not edges or boundaries[ind] > edges[-1]:
+                edges.append(boundaries[ind])
+        if not edges or edges[-1] != len(file_contents):
+            edges.append(len(file_contents))
+        return edges
+
+    def _decode_chunk(self, chunk: bytes) -> tuple[ColumnarDisassembly, bool]:
+        """:returns: The chunk's decode and whether it came from a cache"""
+        digest = hashlib.sha256(chunk).digest()
+        columnar = self.chunks.get(digest)
+        if columnar is not None:
+            self.chunks.move_to_end(digest)
+            return columnar, True
+
+        key = None
+        if self.result_cache is not None:
+            key = self.result_cache.key(
+                self.disassembler, chunk, RESULT_CACHE_NAMESPACE
+            )
+            columnar = self.result_cache.get_columnar(
+                key, self.disassembler.parsable_instructions
+            )
+        reused = columnar is not None
+        if columnar is None:
+            columnar = self.disassembler.decode_columnar(chunk)
+            if self.result_cache is not None and key is not None:
+                # listings only make sense for whole binaries, labels are global
+                self.result_cache.put(key, columnar, "")
+
+        self.chunks[digest] = columnar
+        if len(self.chunks) > self.max_cached_chunks:
+            self.chunks.popitem(last=False)
+        return columnar, reused
+
+    def decode_columnar(self, file_contents: bytes) -> ColumnarDisassembly:
+        parts = []
+        chunk_start = 0
+        for chunk_end in self.chunk_edges(file_contents):
+            chunk = file_contents[chunk_start:chunk_end]
+            columnar, reused = self._decode_chunk(chunk)
+            parts.append((chunk_start, columnar))
+            self.stats.chunks += 1
+            if reused:
+                self.stats.reused_chunks += 1
+                self.stats.reused_bytes += len(chunk)
+            else:
+                self.stats.decoded_bytes += len(chunk)
+            chunk_start = chunk_end
+        return ColumnarDisassembly.concatenate(
+            self.disassembler.parsable_instructions, parts
+        )
+
+    def decode(self, file_contents: bytes) -> Disassembly:
+        return self.decode_columnar(file_contents).to_disassembly()
@@ -0,0 +1,171 @@
+from array import array
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Self, override
+
+from python_implementation.src.base.schema import InstructionSchema, NamedField
+from python_implementation.src.disassembled import (
+    DisassembledInstruction,
+    Disassembly,
+)
+from python_implementation.src.intermediates.accumulator import DecodeAccumulator
+from python_implementation.src.opcode_table import EncodingLayout, OpcodeTable
+from python_implementation.src.utils import as_signed_int, combine_bytes
+
+ABSENT = -1
+
+
+def get_mnemonic_ids(schemas: list[InstructionSchema]) -> tuple[list[str], list[int]]:
+    """:returns: unique mnemonics in config order, and the mnemonic id of every schema"""
+    mnemonics = list(dict.fromkeys(schema.mnemonic for schema in schemas))
+    mnemonic_ids = [mnemonics.index(schema.mnemonic) for schema in schemas]
+    return mnemonics, mnemonic_ids
+
+
+def get_displacement(parsed_fields: dict[NamedField, int]) -> int:
+    """Signed memory or jump displacement the way the listing shows it, 0 when there is none"""
+    if NamedField.IP_INC8 in parsed_fields:
+        return as_signed_int(parsed_fields[NamedField.IP_INC8])
+    if NamedField.DISP_LO in parsed_fields:
+        return as_signed_int(
+            combine_bytes(
+                parsed_fields[NamedField.DISP_LO], parsed_fields.get(NamedField.DISP_HI)
+            )
+        )
+    return 0
+
+
+def get_immediate(parsed_fields: dict[NamedField, int]) -> int:
+    if NamedField.DATA not in parsed_fields:
+        return ABSENT
+    return combine_bytes(
+        parsed_fields[NamedField.DATA], parsed_fields.get(NamedField.DATA_IF_W1)
+    )
+
+
+@dataclass(frozen=True)
+class ColumnarDisassembly:
+    """
+    A decoded binary as one column per attribute instead of one object per instruction.
+
+    `fields` holds the raw value of every field read from the binary, ABSENT where the
+    instruction has no such field. Implied values are left to the schema, so rebuilding
+    an instruction goes through the same DecodeAccumulator as a normal decode.
+    Columns are array.array when built here, numpy arrays from the vectorized backend.
+    """
+
+    schemas: list[InstructionSchema]
+    offsets: Sequence[int]
+    sizes: Sequence[int]
+    schema_ids: Sequence[int]
+    fields: dict[NamedField, Sequence[int]]
+    mnemonic_ids: Sequence[int]
+    displacements: Sequence[int]
+    immediates: Sequence[int]
+
+    @classmethod
+    def from_bytes(cls, opcode_table: OpcodeTable, file_contents: bytes) -> Self:
+        """Pure python builder, the layout of each distinct opcode/ModRM pair is worked out once"""
+        _, schema_mnemonic_ids = get_mnemonic_ids(
+            [plan.schema for plan in opcode_table.plans]
+        )
+        offsets = opcode_table.scan(file_contents)
+        sizes, schema_ids = array("B"), array("h")
+        mnemonic_ids, displacements, immediates = array("h"), array("i"), array("i")
+        fields = {field: array("i") for field in NamedField}
+        layouts: dict[bytes, EncodingLayout] = {}
+        for offset in offsets:
+            key = file_contents[offset : offset + 2]
+            layout = layouts.get(key)
+            if layout is None:
+                layout = layouts[key] = opcode_table.layout(file_contents, offset)
+
+            parsed_fields = dict(layout.header_values)
+            for field, field_offset in layout.trailing_offsets:
+                parsed_fields[field] = file_contents[offset + field_offset]
+            for field, column in fields.items():
+                column.append(parsed_fields.get(field, ABSENT))
+
+            sizes.append(layout.size)
+            schema_ids.append(layout.schema_ind)
+            mnemonic_ids.append(schema_mnemonic_ids[layout.schema_ind])
+            displacements.append(get_displacement(parsed_fields))
+            immediates.append(get_immediate(parsed_fields))
+
+        return cls(
+            [plan.schema for plan in opcode_table.plans],
+            offsets,
+            sizes,
+            schema_ids,
+            fields,
+            mnemonic_ids,
+            displacements,
+            immediates,
+        )
+
+    @classmethod
+    def concatenate(
+        cls, schemas: list[InstructionSchema], parts: list[tuple[int, Self]]
+    ) -> Self:
+        """
+        Join decodes of consecutive pieces of one binary into a decode of the whole.
+        :param parts: (byte offset of the piece in the binary, its decode), in order
+        """
+        offsets, sizes, schema_ids = array("I"), array("B"), array("h")
+        mnemonic_ids, displacements, immediates = array("h"), array("i"), array("i")
+        fields = {field: array("i") for field in NamedField}
+
+        def extend(column: array, values: Sequence[int]):
+            if isinstance(values, array) and values.typecode == column.typecode:
+                column.extend(values)
+            else:
+                column.extend(int(value) for value in values)
+
+        for base, part in parts:
+            offsets.extend(base + int(offset) for offset in part.offsets)
+            extend(sizes, part.sizes)
+            extend(schema_ids, part.schema_ids)
+            extend(mnemonic_ids, part.mnemonic_ids)
+            extend(displacements, part.displacements)
+            extend(immediates, part.immediates)
+            for field, column in fields.items():
+                extend(column, part.fields[field])
+        return cls(
+            schemas,
+            offsets,
+            sizes,
+            schema_ids,
+            fields,
+            mnemonic_ids,
+            displacements,
+            immediates,
+        )
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    @property
+    def mnemonics(self) -> list[str]:
+        return get_mnemonic_ids(self.schemas)[0]
+
+    def parsed_fields(self, ind: int) -> dict[NamedField, int]:
+        return {
+            field: int(column[ind])
+            for field, column in self.fields.items()
+            if column[ind] != ABSENT
+        }
+
+    def instruction(self, ind: int) -> DisassembledInstruction:
+        schema = self.schemas[self.schema_ids[ind]]
+        acc = DecodeAccumulator.from_parsed_fields(
+            self.parsed_fields(ind), int(self.sizes[ind])
+        )
+        acc.with_implied_fields(schema.implied_values)
+        return acc.build(schema)
+
+    def to_disassembly(self) -> Disassembly:
+        return Disassembly([self.instruction(i) for i in range(len(self))])
+
+    @override
+    def __str__(self) -> str:
+        return str(self.to_disassembly())
@@ -0,0 +1,279 @@
+"""
+The decode trie flattened into parallel arrays and walked with integer node indices.
+
+Where every schema still in play agrees on the next literal bits, those bits become
+one RUN node that checks them with a single masked compare, instead of one Node per
+bit. Every node sits at the same bit offset from the instruction start on every path
+through it, so masks are pre-aligned to the byte they apply to and no bit cursor is
+needed until the leaf. Leaves are not nodes, a child slot refers to a LeafPlan with a negative
+index. Runs stop at byte boundaries, so a long literal prefix (a two byte opcode,
+say) is just one RUN node per byte.
+"""
+
+from array import array
+from collections.abc import Iterator
+from typing import Self
+
+from python_implementation.src.base.schema import (
+    InstructionSchema,
+    LiteralField,
+    NamedField,
+)
+from python_implementation.src.disassembled import (
+    DisassembledInstruction,
+    Disassembly,
+)
+from python_implementation.src.intermediates.accumulator import DecodeAccumulator
+from python_implementation.src.trie import LeafPlan
+from python_implementation.src.utils import BITS_PER_BYTE, get_sub_most_sig_bits
+
+# node kinds
+RUN, BRANCH, NAMED = range(3)
+# child slots, three per node. BRANCH uses all of them like Node.children,
+# RUN and NAMED only have the one child they always continue to
+LEFT, NEXT, RIGHT = range(3)
+# a child reference is a node index, NO_CHILD, or a leaf index as (-2 - leaf index)
+NO_CHILD = -1
+
+type _Stream = tuple[bool | NamedField, ...]
+type _Group = list[tuple[_Stream, InstructionSchema]]
+
+
+def _flatten(schema: InstructionSchema) -> _Stream:
+    """Same items as iterating a BitModeSchemaIterator, one per literal bit or named field"""
+    stream = []
+    for field in (schema.identifier_literal, *schema.fields):
+        if isinstance(field, NamedField):
+            stream.append(field)
+        else:
+            stream.extend(
+                bool(
+                    get_sub_most_sig_bits(
+                        field.literal_value, i, 1, total_bits=field.bit_width
+                    )
+                )
+                for i in range(field.bit_width)
+            )
+    return tuple(stream)
+
+
+def _leaf_plan(schema: InstructionSchema, pos: int) -> LeafPlan:
+    """The LeafPlan of a coil that has been advanced `pos` stream items"""
+    fields = (schema.identifier_literal, *schema.fields)
+    for field_ind, field in enumerate(fields):
+        width = 1 if isinstance(field, NamedField) else field.bit_width
+        if pos < width:
+            break
+        pos -= width
+    else:
+        return LeafPlan(schema, 0, 0, ())
+
+    if pos == 0 or not isinstance(field, LiteralField):
+        return LeafPlan(schema, 0, 0, fields[field_ind:])
+    literal_width = field.bit_width - pos
+    literal_value = field.literal_value & ((1 << literal_width) - 1)
+    return LeafPlan(schema, literal_width, literal_value, fields[field_ind + 1 :])
+
+
+def _read_bits(contents: bytes, offset: int, bit_offset: int, num_bits: int) -> int:
+    shift = BITS_PER_BYTE - bit_offset % BITS_PER_BYTE - num_bits
+    if shift < 0:
+        raise ValueError("Our ISA does not have fields that straddle byte boundaries")
+    byte = contents[offset + bit_offset // BITS_PER_BYTE]
+    return byte >> shift & ((1 << num_bits) - 1)
+
+
+class CompactTrie:
+    def __init__(
+        self,
+        leaves: list[LeafPlan],
+        leaf_bit_offsets: array,
+        kinds: array,
+        bit_offsets: array,
+        masks: array,
+        shifts: array,
+        values: array,
+        children: array,
+    ) -> None:
+        """
+        :param values: What a node compares or stores. The aligned literal bits for RUN,
+            the NamedField ordinal for NAMED
+        """
+        self.leaves = leaves
+        self.leaf_bit_offsets = leaf_bit_offsets
+        self.root = NO_CHILD
+        self.kinds = kinds
+        self.bit_offsets = bit_offsets
+        self.masks = masks
+        self.shifts = shifts
+        self.values = values
+        self.children = children
+
+    @classmethod
+    def from_parsable_instructions(cls, instructions: list[InstructionSchema]) -> Self:
+        trie = cls(
+            [],
+            array("B"),
+            array("B"),
+            array("B"),
+            array("B"),
+            array("B"),
+            array("H"),
+            array("i"),
+        )
+        trie.root = trie._build([(_flatten(inst), inst) for inst in instructions], 0, 0)
+        return trie
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def _add_node(self, kind: int, bit_offset: int, mask=0, shift=0, value=0) -> int:
+        self.kinds.append(kind)
+        self.bit_offsets.append(bit_offset)
+        self.masks.append(mask)
+        self.shifts.append(shift)
+        self.values.append(value)
+        self.children.extend((NO_CHILD, NO_CHILD, NO_CHILD))
+        return len(self.kinds) - 1
+
+    def _build(self, group: _Group, pos: int, bit_offset: int) -> int:
+        """
+        :param group: The flattened bit/NamedField stream of every schema that reaches
+            this node, all of them already matched up to stream position `pos`
+        :returns: Child reference to what was built for the group
+        """
+        if len(group) == 1:
+            self.leaves.append(_leaf_plan(group[0][1], pos))
+            self.leaf_bit_offsets.append(bit_offset)
+            return -1 - len(self.leaves)
+
+        assert all(
+            pos < len(stream) for stream, _ in group
+        ), "One instruction is the exact prefix of another"
+        heads = {stream[pos] for stream, _ in group}
+        bit_in_byte = bit_offset % BITS_PER_BYTE
+
+        if len(heads) == 1 and isinstance(next(iter(heads)), bool):
+            run_value = run_width = 0
+            while bit_in_byte + run_width < BITS_PER_BYTE:
+                heads = {
+                    stream[pos + run_width] if pos + run_width < len(stream) else None
+                    for stream, _ in group
+                }
+                if len(heads) != 1 or not isinstance(next(iter(heads)), bool):
+                    break
+                run_value = run_value << 1 | next(iter(heads))
+                run_width += 1
+            shift = BITS_PER_BYTE - bit_in_byte - run_width
+            node = self._add_node(
+                RUN,
+                bit_offset,
+                mask=((1 << run_width) - 1) << shift,
+                value=run_value << shift,
+            )
+            child = self._build(group, pos + run_width, bit_offset + run_width)
+            self.children[3 * node + NEXT] = child
+            return node
+
+        if all(isinstance(head, NamedField) for head in heads):
+            assert len(heads) == 1, "Ambiguous ISA"
+            field = next(iter(heads))
+            assert isinstance(field, NamedField)
+            shift = BITS_PER_BYTE - bit_in_byte - field.bit_width
+            node = self._add_node(
+                NAMED,
+                bit_offset,
+                mask=((1 << field.bit_width) - 1) << shift,
+                shift=shift,
+                value=field.ordinal,
+            )
+            child = self._build(group, pos + 1, bit_offset + field.bit_width)
+            self.children[3 * node + NEXT] = child
+            return node
+
+        node = self._add_node(
+            BRANCH, bit_offset, mask=1 << (BITS_PER_BYTE - 1 - bit_in_byte)
+        )
+        zeros = [entry for entry in group if entry[0][pos] is False]
+        ones = [entry for entry in group if entry[0][pos] is True]
+        named = [entry for entry in group if isinstance(entry[0][pos], NamedField)]
+        if zeros:
+            self.children[3 * node + LEFT] = self._build(zeros, pos + 1, bit_offset + 1)
+        if ones:
+            self.children[3 * node + RIGHT] = self._build(ones, pos + 1, bit_offset + 1)
+        if named:
+            # literal paths are preferred, the named field is only read when the bit has none
+            self.children[3 * node + NEXT] = self._build(named, pos, bit_offset)
+        return node
+
+    def decode_one(
+        self, file_contents: bytes, offset: int, acc: DecodeAccumulator
+    ) -> DisassembledInstruction:
+        """Decode the instruction at offset, acc is scratch and reset here"""
+        acc.reset()
+        kinds, bit_offsets, masks, values, children = (
+            self.kinds,
+            self.bit_offsets,
+            self.masks,
+            self.values,
+            self.children,
+        )
+        node = self.root
+        try:
+            while node >= 0:
+                kind = kinds[node]
+                byte = file_contents[offset + (bit_offsets[node] >> 3)]
+                if kind == BRANCH:
+                    child = children[3 * node + (RIGHT if byte & masks[node] else LEFT)]
+                    if child == NO_CHILD:
+                        child = children[3 * node + NEXT]
+                elif kind == RUN:
+                    child = NO_CHILD
+                    if byte & masks[node] == values[node]:
+                        child = children[3 * node + NEXT]
+                else:
+                    acc.slots[values[node]] = (byte & masks[node]) >> self.shifts[node]
+                    child = children[3 * node + NEXT]
+                if child == NO_CHILD:
+                    raise ValueError(
+                        f"Undecodable instruction at offset {offset}: "
+                        f"{file_contents[offset : offset + 2].hex()}"
+                    )
+                node = child
+
+            leaf = self.leaves[-2 - node]
+            acc.bit_size = self.leaf_bit_offsets[-2 - node]
+            if leaf.literal_width:
+                read_bits = _read_bits(
+                    file_contents, offset, acc.bit_size, leaf.literal_width
+                )
+                if read_bits != leaf.literal_value:
+                    raise ValueError(
+                        f"Undecodable instruction at offset {offset}: "
+                        f"{file_contents[offset : offset + 2].hex()}"
+                    )
+                acc.bit_size += leaf.literal_width
+
+            acc.with_implied_fields(leaf.schema.implied_values)
+            for field in leaf.fields:
+                if acc.is_needed(field):
+                    acc.with_field(
+                        field,
+                        _read_bits(
+                            file_contents, offset, acc.bit_size, field.bit_width
+                        ),
+                    )
+        except IndexError:
+            raise ValueError("Instruction stream ended in the middle of an instruction")
+        return acc.build(leaf.schema)
+
+    def iter_decode(self, file_contents: bytes) -> Iterator[DisassembledInstruction]:
+        acc = DecodeAccumulator()
+        offset = 0
+        while offset < len(file_contents):
+            instruction = self.decode_one(file_contents, offset, acc)
+            offset += instruction.inst_size
+            yield instruction
+
+    def decode(self, file_contents: bytes) -> Disassembly:
+        return Disassembly(list(self.iter_decode(file_contents)))
@@ -0,0 +1,117 @@
+"""
+Reading and writing files that may be gzip, xz or bz2 compressed, told apart by
+their suffix, with only the stdlib codecs.
+
+Inputs are decompressed as they are read, so a decode can consume a compressed
+binary READ_SIZE bytes at a time. Outputs are compressed as lines are written, into
+a temp file next to the target that is renamed into place once it is complete and
+on disk.
+"""
+
+import bz2
+import gzip
+import lzma
+import os
+import tempfile
+from collections.abc import Iterable, Iterator
+from itertools import batched, chain
+from pathlib import Path
+from typing import BinaryIO, Self
+
+OPENERS = {".gz": gzip.open, ".xz": lzma.open, ".bz2": bz2.open}
+READ_SIZE = 64 * 1024
+LINES_PER_WRITE = 4096
+
+
+def is_compressed(path: str | Path) -> bool:
+    return Path(path).suffix in OPENERS
+
+
+def strip_compression_suffix(path: str | Path) -> Path:
+    path = Path(path)
+    return path.with_suffix("") if is_compressed(path) else path
+
+
+def open_binary(path: str | Path) -> BinaryIO:
+    """Open for reading, decompressing on the way if the suffix says so"""
+    return OPENERS.get(Path(path).suffix, open)(path, "rb")
+
+
+def read_file(path: str | Path) -> bytes:
+    with open_binary(path) as file:
+        return file.read()
+
+
+def iter_file_bytes(path: str | Path, read_size: int = READ_SIZE) -> Iterator[int]:
+    """The file's bytes one at a time, read and decompressed read_size at a time"""
+    with open_binary(path) as file:
+        yield from chain.from_iterable(iter(lambda: file.read(read_size), b""))
+
+
+class AtomicLineWriter:
+    """
+    Lines joined by newlines, buffered and compressed as they are written if the
+    suffix says so. The file only appears at path once closed, whole and synced to
+    disk, abort throws away everything written so far.
+    """
+
+    def __init__(self, path: str | Path, lines_per_write: int = LINES_PER_WRITE):
+        self.path = Path(path)
+        self.lines_per_write = lines_per_write
+        self.raw = tempfile.NamedTemporaryFile(
+            dir=self.path.parent, suffix=".tmp", delete=False
+        )
+        opener = OPENERS.get(self.path.suffix)
+        self.sink = opener(self.raw, "wb") if opener is not None else self.raw
+        self.buffer: list[str] = []
+        self.separator = b""
+
+    def write_line(self, line: str):
+        self.buffer.append(line)
+        if len(self.buffer) >= self.lines_per_write:
+            self._flush()
+
+    def write_lines(self, lines: Iterable[str]):
+        for batch in batched(lines, self.lines_per_write):
+            self.buffer.extend(batch)
+            self._flush()
+
+    def _flush(self):
+        if self.buffer:
+            self.sink.write(self.separator + "\n".join(self.buffer).encode())
+            self.separator = b"\n"
+            self.buffer.clear()
+
+    def close(self):
+        try:
+            self._flush()
+            if self.sink is not self.raw:
+                # only ends the compressed stream, raw stays open
+                self.sink.close()
+            self.raw.flush()
+            os.fsync(self.raw.fileno())
+            self.raw.close()
+        except BaseException:
+            self.abort()
+            raise
+        os.replace(self.raw.name, self.path)
+
+    def abort(self):
+        if self.sink is not self.raw:
+            self.sink.close()
+        self.raw.close()
+        os.unlink(self.raw.name)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_lines_atomically(path: str | Path, lines: Iterable[str]):
+    with AtomicLineWriter(path) as writer:
+        writer.write_lines(lines)
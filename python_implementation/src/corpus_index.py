@@ -0,0 +1,240 @@
+"""
+Inverted index over a corpus of binaries, searched without decoding anything again.
+
+Every instruction is indexed under terms for its mnemonic, the registers among its
+operands, the addressing mode of a memory operand and its immediate value:
+
+    mnemonic:mov   reg:bx   mem:bp + di + disp   imm:4660
+
+Each binary gets a shard file mapping its terms to sorted arrays of instruction
+offsets, so a posting is (file, offset) with the file implied by the shard. The
+manifest keeps a Bloom filter of every file's terms, and a query only opens the
+shards whose filter holds all of the query's terms.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+from python_implementation.src.disassembled import (
+    DisassembledBinaryInstruction,
+    DisassembledInstruction,
+    DisassembledUnaryInstruction,
+)
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.intermediates.operands import (
+    ImmediateOperand,
+    MemoryOperand,
+    Operand,
+)
+
+MANIFEST_NAME = "manifest.json"
+SHARD_SUFFIX = ".shard"
+SHARD_MAGIC = b"CIDX"
+BLOOM_BITS = 2048
+BLOOM_HASHES = 3
+_SHARD_HEADER = struct.Struct("<4sI")
+_TERM_HEADER = struct.Struct("<HI")
+
+
+def mnemonic_term(mnemonic: str) -> str:
+    return f"mnemonic:{mnemonic}"
+
+
+def register_term(register: str) -> str:
+    return f"reg:{register}"
+
+
+def memory_term(addressing_mode: str) -> str:
+    """:param addressing_mode: e.g. "bp + di + disp", "si" or "disp" for a direct address"""
+    return f"mem:{addressing_mode}"
+
+
+def immediate_term(value: int) -> str:
+    return f"imm:{value}"
+
+
+def addressing_mode(op: MemoryOperand) -> str:
+    parts = []
+    if op.memory_base is not None:
+        parts.extend(MemoryOperand.RM_TO_EFFECTIVE_ADDR_CALC[op.memory_base])
+    if op.displacement != 0 or op.memory_base is None:
+        parts.append("disp")
+    return " + ".join(parts)
+
+
+def _operand_term(op: Operand) -> str:
+    if isinstance(op, MemoryOperand):
+        return memory_term(addressing_mode(op))
+    if isinstance(op, ImmediateOperand):
+        return immediate_term(op.value)
+    return register_term(str(op))
+
+
+def instruction_terms(inst: DisassembledInstruction) -> set[str]:
+    terms = {mnemonic_term(inst.mnemonic)}
+    if isinstance(inst, DisassembledBinaryInstruction):
+        terms.add(_operand_term(inst.source))
+        terms.add(_operand_term(inst.dest))
+    elif isinstance(inst, DisassembledUnaryInstruction):
+        terms.add(_operand_term(inst.op))
+    return terms
+
+
+def _bloom_bits(term: str) -> list[int]:
+    digest = hashlib.blake2b(term.encode(), digest_size=4 * BLOOM_HASHES).digest()
+    return [
+        int.from_bytes(digest[4 * i : 4 * i + 4], "little") % BLOOM_BITS
+        for i in range(BLOOM_HASHES)
+    ]
+
+
+def bloom_summary(terms: set[str]) -> int:
+    bloom = 0
+    for term in terms:
+        for bit in _bloom_bits(term):
+            bloom |= 1 << bit
+    return bloom
+
+
+def bloom_may_contain(bloom: int, term: str) -> bool:
+    return all(bloom >> bit & 1 for bit in _bloom_bits(term))
+
+
+def _write_atomically(path: Path, data: bytes):
+    with tempfile.NamedTemporaryFile(
+        dir=path.parent, suffix=".tmp", delete=False
+    ) as file:
+        file.write(data)
+    os.replace(file.name, path)
+
+
+def _pack_shard(postings: dict[str, array]) -> bytes:
+    parts = [_SHARD_HEADER.pack(SHARD_MAGIC, len(postings))]
+    for term, offsets in sorted(postings.items()):
+        encoded = term.encode()
+        if sys.byteorder == "big":
+            offsets = array("I", offsets)
+            offsets.byteswap()
+        parts.append(_TERM_HEADER.pack(len(encoded), len(offsets)))
+        parts.append(encoded)
+        parts.append(offsets.tobytes())
+    return b"".join(parts)
+
+
+def _unpack_shard(data: bytes) -> dict[str, array]:
+    """:raises ValueError: If data is not a whole shard"""
+    if len(data) < _SHARD_HEADER.size:
+        raise ValueError("Not an index shard, too short for the header")
+    magic, num_terms = _SHARD_HEADER.unpack_from(data)
+    if magic != SHARD_MAGIC:
+        raise ValueError("Not an index shard")
+    pos = _SHARD_HEADER.size
+    postings = {}
+    for _ in range(num_terms):
+        if pos + _TERM_HEADER.size > len(data):
+            raise ValueError("Index shard is truncated")
+        term_len, num_offsets = _TERM_HEADER.unpack_from(data, pos)
+        pos += _TERM_HEADER.size
+        end = pos + term_len + 4 * num_offsets
+        if end > len(data):
+            raise ValueError("Index shard is truncated")
+        term = data[pos : pos + term_len].decode()
+        pos += term_len
+        offsets = array("I")
+        offsets.frombytes(data[pos:end])
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        pos = end
+        postings[term] = offsets
+    if pos != len(data):
+        raise ValueError("Index shard has trailing data")
+    return postings
+
+
+@dataclass
+class SearchStats:
+    files: int = 0
+    shards_opened: int = 0
+
+
+class CorpusIndex:
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        manifest_path = self.directory / MANIFEST_NAME
+        # file name -> (shard name, bloom summary)
+        self.files: dict[str, tuple[str, int]] = {}
+        if manifest_path.exists():
+            for entry in json.loads(manifest_path.read_text()):
+                self.files[entry["file"]] = (entry["shard"], int(entry["bloom"], 16))
+        self.last_search = SearchStats()
+
+    def _save_manifest(self):
+        manifest = [
+            {"file": file, "shard": shard, "bloom": f"{bloom:x}"}
+            for file, (shard, bloom) in self.files.items()
+        ]
+        _write_atomically(
+            self.directory / MANIFEST_NAME, json.dumps(manifest, indent=1).encode()
+        )
+
+    def add(
+        self,
+        disassembler: Disassembler,
+        file: str,
+        file_contents: bytes,
+        save_manifest: bool = True,
+    ):
+        """Index one binary under the name `file`, replacing any earlier index of it"""
+        columnar = disassembler.decode_columnar(file_contents)
+        postings: dict[str, array] = {}
+        for i in range(len(columnar)):
+            for term in instruction_terms(columnar.instruction(i)):
+                postings.setdefault(term, array("I")).append(columnar.offsets[i])
+
+        shard = hashlib.sha256(file.encode()).hexdigest()[:32] + SHARD_SUFFIX
+        _write_atomically(self.directory / shard, _pack_shard(postings))
+        self.files[file] = (shard, bloom_summary(set(postings)))
+        if save_manifest:
+            self._save_manifest()
+
+    def add_files(self, disassembler: Disassembler, paths: list[str | Path]):
+        for path in paths:
+            self.add(disassembler, str(path), Path(path).read_bytes(), False)
+        self._save_manifest()
+
+    def search(self, *terms: str) -> Iterator[tuple[str, int]]:
+        """(file, offset) of every instruction that has all of terms"""
+        if not terms:
+            raise ValueError("Search needs at least one term")
+        self.last_search = stats = SearchStats()
+        for file, (shard, bloom) in self.files.items():
+            stats.files += 1
+            if not all(bloom_may_contain(bloom, term) for term in terms):
+                continue
+            stats.shards_opened += 1
+            try:
+                postings = _unpack_shard((self.directory / shard).read_bytes())
+            except ValueError as e:
+                raise ValueError(
+                    f"Corrupt index shard {shard} of {file}, add the file again"
+                ) from e
+            lists = sorted((postings.get(term, array("I")) for term in terms), key=len)
+            smallest, others = lists[0], lists[1:]
+            for offset in smallest:
+                if all(_contains(other, offset) for other in others):
+                    yield file, offset
+
+
+def _contains(sorted_offsets: array, offset: int) -> bool:
+    ind = bisect_left(sorted_offsets, offset)
+    return ind < len(sorted_offsets) and sorted_offsets[ind] == offset
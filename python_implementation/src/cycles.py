@@ -0,0 +1,372 @@
+"""
+8086 clock cycle estimates for decoded code.
+
+Every variation in the config has a timing per operand form, e.g. "mem,reg", taken
+from the 8086 user's manual. Instructions with a memory operand add the effective
+address calculation, which depends only on the MemoryOperand's base and whether it
+has a displacement, and 4 cycles for every word transferred to or from an odd
+address. An address is only known to be odd for direct addresses, anything relative
+to a register is assumed even. Jumps cost one amount when taken and one when not.
+
+Backward jumps mark loops, from their target to the jump. A loop's cost is one trip
+through its body with the backward jump taken. Regions are the straight line runs
+between jump targets and jumps, ranked inner loops first, then by cycles.
+"""
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Self
+
+from python_implementation.src.base.schema import InstructionSchema, NamedField
+from python_implementation.src.columnar import ABSENT, ColumnarDisassembly
+from python_implementation.src.disassembled import (
+    DisassembledBinaryInstruction,
+    DisassembledInstruction,
+    DisassembledUnaryInstruction,
+)
+from python_implementation.src.intermediates.operands import (
+    ImmediateOperand,
+    MemoryOperand,
+    Operand,
+    SegmentRegOperand,
+)
+
+ODD_ADDRESS_PENALTY = 4
+
+
+@dataclass(frozen=True)
+class Timing:
+    """
+    :param transfers: Word transfers to or from the memory operand, each pays the odd
+        address penalty
+    :param effective_address: Whether the effective address calculation is extra
+    """
+
+    cycles: int
+    transfers: int = 0
+    effective_address: bool = True
+
+
+@dataclass(frozen=True)
+class JumpTiming:
+    not_taken: int
+    taken: int
+
+
+_ALU_TIMINGS = [
+    # Reg/Memory and register to either
+    {"reg,reg": Timing(3), "reg,mem": Timing(9, 1), "mem,reg": Timing(16, 2)},
+    # Immediate to Register/Memory
+    {"reg,imm": Timing(4), "mem,imm": Timing(17, 2)},
+    # Immediate to Accumulator
+    {"reg,imm": Timing(4)},
+]
+_CMP_TIMINGS = [
+    {"reg,reg": Timing(3), "reg,mem": Timing(9, 1), "mem,reg": Timing(9, 1)},
+    {"reg,imm": Timing(4), "mem,imm": Timing(10, 1)},
+    {"reg,imm": Timing(4)},
+]
+_CONDITIONAL_JUMP = JumpTiming(4, 16)
+
+# mnemonic -> timings of its variations in config order, by operand form
+CYCLE_TABLE: dict[str, list[dict[str, Timing]] | JumpTiming] = {
+    "mov": [
+        # Register/Memory To/From Register
+        {"reg,reg": Timing(2), "reg,mem": Timing(8, 1), "mem,reg": Timing(9, 1)},
+        # Immediate to Register/Memory
+        {"reg,imm": Timing(4), "mem,imm": Timing(10, 1)},
+        # Immediate to Register
+        {"reg,imm": Timing(4)},
+        # Memory to Accumulator
+        {"reg,mem": Timing(10, 1, effective_address=False)},
+        # Accumulator to Memory
+        {"mem,reg": Timing(10, 1, effective_address=False)},
+        # Register/Memory to segment register
+        {"seg,reg": Timing(2), "seg,mem": Timing(8, 1)},
+        # Segment register to Register/Memory
+        {"reg,seg": Timing(2), "mem,seg": Timing(9, 1)},
+    ],
+    # the stack is assumed word aligned, only transfers of a memory operand count
+    "push": [{"reg": Timing(11), "mem": Timing(16, 1)}, {"reg": Timing(11)}],
+    "pop": [{"reg": Timing(8), "mem": Timing(17, 1)}, {"reg": Timing(8)}],
+    "add": _ALU_TIMINGS,
+    "sub": _ALU_TIMINGS,
+    "cmp": _CMP_TIMINGS,
+    **{
+        mnemonic: _CONDITIONAL_JUMP
+        for mnemonic in (
+            "je jl jle jb jbe jp jo js jne jnl jg jnb ja jnp jno jns".split()
+        )
+    },
+    "loop": JumpTiming(5, 17),
+    "loopz": JumpTiming(6, 18),
+    "loopnz": JumpTiming(5, 19),
+    "jcxz": JumpTiming(6, 18),
+}
+
+# base register(s) of a MemoryOperand -> cycles without and with a displacement
+_EFFECTIVE_ADDRESS_CYCLES = {
+    ("bx", "si"): (7, 11),
+    ("bp", "di"): (7, 11),
+    ("bx", "di"): (8, 12),
+    ("bp", "si"): (8, 12),
+    ("si",): (5, 9),
+    ("di",): (5, 9),
+    ("bp",): (5, 9),
+    ("bx",): (5, 9),
+}
+DIRECT_ADDRESS_CYCLES = 6
+
+
+def effective_address_cycles(
+    op: MemoryOperand, has_displacement: bool | None = None
+) -> int:
+    """
+    :param has_displacement: Whether the encoding has a displacement, which it can with
+        a value of 0, e.g. [bp]. Taken from the operand's value when not given
+    """
+    if op.memory_base is None:
+        return DIRECT_ADDRESS_CYCLES
+    if has_displacement is None:
+        has_displacement = op.displacement != 0
+    base = tuple(MemoryOperand.RM_TO_EFFECTIVE_ADDR_CALC[op.memory_base])
+    return _EFFECTIVE_ADDRESS_CYCLES[base][has_displacement]
+
+
+def is_odd_address(op: MemoryOperand) -> bool:
+    """Only direct addresses are known, register relative ones are assumed even"""
+    return op.memory_base is None and op.displacement % 2 == 1
+
+
+def _operand_form(op: Operand) -> str:
+    if isinstance(op, MemoryOperand):
+        return "mem"
+    if isinstance(op, ImmediateOperand):
+        return "imm"
+    if isinstance(op, SegmentRegOperand):
+        return "seg"
+    return "reg"
+
+
+@dataclass(frozen=True)
+class CycleEstimate:
+    """
+    cycles is the total of base, effective address and penalty cycles. For a jump it
+    is the cost when not taken, taken_cycles the cost when taken.
+    """
+
+    cycles: int
+    base: int
+    effective_address: int = 0
+    penalty: int = 0
+    taken_cycles: int | None = None
+
+    def __str__(self) -> str:
+        if self.taken_cycles is not None:
+            return f"{self.cycles} ({self.taken_cycles} taken)"
+        parts = [str(self.base)]
+        if self.effective_address:
+            parts.append(f"{self.effective_address}ea")
+        if self.penalty:
+            parts.append(f"{self.penalty}p")
+        if len(parts) == 1:
+            return str(self.cycles)
+        return f"{self.cycles} ({' + '.join(parts)})"
+
+
+class CycleEstimator:
+    def __init__(self, schemas: list[InstructionSchema]) -> None:
+        # the variation of each schema is its position among those of its mnemonic
+        seen: Counter[str] = Counter()
+        self.variations = []
+        for schema in schemas:
+            self.variations.append(seen[schema.mnemonic])
+            seen[schema.mnemonic] += 1
+        self.schemas = schemas
+
+    def estimate(
+        self,
+        schema_ind: int,
+        inst: DisassembledInstruction,
+        has_displacement: bool | None = None,
+    ) -> CycleEstimate:
+        """:param has_displacement: See effective_address_cycles"""
+        timings = CYCLE_TABLE.get(inst.mnemonic)
+        if isinstance(timings, JumpTiming):
+            return CycleEstimate(
+                timings.not_taken, timings.not_taken, taken_cycles=timings.taken
+            )
+
+        if isinstance(inst, DisassembledBinaryInstruction):
+            operands = [inst.dest, inst.source]
+        elif isinstance(inst, DisassembledUnaryInstruction):
+            operands = [inst.op]
+        else:
+            operands = []
+        form = ",".join(_operand_form(op) for op in operands)
+        variation = self.variations[schema_ind]
+        if timings is None or form not in timings[variation]:
+            raise ValueError(
+                f"No cycle timing for {inst.mnemonic} variation {variation} with operands {form}"
+            )
+
+        timing = timings[variation][form]
+        memory = next((op for op in operands if isinstance(op, MemoryOperand)), None)
+        if memory is None:
+            return CycleEstimate(timing.cycles, timing.cycles)
+        ea = (
+            effective_address_cycles(memory, has_displacement)
+            if timing.effective_address
+            else 0
+        )
+        penalty = (
+            ODD_ADDRESS_PENALTY * timing.transfers
+            if memory.word and is_odd_address(memory)
+            else 0
+        )
+        return CycleEstimate(timing.cycles + ea + penalty, timing.cycles, ea, penalty)
+
+    def estimate_columnar(self, columnar: ColumnarDisassembly) -> list[CycleEstimate]:
+        mods = columnar.fields[NamedField.MOD]
+        return [
+            self.estimate(
+                int(columnar.schema_ids[i]),
+                columnar.instruction(i),
+                mods[i] in (0b01, 0b10) if mods[i] != ABSENT else None,
+            )
+            for i in range(len(columnar))
+        ]
+
+
+@dataclass(frozen=True)
+class Loop:
+    """Instructions [start, end) by index, entered at start and closed by the jump at end - 1"""
+
+    start: int
+    end: int
+    start_offset: int
+    end_offset: int
+    iteration_cycles: int
+
+
+@dataclass(frozen=True)
+class Region:
+    start: int
+    end: int
+    start_offset: int
+    end_offset: int
+    cycles: int
+    loop_depth: int
+
+
+@dataclass
+class CostReport:
+    columnar: ColumnarDisassembly
+    estimates: list[CycleEstimate]
+    loops: list[Loop] = field(init=False, default_factory=list)
+    regions: list[Region] = field(init=False, default_factory=list)
+
+    def __post_init__(self):
+        self._offset_to_ind = {
+            int(offset): i for i, offset in enumerate(self.columnar.offsets)
+        }
+        self._find_loops()
+        self._find_regions()
+
+    @classmethod
+    def from_columnar(
+        cls, columnar: ColumnarDisassembly, estimator: CycleEstimator
+    ) -> Self:
+        return cls(columnar, estimator.estimate_columnar(columnar))
+
+    def _jump_target_ind(self, ind: int) -> int | None:
+        columnar = self.columnar
+        if columnar.fields[NamedField.IP_INC8][ind] == ABSENT:
+            return None
+        target = (
+            int(columnar.offsets[ind])
+            + int(columnar.sizes[ind])
+            + int(columnar.displacements[ind])
+        )
+        return self._offset_to_ind.get(target)
+
+    def _end_offset(self, end: int) -> int:
+        if end < len(self.columnar):
+            return int(self.columnar.offsets[end])
+        return int(self.columnar.offsets[-1]) + int(self.columnar.sizes[-1])
+
+    def _find_loops(self):
+        for ind in range(len(self.columnar)):
+            target = self._jump_target_ind(ind)
+            if target is None or target > ind:
+                continue
+            iteration = sum(e.cycles for e in self.estimates[target:ind])
+            iteration += self.estimates[ind].taken_cycles or 0
+            self.loops.append(
+                Loop(
+                    target,
+                    ind + 1,
+                    int(self.columnar.offsets[target]),
+                    self._end_offset(ind + 1),
+                    iteration,
+                )
+            )
+        self.loops.sort(key=lambda loop: loop.iteration_cycles, reverse=True)
+
+    def _find_regions(self):
+        num_insts = len(self.columnar)
+        leaders = {0, num_insts}
+        for ind in range(num_insts):
+            if self.estimates[ind].taken_cycles is not None:
+                leaders.add(ind + 1)
+                target = self._jump_target_ind(ind)
+                if target is not None:
+                    leaders.add(target)
+        bounds = sorted(leaders)
+        for start, end in zip(bounds, bounds[1:]):
+            depth = sum(loop.start <= start and end <= loop.end for loop in self.loops)
+            self.regions.append(
+                Region(
+                    start,
+                    end,
+                    int(self.columnar.offsets[start]),
+                    self._end_offset(end),
+                    sum(e.cycles for e in self.estimates[start:end]),
+                    depth,
+                )
+            )
+        self.regions.sort(
+            key=lambda region: (region.loop_depth, region.cycles), reverse=True
+        )
+
+    @property
+    def total_cycles(self) -> int:
+        """Straight through, no jump taken"""
+        return sum(e.cycles for e in self.estimates)
+
+    def annotated_listing(self) -> str:
+        """The listing with `; +cycles = running total` after every instruction"""
+        lines = ["bits 16"]
+        total = 0
+        estimates = iter(self.estimates)
+        for line in self.columnar.to_disassembly().instructions_with_labels:
+            if isinstance(line, str):
+                lines.append(line)
+                continue
+            estimate = next(estimates)
+            total += estimate.cycles
+            lines.append(f"{line} ; +{estimate} = {total}")
+        return "\n".join(lines)
+
+    def __str__(self) -> str:
+        lines = [f"total cycles straight through: {self.total_cycles}", "loops:"]
+        lines.extend(
+            f"  [{loop.start_offset}, {loop.end_offset}) {loop.iteration_cycles} cycles per iteration"
+            for loop in self.loops
+        )
+        lines.append("regions:")
+        lines.extend(
+            f"  [{region.start_offset}, {region.end_offset}) {region.cycles} cycles, loop depth {region.loop_depth}"
+            for region in self.regions
+        )
+        return "\n".join(lines)
@@ -0,0 +1,183 @@
+"""
+Wire protocol, one request/response pair per frame, many frames per connection:
+    request:  u32 big endian payload length, raw binary payload
+    response: u8 status, u32 big endian payload length, utf-8 payload
+The payload of an OK response is the listing, otherwise it is an error message.
+"""
+
+import argparse
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+import sys
+import threading
+from concurrent.futures import Future
+from typing import override
+
+from python_implementation.src.compressed_io import read_file
+from python_implementation.src.disassembler import Disassembler
+
+FRAME_HEADER = struct.Struct(">I")
+RESPONSE_HEADER = struct.Struct(">BI")
+STATUS_OK, STATUS_ERROR, STATUS_BUSY = 0, 1, 2
+MAX_REQUEST_SIZE = 64 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def _recv_exactly(sock: socket.socket, num_bytes: int) -> bytes | None:
+    buf = bytearray(num_bytes)
+    view = memoryview(buf)
+    received = 0
+    while received < num_bytes:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            if received == 0:
+                return None
+            raise ConnectionError("Connection closed in the middle of a frame")
+        received += n
+    return bytes(buf)
+
+
+def _send_response(sock: socket.socket, status: int, payload: bytes):
+    sock.sendall(RESPONSE_HEADER.pack(status, len(payload)) + payload)
+
+
+class DisassemblyRequestHandler(socketserver.BaseRequestHandler):
+    server: "DisassemblyServer"
+
+    @override
+    def handle(self) -> None:
+        while (header := _recv_exactly(self.request, FRAME_HEADER.size)) is not None:
+            (payload_size,) = FRAME_HEADER.unpack(header)
+            if payload_size > MAX_REQUEST_SIZE:
+                _send_response(self.request, STATUS_ERROR, b"request too large")
+                return
+            file_contents = _recv_exactly(self.request, payload_size)
+            if file_contents is None:
+                # closed before sending the payload it announced
+                return
+            _send_response(self.request, *self.server.disassemble(file_contents))
+
+
+class DisassemblyServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Keeps a warm `Disassembler` and serves it over a unix socket.
+
+    Every connection gets a thread that only reads frames and writes responses, so
+    idle connections cost a blocked thread and no decode worker. Requests are
+    handed to a fixed pool of worker threads through a bounded queue, and when the
+    queue is full a request gets a busy response instead of piling up without limit.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: str,
+        disassembler: Disassembler,
+        num_workers: int = 4,
+        max_queued: int = 16,
+    ) -> None:
+        super().__init__(socket_path, DisassemblyRequestHandler)
+        self.disassembler = disassembler
+        self.pending: queue.Queue[tuple[bytes, Future[str]] | None] = queue.Queue(
+            max_queued
+        )
+        self.workers = [
+            threading.Thread(target=self._work, daemon=True) for _ in range(num_workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def disassemble(self, file_contents: bytes) -> tuple[int, bytes]:
+        """:returns: The status and payload of the response"""
+        future: Future[str] = Future()
+        try:
+            self.pending.put_nowait((file_contents, future))
+        except queue.Full:
+            return STATUS_BUSY, b"server busy"
+        try:
+            return STATUS_OK, future.result().encode()
+        except Exception as e:
+            return STATUS_ERROR, repr(e).encode()
+
+    def _work(self):
+        while (item := self.pending.get()) is not None:
+            file_contents, future = item
+            try:
+                future.set_result(str(self.disassembler.decode(file_contents)))
+            except Exception as e:
+                logger.exception("Failed to decode request")
+                future.set_exception(e)
+
+    @override
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        for _ in self.workers:
+            self.pending.put(None)
+
+
+class DisassemblyClient:
+    def __init__(self, socket_path: str) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(socket_path)
+
+    def disassemble(self, file_contents: bytes) -> str:
+        self.sock.sendall(FRAME_HEADER.pack(len(file_contents)) + file_contents)
+        header = _recv_exactly(self.sock, RESPONSE_HEADER.size)
+        if header is None:
+            raise ConnectionError("Server closed the connection")
+        status, payload_size = RESPONSE_HEADER.unpack(header)
+        payload = _recv_exactly(self.sock, payload_size)
+        if payload is None:
+            raise ConnectionError("Server closed the connection")
+        payload = payload.decode()
+        if status != STATUS_OK:
+            raise RuntimeError(f"Disassembly server error ({status}): {payload}")
+        return payload
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def main(argv: list[str] | None = None):
+    arg_parser = argparse.ArgumentParser(description="8086 disassembly daemon")
+    sub_parsers = arg_parser.add_subparsers(dest="command", required=True)
+    serve_parser = sub_parsers.add_parser("serve")
+    serve_parser.add_argument("socket_path")
+    serve_parser.add_argument("--workers", type=int, default=4)
+    serve_parser.add_argument("--max-queued", type=int, default=16)
+    decode_parser = sub_parsers.add_parser("decode")
+    decode_parser.add_argument("socket_path")
+    decode_parser.add_argument("binary_paths", nargs="+")
+    args = arg_parser.parse_args(argv)
+
+    if args.command == "serve":
+        with DisassemblyServer(
+            args.socket_path,
+            Disassembler.from_config(),
+            num_workers=args.workers,
+            max_queued=args.max_queued,
+        ) as server:
+            server.serve_forever()
+    else:
+        with DisassemblyClient(args.socket_path) as client:
+            for binary_path in args.binary_paths:
+                file_contents = read_file(binary_path)
+                sys.stdout.write(client.disassemble(file_contents) + "\n")
+
+
+if __name__ == "__main__":
+    main()
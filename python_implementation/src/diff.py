@@ -0,0 +1,339 @@
+"""
+Diff two binaries instruction by instruction instead of as rendered text.
+
+Each instruction is reduced to a hash of its bytes, except jumps which hash only
+their opcode byte, since their displacement changes whenever code between them and
+their target moves. Alignment then works on the hash lists:
+
+1. The common prefix and suffix are skipped by comparing list slices of doubling
+   length, so unchanged code costs a few C level compares, not a python loop.
+2. In what is left, runs of ANCHOR_RUN instructions that occur exactly once on each
+   side become anchors, the longest chain of them in the same order on both sides is
+   kept (patience diff), each anchor is extended as far as both sides agree, and the
+   gaps between anchors are aligned the same way.
+3. A gap without anchors is either small enough for difflib or reported whole.
+4. Every jump aligned with a jump on the other side is checked to resolve to the
+   instruction aligned with its target, or else it is reported as a changed
+   instruction of its own. A jump whose target is not an instruction start hashes
+   its displacement too, so it only aligns with a jump of the same displacement.
+
+Anchors are only tried at runs whose rolling hash has its low bits zero, so both
+sides pick the same places by content. Each stream keeps those places for a few
+numbers of low bits, and a gap uses the level that gives it about ANCHORS_PER_GAP
+candidates, found by bisection. Aligning a gap therefore costs about the same
+however big it is, and the whole diff scales with the number of changes.
+
+Only the changed hunks are ever decoded to text.
+"""
+
+import difflib
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import Self
+
+from python_implementation.src.base.schema import NamedField
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.utils import as_signed_int
+
+ANCHOR_RUN = 4
+ANCHORS_PER_GAP = 64
+# level i holds the runs with the low ANCHOR_LEVEL_BITS * i bits of their hash zero
+ANCHOR_LEVEL_BITS = 2
+NUM_ANCHOR_LEVELS = 10
+# gaps without anchors up to this many instructions a side are aligned by difflib
+SMALL_GAP = 256
+ROLLING_MODULUS = (1 << 61) - 1
+ROLLING_BASE = 1_000_003
+ROLLING_BASE_POW = pow(ROLLING_BASE, ANCHOR_RUN, ROLLING_MODULUS)
+
+
+@dataclass(frozen=True)
+class DiffHunk:
+    """Instructions [old_start, old_end) were replaced by [new_start, new_end)"""
+
+    old_start: int
+    old_end: int
+    new_start: int
+    new_end: int
+
+
+@dataclass(frozen=True)
+class InstructionStream:
+    file_contents: bytes
+    # instruction start offsets followed by the end of input
+    boundaries: array
+    hashes: list[int]
+    # rolling hash of the ANCHOR_RUN instructions starting at each index
+    run_hashes: list[int]
+    # per level, sorted start indices of the runs that are anchor candidates
+    anchor_levels: list[array]
+    # index of each jump that lands on an instruction start, or the end of input,
+    # to the index of that instruction
+    jump_targets: dict[int, int]
+
+    @classmethod
+    def from_bytes(cls, disassembler: Disassembler, file_contents: bytes) -> Self:
+        opcode_table = disassembler.opcode_table
+        is_jump = [
+            NamedField.IP_INC8 in plan.schema.fields for plan in opcode_table.plans
+        ]
+        boundaries = disassembler.scan(file_contents)
+        boundaries.append(len(file_contents))
+        hashes = []
+        jump_targets = {}
+        for ind, (start, end) in enumerate(zip(boundaries, boundaries[1:])):
+            schema_ind, _ = opcode_table.lookup(file_contents, start)
+            if is_jump[schema_ind]:
+                # short jumps, the displacement is the last byte
+                target = end + as_signed_int(file_contents[end - 1])
+                target_ind = bisect_left(boundaries, target)
+                if target_ind < len(boundaries) and boundaries[target_ind] == target:
+                    jump_targets[ind] = target_ind
+                    end = start + 1
+            hashes.append(hash(file_contents[start:end]))
+
+        run_hashes = []
+        anchor_levels = [array("I") for _ in range(NUM_ANCHOR_LEVELS)]
+        rolling = 0
+        for ind, inst_hash in enumerate(hashes):
+            rolling = rolling * ROLLING_BASE + inst_hash
+            if ind >= ANCHOR_RUN:
+                rolling -= hashes[ind - ANCHOR_RUN] * ROLLING_BASE_POW
+            rolling %= ROLLING_MODULUS
+            if ind < ANCHOR_RUN - 1:
+                continue
+            run_hashes.append(rolling)
+            for level, starts in enumerate(anchor_levels):
+                if rolling & ((1 << ANCHOR_LEVEL_BITS * level) - 1):
+                    break
+                starts.append(ind - ANCHOR_RUN + 1)
+        return cls(
+            file_contents, boundaries, hashes, run_hashes, anchor_levels, jump_targets
+        )
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def region(self, start: int, end: int) -> bytes:
+        """Bytes of instructions [start, end)"""
+        return self.file_contents[self.boundaries[start] : self.boundaries[end]]
+
+    def unique_runs(self, lo: int, hi: int, level: int) -> dict[int, int]:
+        """Run hash -> start of the candidate runs within [lo, hi) whose hash is unique"""
+        starts = self.anchor_levels[level]
+        seen: dict[int, int] = {}
+        repeated = set()
+        for ind in range(
+            bisect_left(starts, lo), bisect_left(starts, hi - ANCHOR_RUN + 1)
+        ):
+            run_hash = self.run_hashes[starts[ind]]
+            if run_hash in seen:
+                repeated.add(run_hash)
+            else:
+                seen[run_hash] = starts[ind]
+        for run_hash in repeated:
+            del seen[run_hash]
+        return seen
+
+
+def _common_run(
+    a: list[int], b: list[int], a_ind: int, b_ind: int, limit: int, step: int
+) -> int:
+    """
+    How many elements match going forward (step 1) or backward (step -1) from the
+    given indices, found by comparing slices of doubling then halving length.
+    """
+
+    def same(skip: int, length: int) -> bool:
+        """Whether the length elements after the first skip match"""
+        if step == 1:
+            a_lo, b_lo = a_ind + skip, b_ind + skip
+        else:
+            a_lo, b_lo = a_ind - skip - length + 1, b_ind - skip - length + 1
+        return a[a_lo : a_lo + length] == b[b_lo : b_lo + length]
+
+    matched, length = 0, 1
+    while matched + length <= limit and same(matched, length):
+        matched += length
+        length *= 2
+    while length > 1:
+        length //= 2
+        if matched + length <= limit and same(matched, length):
+            matched += length
+    return matched
+
+
+def _longest_increasing_chain(pairs: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Longest subsequence of (a, b) pairs, sorted by a, whose b values increase"""
+    tails: list[int] = []
+    tail_inds: list[int] = []
+    prev = [-1] * len(pairs)
+    for ind, (_, b) in enumerate(pairs):
+        pos = bisect_left(tails, b)
+        if pos == len(tails):
+            tails.append(b)
+            tail_inds.append(ind)
+        else:
+            tails[pos] = b
+            tail_inds[pos] = ind
+        prev[ind] = tail_inds[pos - 1] if pos > 0 else -1
+
+    chain = []
+    ind = tail_inds[-1] if tail_inds else -1
+    while ind != -1:
+        chain.append(pairs[ind])
+        ind = prev[ind]
+    return chain[::-1]
+
+
+def _anchor_level(gap: int) -> int:
+    return min(
+        NUM_ANCHOR_LEVELS - 1,
+        max(0, (gap // ANCHORS_PER_GAP).bit_length() - 1) // ANCHOR_LEVEL_BITS,
+    )
+
+
+def _align(
+    old: InstructionStream,
+    new: InstructionStream,
+    a_lo: int,
+    a_hi: int,
+    b_lo: int,
+    b_hi: int,
+) -> Iterator[DiffHunk]:
+    a, b = old.hashes, new.hashes
+    prefix = _common_run(a, b, a_lo, b_lo, min(a_hi - a_lo, b_hi - b_lo), 1)
+    a_lo, b_lo = a_lo + prefix, b_lo + prefix
+    suffix = _common_run(a, b, a_hi - 1, b_hi - 1, min(a_hi - a_lo, b_hi - b_lo), -1)
+    a_hi, b_hi = a_hi - suffix, b_hi - suffix
+    if a_lo == a_hi and b_lo == b_hi:
+        return
+    if a_lo == a_hi or b_lo == b_hi:
+        yield DiffHunk(a_lo, a_hi, b_lo, b_hi)
+        return
+
+    level = _anchor_level(max(a_hi - a_lo, b_hi - b_lo))
+    chain = []
+    # a sparse level may have no anchor in the gap, denser ones are tried before giving up
+    while not chain and level >= 0:
+        a_runs = old.unique_runs(a_lo, a_hi, level)
+        b_runs = new.unique_runs(b_lo, b_hi, level)
+        chain = _longest_increasing_chain(
+            sorted(
+                (a_start, b_runs[run_hash])
+                for run_hash, a_start in a_runs.items()
+                if run_hash in b_runs
+            )
+        )
+        level -= 1
+
+    if chain:
+        for a_start, b_start in chain:
+            # already matched by extending an earlier anchor
+            if a_start < a_lo or b_start < b_lo:
+                continue
+            if a[a_start : a_start + ANCHOR_RUN] != b[b_start : b_start + ANCHOR_RUN]:
+                continue  # rolling hash collision
+            yield from _align(old, new, a_lo, a_start, b_lo, b_start)
+            a_lo, b_lo = a_start + ANCHOR_RUN, b_start + ANCHOR_RUN
+            extended = _common_run(a, b, a_lo, b_lo, min(a_hi - a_lo, b_hi - b_lo), 1)
+            a_lo, b_lo = a_lo + extended, b_lo + extended
+        yield from _align(old, new, a_lo, a_hi, b_lo, b_hi)
+    elif a_hi - a_lo <= SMALL_GAP and b_hi - b_lo <= SMALL_GAP:
+        matcher = difflib.SequenceMatcher(
+            None, a[a_lo:a_hi], b[b_lo:b_hi], autojunk=False
+        )
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag != "equal":
+                yield DiffHunk(a_lo + i1, a_lo + i2, b_lo + j1, b_lo + j2)
+    else:
+        yield DiffHunk(a_lo, a_hi, b_lo, b_hi)
+
+
+def _retargeted_jumps(
+    old: InstructionStream, new: InstructionStream, hunks: list[DiffHunk]
+) -> Iterator[DiffHunk]:
+    """Jumps aligned with each other whose targets are not aligned with each other"""
+    # (old start, new start, length) of the runs of aligned instructions
+    matched = []
+    old_pos = new_pos = 0
+    for hunk in hunks:
+        matched.append((old_pos, new_pos, hunk.old_start - old_pos))
+        old_pos, new_pos = hunk.old_end, hunk.new_end
+    matched.append((old_pos, new_pos, len(old) - old_pos))
+    matched_starts = [old_start for old_start, _, _ in matched]
+    # a target at the start of a hunk goes to the same place if the other one goes to
+    # the start of the hunk on its side
+    hunk_starts = {hunk.old_start: hunk.new_start for hunk in hunks}
+
+    def aligned_with(old_ind: int) -> int | None:
+        old_start, new_start, length = matched[
+            bisect_left(matched_starts, old_ind + 1) - 1
+        ]
+        if old_ind - old_start < length or old_ind == len(old):
+            return new_start + old_ind - old_start
+        return None
+
+    for old_ind, old_target in old.jump_targets.items():
+        new_ind = aligned_with(old_ind)
+        if new_ind is None:
+            continue  # in a hunk already
+        new_target = new.jump_targets.get(new_ind)
+        if new_target is None or (
+            new_target != aligned_with(old_target)
+            and not (
+                old_target in hunk_starts and new_target == hunk_starts[old_target]
+            )
+        ):
+            yield DiffHunk(old_ind, old_ind + 1, new_ind, new_ind + 1)
+
+
+def diff_streams(old: InstructionStream, new: InstructionStream) -> list[DiffHunk]:
+    aligned = list(_align(old, new, 0, len(old), 0, len(new)))
+    aligned.extend(_retargeted_jumps(old, new, aligned))
+    hunks: list[DiffHunk] = []
+    for hunk in sorted(aligned, key=lambda hunk: (hunk.old_start, hunk.new_start)):
+        # neighbouring hunks from different gaps read better as one
+        if (
+            hunks
+            and hunks[-1].old_end == hunk.old_start
+            and hunks[-1].new_end == hunk.new_start
+        ):
+            hunk = DiffHunk(
+                hunks[-1].old_start, hunk.old_end, hunks[-1].new_start, hunk.new_end
+            )
+            hunks.pop()
+        hunks.append(hunk)
+    return hunks
+
+
+def diff_binaries(
+    disassembler: Disassembler, old_contents: bytes, new_contents: bytes
+) -> str:
+    """
+    The changed hunks as text. Each hunk header gives the byte offset and instruction
+    count on each side, jumps are shown with relative displacements.
+    """
+    old = InstructionStream.from_bytes(disassembler, old_contents)
+    new = InstructionStream.from_bytes(disassembler, new_contents)
+    lines = []
+    for hunk in diff_streams(old, new):
+        lines.append(
+            f"@@ -{old.boundaries[hunk.old_start]},{hunk.old_end - hunk.old_start} "
+            f"+{new.boundaries[hunk.new_start]},{hunk.new_end - hunk.new_start} @@"
+        )
+        lines.extend(
+            f"-{inst}"
+            for inst in disassembler.iter_decode(
+                old.region(hunk.old_start, hunk.old_end)
+            )
+        )
+        lines.extend(
+            f"+{inst}"
+            for inst in disassembler.iter_decode(
+                new.region(hunk.new_start, hunk.new_end)
+            )
+        )
+    return "\n".join(lines)
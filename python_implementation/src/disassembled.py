@@ -1,7 +1,6 @@
-from dataclasses import InitVar, dataclass
-from functools import cached_property
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field, replace
 from typing import override
-from venv import logger
 
 from python_implementation.src.base.schema import NamedField
 from python_implementation.src.intermediates.operands import (
@@ -9,7 +8,18 @@ from python_implementation.src.intermediates.operands import (
     MemoryOperand,
     Operand,
 )
-from python_implementation.src.utils import as_signed_int
+
+
+def _warn(message: str):
+    # logging is imported on first use, it is a large share of the cold start of a
+    # process that decodes one small file and has nothing to log
+    import logging
+
+    logging.getLogger(__name__).warning(message)
+
+
+# bump whenever the rendered listing changes, anything cached from an older one is stale
+RENDERER_VERSION = 1
 
 
 @dataclass(frozen=True)
@@ -49,65 +59,143 @@ class DisassembledBinaryInstruction:
         return f"{self.mnemonic} {self.dest}, {size_spec}{self.source}"
 
 
-@dataclass
+@dataclass(frozen=True)
 class DisassembledJumpInstruction:
     mnemonic: str
-    disp: InitVar[int]
+    displ: int
     inst_size: int
     label: str | None = None
 
-    def __post_init__(self, disp):
-        self.displ = as_signed_int(disp)
-
     @override
     def __str__(self) -> str:
-        destination = self.label or f"${as_signed_int(self.displ):+}"
+        destination = self.label or f"${self.displ:+}"
         return f"{self.mnemonic} {destination}"
 
     def get_abs_label_offset(self, curr_byte_ind: int):
         return curr_byte_ind + self.inst_size + self.displ
 
+    def with_label(self, label: str) -> "DisassembledJumpInstruction":
+        return replace(self, label=label)
+
 
 type DisassembledInstruction = DisassembledNullaryInstruction | DisassembledUnaryInstruction | DisassembledBinaryInstruction | DisassembledJumpInstruction
 
 
 @dataclass(frozen=True)
 class Disassembly:
+    """
+    Immutable once built, labels are resolved eagerly into labelled copies of the
+    jump instructions so a Disassembly can be shared between threads.
+    """
+
     instructions: list[DisassembledInstruction]
+    instructions_with_labels: list[DisassembledInstruction | str] = field(
+        init=False, repr=False, compare=False
+    )
 
-    @cached_property
-    def instructions_with_labels(self) -> list[DisassembledInstruction | str]:
+    def __post_init__(self):
+        object.__setattr__(self, "instructions_with_labels", self._resolve_labels())
+
+    def _resolve_labels(self) -> list[DisassembledInstruction | str]:
         curr_byte = 0
-        jump_loc_to_insts: dict[int, list[DisassembledJumpInstruction]] = {}
+        jump_targets: set[int] = set()
         for inst in self.instructions:
             if isinstance(inst, DisassembledJumpInstruction):
-                target_byte = inst.get_abs_label_offset(curr_byte)
-                jump_loc_to_insts.setdefault(target_byte, [])
-                jump_loc_to_insts[target_byte].append(inst)
+                jump_targets.add(inst.get_abs_label_offset(curr_byte))
 
             curr_byte += inst.inst_size
 
         curr_byte = 0
-        label_counter = 0
+        offset_to_label: dict[int, str] = {}
+        for inst in self.instructions:
+            if curr_byte in jump_targets:
+                offset_to_label[curr_byte] = f"label_{len(offset_to_label)}"
+            curr_byte += inst.inst_size
+
+        if len(offset_to_label) < len(jump_targets):
+            _warn(
+                f"Disassembly contains {len(jump_targets) - len(offset_to_label)} jumps pointing to middle of other instructions or out of instruction bounds"
+            )
+
+        curr_byte = 0
         result: list[DisassembledInstruction | str] = []
         for inst in self.instructions:
-            if curr_byte in jump_loc_to_insts:
-                label = f"label_{label_counter}"
-                label_counter += 1
-                for j_inst in jump_loc_to_insts.pop(curr_byte):
-                    j_inst.label = label
-                result.append(label + ":")
+            if curr_byte in offset_to_label:
+                result.append(offset_to_label[curr_byte] + ":")
 
+            if isinstance(inst, DisassembledJumpInstruction):
+                label = offset_to_label.get(inst.get_abs_label_offset(curr_byte))
+                if label is not None:
+                    inst = inst.with_label(label)
             result.append(inst)
             curr_byte += inst.inst_size
 
-        if len(jump_loc_to_insts) > 0:
-            logger.warning(
-                f"Disassembly contains {len(jump_loc_to_insts)} jumps pointing to middle of other instructions or out of instruction bounds"
-            )
-
         return result
 
+    def iter_lines(self) -> Iterator[str]:
+        yield "bits 16"
+        yield from map(str, self.instructions_with_labels)
+
     @override
     def __str__(self) -> str:
-        return "\n".join(["bits 16", *map(str, self.instructions_with_labels)])
+        return "\n".join(self.iter_lines())
+
+
+class LabelFinder:
+    """
+    Names jump targets the way Disassembly does while instructions go by, keeping
+    only the targets and a bit per byte of input for where instructions start
+    """
+
+    def __init__(self) -> None:
+        self.jump_targets: set[int] = set()
+        self.starts = bytearray()
+        self.end = 0
+
+    def add(self, inst: DisassembledInstruction):
+        if isinstance(inst, DisassembledJumpInstruction):
+            self.jump_targets.add(inst.get_abs_label_offset(self.end))
+        if self.end >> 3 >= len(self.starts):
+            self.starts.extend(bytes(len(self.starts) + 1))
+        self.starts[self.end >> 3] |= 1 << (self.end & 7)
+        self.end += inst.inst_size
+
+    def labels(self) -> dict[int, str]:
+        """Label of every jump target that starts an instruction, by offset"""
+        labelled = sorted(
+            target
+            for target in self.jump_targets
+            if 0 <= target < self.end and self.starts[target >> 3] >> (target & 7) & 1
+        )
+        if len(labelled) < len(self.jump_targets):
+            _warn(
+                f"Disassembly contains {len(self.jump_targets) - len(labelled)} jumps pointing to middle of other instructions or out of instruction bounds"
+            )
+        return {target: f"label_{ind}" for ind, target in enumerate(labelled)}
+
+
+def iter_listing_lines(
+    decode: Callable[[], Iterable[DisassembledInstruction]],
+) -> Iterator[str]:
+    """
+    The lines of str(Disassembly(list(decode()))) without holding all the
+    instructions. decode is called twice, the first pass finds the labels, the
+    second renders.
+    """
+    label_finder = LabelFinder()
+    for inst in decode():
+        label_finder.add(inst)
+    offset_to_label = label_finder.labels()
+    del label_finder
+
+    yield "bits 16"
+    curr_byte = 0
+    for inst in decode():
+        if curr_byte in offset_to_label:
+            yield offset_to_label[curr_byte] + ":"
+        if isinstance(inst, DisassembledJumpInstruction):
+            label = offset_to_label.get(inst.get_abs_label_offset(curr_byte))
+            if label is not None:
+                inst = inst.with_label(label)
+        yield str(inst)
+        curr_byte += inst.inst_size
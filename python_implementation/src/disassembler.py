@@ -0,0 +1,173 @@
+from collections.abc import Iterable, Iterator, Sequence
+from functools import cached_property
+from pathlib import Path
+from typing import TYPE_CHECKING, Self
+
+from python_implementation.src.base.config_loader import (
+    get_parsable_instructions_from_config,
+    get_schemas_hash,
+)
+from python_implementation.src.base.schema import InstructionSchema
+from python_implementation.src.disassembled import (
+    DisassembledInstruction,
+    Disassembly,
+    iter_listing_lines,
+)
+
+# the rest is imported where it is used, so a process that only decodes does not pay
+# for importing them, and FrozenDisassembler, which decodes without a trie, never
+# imports the trie or the parser
+if TYPE_CHECKING:
+    from array import array
+
+    from python_implementation.src.columnar import ColumnarDisassembly
+    from python_implementation.src.cycles import CostReport
+    from python_implementation.src.filtered import DecodeFilter
+    from python_implementation.src.opcode_table import OpcodeTable
+    from python_implementation.src.sinks import InstructionSink
+    from python_implementation.src.trie import Trie
+    from python_implementation.src.xref import XrefIndex
+
+
+class Disassembler:
+    """
+    Holds everything that only depends on the ISA config so it is built once
+    and reused for every binary, instead of once per `parse_binary` call.
+
+    Nothing here is mutated after construction, so one instance can be shared by
+    any number of threads. The opcode table is the exception, it is only built by the
+    first call that needs it, and two threads racing to build it both build the
+    same table, and likewise the schemas hash.
+    """
+
+    def __init__(self, parsable_instructions: list[InstructionSchema]) -> None:
+        from python_implementation.src.trie import Trie
+
+        self.parsable_instructions = parsable_instructions
+        self.trie: Trie = Trie.from_parsable_instructions(parsable_instructions)
+
+    @cached_property
+    def opcode_table(self) -> "OpcodeTable":
+        from python_implementation.src.opcode_table import OpcodeTable
+
+        return OpcodeTable.from_parsable_instructions(self.parsable_instructions)
+
+    @cached_property
+    def schemas_hash(self) -> str:
+        """Results persisted across processes are keyed by this"""
+        return get_schemas_hash(self.parsable_instructions)
+
+    @classmethod
+    def from_config(cls) -> Self:
+        return cls(get_parsable_instructions_from_config())
+
+    def decode(self, file_contents: bytes) -> Disassembly:
+        return Disassembly(list(self.iter_decode(file_contents)))
+
+    def iter_decode(self, file_contents: bytes) -> Iterator[DisassembledInstruction]:
+        from python_implementation.src.parser import iter_parse_binary
+
+        return iter_parse_binary(self.trie, file_contents)
+
+    def scan(self, file_contents: bytes) -> "array":
+        """Instruction start offsets only, much cheaper than a full decode"""
+        return self.opcode_table.scan(file_contents)
+
+    def decode_columnar(self, file_contents: bytes) -> "ColumnarDisassembly":
+        from python_implementation.src.columnar import ColumnarDisassembly
+
+        return ColumnarDisassembly.from_bytes(self.opcode_table, file_contents)
+
+    def decode_filtered(
+        self, file_contents: bytes, decode_filter: "DecodeFilter"
+    ) -> list[tuple[int, DisassembledInstruction]]:
+        """(offset, instruction) of only the instructions the filter selects"""
+        from python_implementation.src.filtered import iter_decode_filtered
+
+        return list(
+            iter_decode_filtered(self.opcode_table, file_contents, decode_filter)
+        )
+
+    def cost_report(self, file_contents: bytes) -> "CostReport":
+        """Estimated clock cycles per instruction, loop and region"""
+        from python_implementation.src.cycles import CostReport, CycleEstimator
+
+        return CostReport.from_columnar(
+            self.decode_columnar(file_contents),
+            CycleEstimator(self.parsable_instructions),
+        )
+
+    def xrefs(self, file_contents: bytes) -> "XrefIndex":
+        from python_implementation.src.xref import XrefIndex
+
+        return XrefIndex.from_columnar(self.decode_columnar(file_contents))
+
+    def xrefs_for_file(
+        self, path: str | Path, columnar: "ColumnarDisassembly | None" = None
+    ) -> "XrefIndex":
+        """
+        The index stored next to the binary, built and stored there if missing or stale
+
+        :param columnar: The caller's decode of the file, if it has one, the index is
+            then built from it rather than from a decode of its own
+        """
+        from python_implementation.src.compressed_io import read_file
+        from python_implementation.src.xref import XrefIndex
+
+        file_contents = read_file(path)
+        index = XrefIndex.load(path, file_contents, self.schemas_hash)
+        if index is None:
+            if columnar is None:
+                columnar = self.decode_columnar(file_contents)
+            index = XrefIndex.from_columnar(columnar)
+            index.save(path, file_contents, self.schemas_hash)
+        return index
+
+    def decode_file(self, path: str | Path) -> Disassembly:
+        """.gz, .xz and .bz2 files are decompressed first"""
+        from python_implementation.src.compressed_io import read_file
+
+        return self.decode(read_file(path))
+
+    def iter_decode_stream(
+        self, byte_stream: Iterable[int]
+    ) -> Iterator[DisassembledInstruction]:
+        """Decoded as the bytes come in, every file entry point decodes through this"""
+        from python_implementation.src.parser import iter_parse_binary
+
+        return iter_parse_binary(self.trie, byte_stream)
+
+    def iter_decode_file(self, path: str | Path) -> Iterator[DisassembledInstruction]:
+        """Decoded while the file is read and, if compressed, decompressed"""
+        from python_implementation.src.compressed_io import iter_file_bytes
+
+        return self.iter_decode_stream(iter_file_bytes(path))
+
+    def write_listing(self, input_path: str | Path, output_path: str | Path):
+        """
+        Listing written while the input is decoded, each compressed or not by suffix.
+        Neither is ever whole in memory, the input is read twice to place labels.
+        """
+        from python_implementation.src.compressed_io import write_lines_atomically
+
+        write_lines_atomically(
+            output_path, iter_listing_lines(lambda: self.iter_decode_file(input_path))
+        )
+
+    def decode_to_sinks(
+        self, input_path: str | Path, sinks: Sequence["InstructionSink"]
+    ):
+        """One decode of the file, read as it goes, feeding every sink"""
+        from python_implementation.src.sinks import run_pipeline
+
+        run_pipeline(self.iter_decode_file(input_path), sinks)
+
+    def decode_batch(
+        self, many_file_contents: Iterable[bytes], max_workers: int | None = None
+    ) -> list[Disassembly]:
+        """Decode on a thread pool, scales with threads on a free-threaded interpreter"""
+        # imported here as it is heavy and most processes never batch
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers) as pool:
+            return list(pool.map(self.decode, many_file_contents))
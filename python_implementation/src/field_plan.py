@@ -0,0 +1,92 @@
+from dataclasses import dataclass
+from typing import Self
+
+from python_implementation.src.base.schema import (
+    InstructionSchema,
+    LiteralField,
+    NamedField,
+)
+from python_implementation.src.intermediates.accumulator import DecodeAccumulator
+from python_implementation.src.utils import BITS_PER_BYTE
+
+
+@dataclass(frozen=True)
+class FieldPlan:
+    """
+    Byte level layout of one InstructionSchema, computed once so decoders that work
+    on whole bytes don't have to walk the schema bit by bit.
+
+    The header is the leading bytes made of sub-byte fields and literals (opcode and
+    mod reg rm), everything after it is whole byte named fields that may be omitted
+    depending on the header (displacements and data).
+    """
+
+    schema: InstructionSchema
+    header_size: int
+    # (byte index, mask, value) that must hold for the bytes to be this schema, one per byte
+    literal_checks: tuple[tuple[int, int, int], ...]
+    # (field, byte index, right shift, mask)
+    header_fields: tuple[tuple[NamedField, int, int, int], ...]
+    trailing_fields: tuple[NamedField, ...]
+
+    @classmethod
+    def from_schema(cls, schema: InstructionSchema) -> Self:
+        literal_checks: dict[int, tuple[int, int]] = {}
+        header_fields = []
+        trailing_fields = []
+        bit_pos = 0
+        for field in (schema.identifier_literal, *schema.fields):
+            byte_ind, bit_in_byte = divmod(bit_pos, BITS_PER_BYTE)
+            shift = BITS_PER_BYTE - bit_in_byte - field.bit_width
+            mask = (1 << field.bit_width) - 1
+            bit_pos += field.bit_width
+            if isinstance(field, LiteralField):
+                assert not trailing_fields, "Literal after whole byte fields"
+                literal_mask, literal_value = literal_checks.get(byte_ind, (0, 0))
+                literal_checks[byte_ind] = (
+                    literal_mask | mask << shift,
+                    literal_value | field.literal_value << shift,
+                )
+            elif field.bit_width == BITS_PER_BYTE:
+                trailing_fields.append(field)
+            else:
+                assert not trailing_fields, "Sub-byte field after whole byte fields"
+                header_fields.append((field, byte_ind, shift, mask))
+
+        header_bits = bit_pos - BITS_PER_BYTE * len(trailing_fields)
+        assert header_bits % BITS_PER_BYTE == 0, "Header must be whole bytes"
+        return cls(
+            schema,
+            header_bits // BITS_PER_BYTE,
+            tuple((byte_ind, *check) for byte_ind, check in literal_checks.items()),
+            tuple(header_fields),
+            tuple(trailing_fields),
+        )
+
+    def matches(self, header: bytes | list[int]) -> bool:
+        return all(
+            header[byte_ind] & mask == value
+            for byte_ind, mask, value in self.literal_checks
+        )
+
+    def matching_byte_values(self, byte_ind: int) -> list[int]:
+        for check_ind, mask, literal in self.literal_checks:
+            if check_ind == byte_ind:
+                return [value for value in range(256) if value & mask == literal]
+        return list(range(256))
+
+    def extract_header(self, header: bytes | list[int]) -> dict[NamedField, int]:
+        return {
+            field: (header[byte_ind] >> shift) & mask
+            for field, byte_ind, shift, mask in self.header_fields
+        }
+
+    def needed_trailing_fields(
+        self, header_values: dict[NamedField, int]
+    ) -> tuple[NamedField, ...]:
+        """Uses the same rules as a normal decode to know which optional bytes follow"""
+        acc = DecodeAccumulator()
+        for field, value in header_values.items():
+            acc.with_field(field, value)
+        acc.with_implied_fields(self.schema.implied_values)
+        return tuple(field for field in self.trailing_fields if acc.is_needed(field))
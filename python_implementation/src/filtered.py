@@ -0,0 +1,122 @@
+"""
+Decode only the instructions a filter selects.
+
+Everything about an instruction but its trailing displacement/data bytes follows from
+its opcode and ModRM bytes, so the mnemonic, schema and header field parts of a
+filter are decided once per distinct opcode/ModRM pair and cached. Trailing field
+values are only read for instructions that pass that, and operands are only built
+for instructions that pass everything. Skipped instructions still advance by their
+length from the OpcodeTable, so the offsets of matches are exact.
+"""
+
+from collections.abc import Callable, Iterator, Mapping
+from dataclasses import dataclass, field
+
+from python_implementation.src.base.schema import InstructionSchema, NamedField
+from python_implementation.src.disassembled import DisassembledInstruction
+from python_implementation.src.intermediates.accumulator import DecodeAccumulator
+from python_implementation.src.opcode_table import EncodingLayout, OpcodeTable
+
+
+@dataclass(frozen=True)
+class DecodeFilter:
+    """
+    An instruction matches when it passes every criterion that is set.
+
+    :param schema_ids: Indices into the config's schemas, i.e. specific variations
+    :param field_values: Allowed raw values per field. An instruction without the
+        field does not match
+    :param predicate: Called with every raw field value of the instruction, header and
+        trailing, before anything is built from them
+    """
+
+    mnemonics: frozenset[str] | None = None
+    schema_ids: frozenset[int] | None = None
+    field_values: Mapping[NamedField, frozenset[int]] = field(default_factory=dict)
+    predicate: Callable[[dict[NamedField, int]], bool] | None = None
+
+    def matches_layout(
+        self, schema_ind: int, schema: InstructionSchema, layout: EncodingLayout
+    ) -> bool | None:
+        """
+        Everything decidable from the opcode/ModRM bytes alone.
+        :returns: False if the instruction can't match, True if it does, None if it
+            depends on trailing fields or the predicate
+        """
+        if self.mnemonics is not None and schema.mnemonic not in self.mnemonics:
+            return False
+        if self.schema_ids is not None and schema_ind not in self.schema_ids:
+            return False
+        trailing = {field for field, _ in layout.trailing_offsets}
+        needs_trailing = False
+        for field, allowed in self.field_values.items():
+            value = layout.header_values.get(field, schema.implied_values.get(field))
+            if value is None:
+                if field not in trailing:
+                    return False
+                needs_trailing = True
+            elif value not in allowed:
+                return False
+        if needs_trailing or self.predicate is not None:
+            return None
+        return True
+
+    def matches_fields(self, parsed_fields: dict[NamedField, int]) -> bool:
+        for field, allowed in self.field_values.items():
+            if parsed_fields.get(field) not in allowed:
+                return False
+        return self.predicate is None or self.predicate(parsed_fields)
+
+
+def touches_register(
+    register_index: int, word: bool
+) -> Callable[[dict[NamedField, int]], bool]:
+    """Predicate for a general register in the reg field or as a register mode rm"""
+
+    def predicate(parsed_fields: dict[NamedField, int]) -> bool:
+        if parsed_fields.get(NamedField.W, 1) != word:
+            return False
+        if parsed_fields.get(NamedField.REG) == register_index:
+            return True
+        return (
+            parsed_fields.get(NamedField.MOD) == 0b11
+            and parsed_fields.get(NamedField.RM) == register_index
+        )
+
+    return predicate
+
+
+def iter_decode_filtered(
+    opcode_table: OpcodeTable, file_contents: bytes, decode_filter: DecodeFilter
+) -> Iterator[tuple[int, DisassembledInstruction]]:
+    """:returns: (offset, instruction) of every match, instructions are not labelled"""
+    schemas = [plan.schema for plan in opcode_table.plans]
+    # opcode/ModRM bytes -> (layout, verdict of matches_layout)
+    seen: dict[bytes, tuple[EncodingLayout, bool | None]] = {}
+    offset, end = 0, len(file_contents)
+    while offset < end:
+        key = file_contents[offset : offset + 2]
+        entry = seen.get(key)
+        if entry is None:
+            layout = opcode_table.layout(file_contents, offset)
+            schema = schemas[layout.schema_ind]
+            entry = seen[key] = (
+                layout,
+                decode_filter.matches_layout(layout.schema_ind, schema, layout),
+            )
+        layout, verdict = entry
+        if offset + layout.size > end:
+            raise ValueError("Instruction stream ended in the middle of an instruction")
+
+        if verdict is not False:
+            parsed_fields = dict(layout.header_values)
+            for field, field_offset in layout.trailing_offsets:
+                parsed_fields[field] = file_contents[offset + field_offset]
+            schema = schemas[layout.schema_ind]
+            if verdict or decode_filter.matches_fields(
+                {**schema.implied_values, **parsed_fields}
+            ):
+                acc = DecodeAccumulator.from_parsed_fields(parsed_fields, layout.size)
+                acc.with_implied_fields(schema.implied_values)
+                yield offset, acc.build(schema)
+        offset += layout.size
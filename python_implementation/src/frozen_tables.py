@@ -0,0 +1,251 @@
+"""
+Compiles asm_config.json into a generated python module of decode tables.
+
+    python -m python_implementation.src.frozen_tables
+
+is the build step, it writes the module into the package as PACKAGED_MODULE_PATH.
+Importing the generated module is a bytecode load of constants, which skips reading
+and regex parsing the json config and building the trie and opcode table, and the
+frozen path imports neither the trie nor the parser.
+
+The module records the hash of the config it came from. When the packaged module is
+missing or was built from another config, one is generated into the user's cache
+directory instead and regenerated there whenever the config changes, so nothing is
+ever written into an installed package at runtime.
+"""
+
+import os
+import sys
+import zlib
+from array import array
+from collections.abc import Iterable, Iterator
+from importlib.machinery import SourceFileLoader
+from pathlib import Path
+from types import ModuleType
+from typing import Self, override
+
+from python_implementation.src.base.config_loader import (
+    DEFAULT_CONFIG_PATH,
+    get_cache_directory,
+    get_config_hash,
+    get_parsable_instructions_from_config,
+)
+from python_implementation.src.base.schema import (
+    InstructionSchema,
+    LiteralField,
+    NamedField,
+)
+from python_implementation.src.disassembled import (
+    DisassembledInstruction,
+    Disassembly,
+)
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.field_plan import FieldPlan
+from python_implementation.src.opcode_table import OpcodeTable
+
+MODULE_NAME = "_frozen_tables.py"
+# NamedField by value, a dict lookup is much cheaper than calling the enum and the
+# tables name a field a couple of thousand times
+_NAMED_FIELDS = {field.value: field for field in NamedField}
+PACKAGED_MODULE_PATH = Path(__file__).parent / MODULE_NAME
+
+
+def cached_module_path() -> Path:
+    return get_cache_directory() / MODULE_NAME
+
+
+def _freeze_field(field: LiteralField | NamedField) -> tuple[int, int] | str:
+    if isinstance(field, LiteralField):
+        return (field.literal_value, field.bit_width)
+    return field.value
+
+
+def _thaw_field(field: tuple[int, int] | str) -> LiteralField | NamedField:
+    if isinstance(field, tuple):
+        return LiteralField(*field)
+    return _NAMED_FIELDS[field]
+
+
+def generate_frozen_tables(
+    module_path: Path = PACKAGED_MODULE_PATH,
+    config_path: Path = DEFAULT_CONFIG_PATH,
+):
+    # only needed when (re)generating, kept out of the cold start import path
+    import py_compile
+    import tempfile
+
+    schemas = get_parsable_instructions_from_config(config_path)
+    opcode_table = OpcodeTable.from_parsable_instructions(schemas)
+    frozen_schemas = tuple(
+        (
+            schema.mnemonic,
+            _freeze_field(schema.identifier_literal),
+            tuple(_freeze_field(field) for field in schema.fields),
+            {field.value: value for field, value in schema.implied_values.items()},
+        )
+        for schema in schemas
+    )
+    # the distinct tuples once, and an index into them by key, which loads much faster
+    # than rebuilding a tuple of fields for each of the thousand or so keys
+    trailing_field_tuples = list(dict.fromkeys(opcode_table.trailing_fields.values()))
+    trailing_fields = {
+        key: trailing_field_tuples.index(fields)
+        for key, fields in opcode_table.trailing_fields.items()
+    }
+    frozen_trailing_field_tuples = tuple(
+        tuple(field.value for field in fields) for fields in trailing_field_tuples
+    )
+    lines = [
+        f"# Generated from {Path(config_path).name} by python_implementation.src.frozen_tables, do not edit",
+        f"CONFIG_HASH = {get_config_hash(config_path)!r}",
+        f"CONFIG_STAT = {_config_stat(config_path)!r}",
+        f"BYTEORDER = {sys.byteorder!r}",
+        f"SCHEMAS = {frozen_schemas!r}",
+        f"TRAILING_FIELD_TUPLES = {frozen_trailing_field_tuples!r}",
+        f"TRAILING_FIELDS = {trailing_fields!r}",
+    ]
+    for name in (
+        "first_byte_lengths",
+        "first_byte_schemas",
+        "second_byte_lengths",
+        "second_byte_schemas",
+    ):
+        packed = zlib.compress(getattr(opcode_table, name).tobytes(), 9)
+        lines.append(f"{name.upper()} = {packed!r}")
+
+    # write then rename so a concurrent reader never imports half a module
+    Path(module_path).parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        "w", dir=Path(module_path).parent, suffix=".tmp", delete=False
+    ) as file:
+        file.write("\n".join(lines) + "\n")
+    os.chmod(file.name, 0o644)
+    os.replace(file.name, module_path)
+    # compile now rather than on first import, which also replaces any stale bytecode
+    # a quick regeneration could leave behind, since that is validated by mtime and size
+    py_compile.compile(str(module_path), doraise=True)
+
+
+def _import_generated(module_path: Path) -> ModuleType | None:
+    if not Path(module_path).exists():
+        return None
+    loader = SourceFileLoader("_frozen_tables", str(module_path))
+    module = ModuleType(loader.name)
+    module.__file__ = loader.path
+    loader.exec_module(module)
+    return module
+
+
+def _config_stat(config_path: Path) -> tuple[int, int]:
+    stat = os.stat(config_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _is_current(
+    module: ModuleType | None, config_path: Path, hash_when_touched: bool = True
+) -> bool:
+    """
+    The config is only hashed when its size or mtime changed since the module was
+    generated, and with hash_when_touched=False not even then, for modules that are
+    cheaper to regenerate than to hash the config on every load
+    """
+    # modules generated before a format change lack the new names, they are stale too
+    if module is None or not hasattr(module, "TRAILING_FIELD_TUPLES"):
+        return False
+    if module.BYTEORDER != sys.byteorder:
+        return False
+    if getattr(module, "CONFIG_STAT", None) == _config_stat(config_path):
+        return True
+    return hash_when_touched and module.CONFIG_HASH == get_config_hash(config_path)
+
+
+def load_frozen_tables(
+    module_path: Path | None = None,
+    config_path: Path = DEFAULT_CONFIG_PATH,
+) -> tuple[list[InstructionSchema], OpcodeTable]:
+    """
+    :param module_path: Where the generated module is, and is generated if missing or
+        stale. By default the packaged module, falling back to cached_module_path()
+    """
+    if module_path is None:
+        module = _import_generated(PACKAGED_MODULE_PATH)
+        if not _is_current(module, config_path):
+            module_path = cached_module_path()
+    if module_path is not None:
+        module = _import_generated(module_path)
+        if not _is_current(module, config_path, hash_when_touched=False):
+            generate_frozen_tables(module_path, config_path)
+            module = _import_generated(module_path)
+    assert module is not None
+
+    schemas = [
+        InstructionSchema(
+            mnemonic=mnemonic,
+            identifier_literal=_thaw_field(identifier_literal),
+            fields=[_thaw_field(field) for field in fields],
+            implied_values={_NAMED_FIELDS[k]: v for k, v in implied_values.items()},
+        )
+        for mnemonic, identifier_literal, fields, implied_values in module.SCHEMAS
+    ]
+
+    def thaw_array(typecode: str, packed: bytes) -> array:
+        table = array(typecode)
+        table.frombytes(zlib.decompress(packed))
+        return table
+
+    field_tuples = [
+        tuple(_NAMED_FIELDS[field] for field in fields)
+        for fields in module.TRAILING_FIELD_TUPLES
+    ]
+    opcode_table = OpcodeTable(
+        [FieldPlan.from_schema(schema) for schema in schemas],
+        thaw_array("B", module.FIRST_BYTE_LENGTHS),
+        thaw_array("h", module.FIRST_BYTE_SCHEMAS),
+        thaw_array("B", module.SECOND_BYTE_LENGTHS),
+        thaw_array("h", module.SECOND_BYTE_SCHEMAS),
+        {key: field_tuples[ind] for key, ind in module.TRAILING_FIELDS.items()},
+    )
+    return schemas, opcode_table
+
+
+class FrozenDisassembler(Disassembler):
+    """Starts from the generated tables and decodes through them, no trie is ever built"""
+
+    def __init__(
+        self, parsable_instructions: list[InstructionSchema], opcode_table: OpcodeTable
+    ) -> None:
+        self.parsable_instructions = parsable_instructions
+        self.opcode_table = opcode_table
+
+    @override
+    @classmethod
+    def from_config(cls) -> Self:
+        return cls.load()
+
+    @classmethod
+    def load(
+        cls,
+        module_path: Path | None = None,
+        config_path: Path = DEFAULT_CONFIG_PATH,
+    ) -> Self:
+        return cls(*load_frozen_tables(module_path, config_path))
+
+    @override
+    def decode(self, file_contents: bytes) -> Disassembly:
+        return self.decode_columnar(file_contents).to_disassembly()
+
+    @override
+    def iter_decode(self, file_contents: bytes) -> Iterator[DisassembledInstruction]:
+        columnar = self.decode_columnar(file_contents)
+        return (columnar.instruction(i) for i in range(len(columnar)))
+
+    @override
+    def iter_decode_stream(
+        self, byte_stream: Iterable[int]
+    ) -> Iterator[DisassembledInstruction]:
+        """The opcode table decodes whole buffers, so the stream is read to the end first"""
+        return self.iter_decode(bytes(byte_stream))
+
+
+if __name__ == "__main__":
+    generate_frozen_tables()
@@ -1,5 +1,7 @@
-from functools import cached_property
+from typing import Self
+
 from python_implementation.src.base.schema import (
+    NUM_NAMED_FIELDS,
     InstructionSchema,
     LiteralField,
     NamedField,
@@ -21,16 +23,53 @@ from python_implementation.src.intermediates.operands import (
 )
 from python_implementation.src.utils import BITS_PER_BYTE, as_signed_int, combine_bytes
 
+_EMPTY_SLOTS = (None,) * NUM_NAMED_FIELDS
+
 
 class DecodeAccumulator:
+    """
+    Field values live in fixed slots indexed by NamedField.ordinal, None when not read,
+    so a decode loop can `reset` and reuse one accumulator for every instruction and
+    only allocate the instruction it builds.
+    """
+
     def __init__(self):
-        self.parsed_fields: dict[NamedField, int] = {}
+        self.slots: list[int | None] = [None] * NUM_NAMED_FIELDS
         self.bit_size = 0
 
+    def reset(self):
+        self.slots[:] = _EMPTY_SLOTS
+        self.bit_size = 0
+
+    @classmethod
+    def from_parsed_fields(
+        cls, parsed_fields: dict[NamedField, int], inst_size: int
+    ) -> Self:
+        """For decoders that read the fields themselves and only need the instruction built"""
+        acc = cls()
+        for field, value in parsed_fields.items():
+            acc.slots[field.ordinal] = value
+        acc.bit_size = inst_size * BITS_PER_BYTE
+        return acc
+
+    @property
+    def parsed_fields(self) -> dict[NamedField, int]:
+        return {
+            field: value
+            for field, value in zip(NamedField, self.slots)
+            if value is not None
+        }
+
+    def _require(self, field: NamedField) -> int:
+        value = self.slots[field.ordinal]
+        if value is None:
+            raise KeyError(field)
+        return value
+
     def with_field(self, schema_field: SchemaField, field_value: int):
         self.bit_size += schema_field.bit_width
         if isinstance(schema_field, NamedField):
-            self.parsed_fields[schema_field] = field_value
+            self.slots[schema_field.ordinal] = field_value
         else:
             assert field_value == schema_field.literal_value
 
@@ -38,91 +77,80 @@ class DecodeAccumulator:
         self.bit_size += 1
 
     def with_implied_fields(self, implied_fields: dict[NamedField, int]) -> None:
-        assert self.parsed_fields.keys().isdisjoint(
-            implied_fields.keys()
-        ), "Given implied fields overlap with already parsed fields"
-        self.parsed_fields.update(implied_fields)
+        for field, value in implied_fields.items():
+            assert (
+                self.slots[field.ordinal] is None
+            ), "Given implied fields overlap with already parsed fields"
+            self.slots[field.ordinal] = value
 
-    @cached_property
+    @property
     def mode(self) -> Mode:
         """This one is special because it is used in checking if a field is needed"""
-        mod_value = self.parsed_fields[NamedField.MOD]
-        rm_value = self.parsed_fields.get(NamedField.RM)
-        mode = Mode(mod_value, rm_value)
-        return mode
+        return Mode.of(self._require(NamedField.MOD), self.slots[NamedField.RM.ordinal])
 
-    @cached_property
+    @property
     def word(self):
-        return bool(self.parsed_fields[NamedField.W])
+        return bool(self._require(NamedField.W))
 
-    @cached_property
+    @property
     def direction(self):
-        return bool(self.parsed_fields[NamedField.D])
+        return bool(self._require(NamedField.D))
 
-    @cached_property
+    @property
     def sign_extension(self):
-        return bool(self.parsed_fields[NamedField.S])
+        return bool(self._require(NamedField.S))
 
-    @cached_property
+    @property
     def ip_inc8(self):
-        return self.parsed_fields.get(NamedField.IP_INC8)
+        return self.slots[NamedField.IP_INC8.ordinal]
 
-    @cached_property
+    @property
     def displacement(self):
-        disp = None
-        if NamedField.DISP_LO in self.parsed_fields:
-            disp = combine_bytes(
-                self.parsed_fields[NamedField.DISP_LO],
-                self.parsed_fields.get(NamedField.DISP_HI),
+        disp_lo = self.slots[NamedField.DISP_LO.ordinal]
+        if disp_lo is not None:
+            return as_signed_int(
+                combine_bytes(disp_lo, self.slots[NamedField.DISP_HI.ordinal])
             )
-            return as_signed_int(disp)
 
-    @cached_property
+    @property
     def data_operand(self):
-        data_operand = None
-        if NamedField.DATA in self.parsed_fields:
-            data_operand = ImmediateOperand(
-                value=combine_bytes(
-                    self.parsed_fields[NamedField.DATA],
-                    self.parsed_fields.get(NamedField.DATA_IF_W1),
-                ),
-                word=self.word,
-            )
-        return data_operand
+        data = self.slots[NamedField.DATA.ordinal]
+        if data is None:
+            return None
+        return ImmediateOperand(
+            value=combine_bytes(data, self.slots[NamedField.DATA_IF_W1.ordinal]),
+            word=self.word,
+        )
 
-    @cached_property
+    @property
     def register_operand(self):
-        reg_operand = None
-        if NamedField.REG in self.parsed_fields:
-            reg_operand = RegOperand(
-                register_index=self.parsed_fields[NamedField.REG], word=self.word
-            )
-        elif NamedField.SR in self.parsed_fields:
-            reg_operand = SegmentRegOperand(sr_index=self.parsed_fields[NamedField.SR])
-
-        return reg_operand
+        reg = self.slots[NamedField.REG.ordinal]
+        if reg is not None:
+            return RegOperand(register_index=reg, word=self.word)
+        sr = self.slots[NamedField.SR.ordinal]
+        if sr is not None:
+            return SegmentRegOperand(sr_index=sr)
+        return None
 
     def get_size(self):
-        size, rem = divmod(self.bit_size, BITS_PER_BYTE)
-        assert rem == 0, "Asking for size on incomplete instruction"
-        return size
+        assert (
+            self.bit_size % BITS_PER_BYTE == 0
+        ), "Asking for size on incomplete instruction"
+        return self.bit_size // BITS_PER_BYTE
 
-    @cached_property
+    @property
     def rm_operand(self):
-        rm_operand = None
-        if NamedField.RM in self.parsed_fields:
-            reg_or_mem_base = self.parsed_fields[NamedField.RM]
-            if self.mode.type is Mode.Type.REGISTER_MODE:
-                rm_operand = RegOperand(register_index=reg_or_mem_base, word=self.word)
-            else:
-                rm_operand = MemoryOperand(
-                    memory_base=(
-                        None if self.mode.direct_memory_index else reg_or_mem_base
-                    ),
-                    displacement=self.displacement or 0,
-                    word=self.word,
-                )
-        return rm_operand
+        reg_or_mem_base = self.slots[NamedField.RM.ordinal]
+        if reg_or_mem_base is None:
+            return None
+        mode = self.mode
+        if mode.type is Mode.Type.REGISTER_MODE:
+            return RegOperand(register_index=reg_or_mem_base, word=self.word)
+        return MemoryOperand(
+            memory_base=None if mode.direct_memory_index else reg_or_mem_base,
+            displacement=self.displacement or 0,
+            word=self.word,
+        )
 
     def is_needed(self, field: SchemaField):
         if isinstance(field, LiteralField) or field.always_needed:
@@ -146,24 +174,25 @@ class DecodeAccumulator:
                 raise ValueError("I don't know how to check if this is needed")
 
     def build(self, instruction_schema: InstructionSchema) -> DisassembledInstruction:
-        if self.ip_inc8:
+        if self.ip_inc8 is not None:
             return DisassembledJumpInstruction(
-                instruction_schema.mnemonic, self.ip_inc8, self.get_size()
+                instruction_schema.mnemonic, as_signed_int(self.ip_inc8), self.get_size()
             )
-        operands = list(
-            filter(None, [self.data_operand, self.register_operand, self.rm_operand])
-        )
-
-        match operands:
-            case []:
+        # in [data, register, rm] order, matched without building a list of them
+        data, reg, rm = self.data_operand, self.register_operand, self.rm_operand
+        num_operands = (data is not None) + (reg is not None) + (rm is not None)
+        match num_operands:
+            case 0:
                 raise NotImplementedError("Can't do nullary yet")
-            case [op]:
+            case 1:
                 return DisassembledUnaryInstruction(
                     mnemonic=instruction_schema.mnemonic,
-                    op=op,
+                    op=data or reg or rm,
                     inst_size=self.get_size(),
                 )
-            case [source, dest]:
+            case 2:
+                source = data if data is not None else reg
+                dest = rm if rm is not None else reg
                 if self.direction:
                     source, dest = dest, source
                 return DisassembledBinaryInstruction(
@@ -173,4 +202,4 @@ class DecodeAccumulator:
                     inst_size=self.get_size(),
                 )
             case _:
-                raise ValueError(f"Unexpected operand count: {len(operands)}")
+                raise ValueError(f"Unexpected operand count: {num_operands}")
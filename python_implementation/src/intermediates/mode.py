@@ -22,5 +22,14 @@ class Mode:
             self.type = self.Type.WORD_DISPLACEMENT_MODE
             self.direct_memory_index = True
 
+    @classmethod
+    def of(cls, mod_val: int, rm_val: int | None) -> "Mode":
+        """Shared instance for this mod/rm pair, modes are never mutated after init"""
+        return _MODES[mod_val][rm_val == 0b110]
+
     def __repr__(self) -> str:
         return f"Mode<type={self.type}, direct_memory_index={self.direct_memory_index}>"
+
+
+# indexed by [mod][rm is direct memory], only rm 0b110 changes anything
+_MODES = tuple((Mode(mod_val, 0), Mode(mod_val, 0b110)) for mod_val in range(4))
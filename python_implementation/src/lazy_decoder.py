@@ -0,0 +1,131 @@
+"""
+Builds the decoder for an opcode the first time an instruction with it is decoded.
+
+At config load schemas are only grouped by their identifier literal, the leading
+opcode bits. The first byte of an instruction picks the groups whose identifier it
+starts with, and a CompactTrie of just those schemas is built on first use and kept
+for every later first byte that selects the same groups. Startup then scales with the
+opcodes a binary actually uses, not with the size of the ISA.
+"""
+
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Self
+
+from python_implementation.src.base.config_loader import (
+    DEFAULT_CONFIG_PATH,
+    get_parsable_instructions_from_config,
+)
+from python_implementation.src.base.schema import InstructionSchema
+from python_implementation.src.compact_trie import CompactTrie
+from python_implementation.src.disassembled import (
+    DisassembledInstruction,
+    Disassembly,
+)
+from python_implementation.src.intermediates.accumulator import DecodeAccumulator
+from python_implementation.src.utils import BITS_PER_BYTE
+
+# identifier literal as (literal_value, bit_width)
+type GroupKey = tuple[int, int]
+
+
+@dataclass(frozen=True)
+class GroupBuild:
+    """Cost of building the decoder for one combination of opcode groups"""
+
+    groups: tuple[GroupKey, ...]
+    num_schemas: int
+    num_nodes: int
+    build_seconds: float
+
+    @property
+    def opcode_bits(self) -> list[str]:
+        return [f"{value:0{width}b}" for value, width in self.groups]
+
+
+class LazyDecoder:
+    """
+    Safe to share between threads, building is done under a lock and a built trie is
+    never changed, so decoding only ever reads what is published.
+    """
+
+    def __init__(self, parsable_instructions: list[InstructionSchema]) -> None:
+        self.parsable_instructions = parsable_instructions
+        self.groups: dict[GroupKey, list[InstructionSchema]] = {}
+        for schema in parsable_instructions:
+            literal = schema.identifier_literal
+            key = (literal.literal_value, literal.bit_width)
+            self.groups.setdefault(key, []).append(schema)
+        self.group_widths = sorted({width for _, width in self.groups})
+
+        self.builds: dict[tuple[GroupKey, ...], GroupBuild] = {}
+        self._tries_by_groups: dict[tuple[GroupKey, ...], CompactTrie] = {}
+        self._tries_by_first_byte: list[CompactTrie | None] = [None] * 256
+        self._build_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config_path: Path = DEFAULT_CONFIG_PATH) -> Self:
+        return cls(get_parsable_instructions_from_config(config_path))
+
+    def _groups_for(self, first_byte: int) -> tuple[GroupKey, ...]:
+        return tuple(
+            key
+            for width in self.group_widths
+            if (key := (first_byte >> (BITS_PER_BYTE - width), width)) in self.groups
+        )
+
+    def _build_trie(self, first_byte: int) -> CompactTrie | None:
+        with self._build_lock:
+            trie = self._tries_by_first_byte[first_byte]
+            if trie is not None:
+                return trie
+            groups = self._groups_for(first_byte)
+            if not groups:
+                return None
+
+            trie = self._tries_by_groups.get(groups)
+            if trie is None:
+                schemas = [schema for key in groups for schema in self.groups[key]]
+                start = time.perf_counter()
+                trie = CompactTrie.from_parsable_instructions(schemas)
+                self.builds[groups] = GroupBuild(
+                    groups, len(schemas), len(trie), time.perf_counter() - start
+                )
+                self._tries_by_groups[groups] = trie
+            self._tries_by_first_byte[first_byte] = trie
+            return trie
+
+    def iter_decode(self, file_contents: bytes) -> Iterator[DisassembledInstruction]:
+        tries = self._tries_by_first_byte
+        acc = DecodeAccumulator()
+        offset = 0
+        while offset < len(file_contents):
+            first_byte = file_contents[offset]
+            trie = tries[first_byte] or self._build_trie(first_byte)
+            if trie is None:
+                raise ValueError(
+                    f"Undecodable instruction at offset {offset}: "
+                    f"{file_contents[offset : offset + 2].hex()}"
+                )
+            instruction = trie.decode_one(file_contents, offset, acc)
+            offset += instruction.inst_size
+            yield instruction
+
+    def decode(self, file_contents: bytes) -> Disassembly:
+        return Disassembly(list(self.iter_decode(file_contents)))
+
+    def build_report(self) -> str:
+        lines = [
+            f"{' '.join(build.opcode_bits):<24} schemas={build.num_schemas:<3} "
+            f"nodes={build.num_nodes:<3} {build.build_seconds * 1000:7.3f} ms"
+            for build in self.builds.values()
+        ]
+        total = sum(build.build_seconds for build in self.builds.values())
+        lines.append(
+            f"built {len(self.builds)} of {len(self.groups)} opcode groups "
+            f"in {total * 1000:.3f} ms"
+        )
+        return "\n".join(lines)
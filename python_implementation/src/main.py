@@ -1,24 +1,86 @@
+import argparse
 import os
 
-from python_implementation.src.base.config_loader import (
-    get_parsable_instructions_from_config,
-)
-from python_implementation.src.parser import parse_binary
+from python_implementation.src.batch import DEFAULT_CHUNK_SIZE, BatchJob
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.staged import StagedPipeline
 
 
-def main():
-    parsable_instructions = get_parsable_instructions_from_config()
-    input_directory = "./asm/assembled/"
-    output_directory = "./asm/my_disassembler_output/"
-    files_to_do = ["single_register_mov", "many_register_mov", "listing_0039_more_movs"]
-    for file_name in files_to_do:
-        full_input_file_path = os.path.join(input_directory, file_name)
-        with open(full_input_file_path, "rb") as file:
-            file_contents: bytes = file.read()
-        disasm = parse_binary(parsable_instructions, file_contents)
-        full_output_file_path = os.path.join(output_directory, file_name + ".asm")
-        with open(full_output_file_path, "w") as f:
-            f.write(str(disasm))
+def main(argv: list[str] | None = None):
+    arg_parser = argparse.ArgumentParser(description="8086 batch disassembly")
+    arg_parser.add_argument(
+        "input_paths", nargs="*", help="defaults to the example listings"
+    )
+    arg_parser.add_argument("--output-dir", default="./asm/my_disassembler_output/")
+    arg_parser.add_argument("--journal", help="defaults to one in the output dir")
+    arg_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    arg_parser.add_argument(
+        "--compress", choices=["gz", "xz", "bz2"], help="compress the listings"
+    )
+    arg_parser.add_argument(
+        "--resume", action="store_true", help="skip work the journal has finished"
+    )
+    arg_parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        help="read, decode, render and write in overlapping stages, without a journal",
+    )
+    arg_parser.add_argument(
+        "--workers",
+        action="append",
+        default=[],
+        metavar="STAGE=N",
+        help="worker threads of a pipelined stage, e.g. decode=4",
+    )
+    args = arg_parser.parse_args(argv)
+    if args.pipelined and args.resume:
+        arg_parser.error("--resume needs the journal, which --pipelined does not keep")
+
+    input_paths = args.input_paths
+    if not input_paths:
+        input_directory = "./asm/assembled/"
+        files_to_do = [
+            "single_register_mov",
+            "many_register_mov",
+            "listing_0039_more_movs",
+        ]
+        input_paths = [
+            os.path.join(input_directory, file_name) for file_name in files_to_do
+        ]
+    output_suffix = ".asm" + (f".{args.compress}" if args.compress else "")
+    if args.pipelined:
+        workers = {}
+        for stage_workers in args.workers:
+            stage, _, count = stage_workers.partition("=")
+            if not count.isdigit():
+                arg_parser.error(f"--workers takes STAGE=N, not {stage_workers}")
+            workers[stage] = int(count)
+        try:
+            pipeline = StagedPipeline(
+                Disassembler.from_config(),
+                args.output_dir,
+                output_suffix=output_suffix,
+                workers=workers,
+                chunk_size=args.chunk_size,
+            )
+        except ValueError as e:
+            arg_parser.error(f"--workers: {e}")
+        print(pipeline.run(input_paths))
+        return
+
+    job = BatchJob(
+        Disassembler.from_config(),
+        args.output_dir,
+        journal_path=args.journal,
+        chunk_size=args.chunk_size,
+        output_suffix=output_suffix,
+    )
+    stats = job.run(input_paths, resume=args.resume)
+    print(
+        f"{stats.files_done} files done, {stats.files_skipped} skipped, "
+        f"{stats.chunks_done} chunks done, {stats.chunks_skipped} skipped, "
+        f"{stats.redone} redone"
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,161 @@
+from array import array
+from dataclasses import dataclass
+from typing import Self
+
+from python_implementation.src.base.schema import InstructionSchema, NamedField
+from python_implementation.src.field_plan import FieldPlan
+
+UNDECODABLE = 0
+NEEDS_SECOND_BYTE = 0xFF
+NO_SCHEMA = -1
+LENGTH_FIELDS = (NamedField.W, NamedField.S, NamedField.MOD, NamedField.RM)
+
+
+def trailing_key(
+    schema_ind: int, header_values: dict[NamedField, int]
+) -> tuple[int | None, ...]:
+    return (schema_ind, *(header_values.get(field) for field in LENGTH_FIELDS))
+
+
+@dataclass(frozen=True)
+class EncodingLayout:
+    """Everything the opcode and ModRM bytes say about one instruction"""
+
+    schema_ind: int
+    size: int
+    header_values: dict[NamedField, int]
+    # (field, byte offset from the start of the instruction)
+    trailing_offsets: tuple[tuple[NamedField, int], ...]
+
+
+class OpcodeTable:
+    """
+    Instruction length and schema index for every opcode byte, and for every
+    (opcode, ModRM) pair when the opcode alone is not enough.
+
+    first_byte_lengths[b0] is the instruction length, UNDECODABLE, or NEEDS_SECOND_BYTE
+    in which case second_byte_lengths[b0 << 8 | b1] holds the length.
+    The *_schemas arrays are laid out the same way and index into `plans`.
+    """
+
+    def __init__(
+        self,
+        plans: list[FieldPlan],
+        first_byte_lengths: array,
+        first_byte_schemas: array,
+        second_byte_lengths: array,
+        second_byte_schemas: array,
+        trailing_fields: dict[tuple[int | None, ...], tuple[NamedField, ...]],
+    ) -> None:
+        self.plans = plans
+        self.first_byte_lengths = first_byte_lengths
+        self.first_byte_schemas = first_byte_schemas
+        self.second_byte_lengths = second_byte_lengths
+        self.second_byte_schemas = second_byte_schemas
+        # keyed by (schema index, *values of LENGTH_FIELDS)
+        self.trailing_fields = trailing_fields
+
+    @classmethod
+    def from_parsable_instructions(cls, instructions: list[InstructionSchema]) -> Self:
+        plans = [FieldPlan.from_schema(instruction) for instruction in instructions]
+        first_byte_lengths = array("B", bytes(256))
+        first_byte_schemas = array("h", [NO_SCHEMA]) * 256
+        second_byte_lengths = array("B", bytes(256 * 256))
+        second_byte_schemas = array("h", [NO_SCHEMA]) * (256 * 256)
+
+        # trailing fields only depend on w, s, mod and rm, so share the work between encodings
+        trailing_fields: dict[tuple[int | None, ...], tuple[NamedField, ...]] = {}
+
+        def get_length(schema_ind: int, header: list[int]) -> int:
+            plan = plans[schema_ind]
+            header_values = plan.extract_header(header)
+            key = trailing_key(schema_ind, header_values)
+            if key not in trailing_fields:
+                trailing_fields[key] = plan.needed_trailing_fields(header_values)
+            return plan.header_size + len(trailing_fields[key])
+
+        for schema_ind, plan in enumerate(plans):
+            assert plan.header_size in (1, 2), "Only opcode and ModRM are tabled"
+            for b0 in plan.matching_byte_values(0):
+                if plan.header_size == 1:
+                    assert first_byte_schemas[b0] == NO_SCHEMA, "Ambiguous ISA"
+                    first_byte_lengths[b0] = get_length(schema_ind, [b0])
+                    first_byte_schemas[b0] = schema_ind
+                    continue
+
+                assert first_byte_lengths[b0] in (
+                    UNDECODABLE,
+                    NEEDS_SECOND_BYTE,
+                ), "Ambiguous ISA"
+                first_byte_lengths[b0] = NEEDS_SECOND_BYTE
+                for b1 in plan.matching_byte_values(1):
+                    key = b0 << 8 | b1
+                    assert second_byte_schemas[key] == NO_SCHEMA, "Ambiguous ISA"
+                    second_byte_lengths[key] = get_length(schema_ind, [b0, b1])
+                    second_byte_schemas[key] = schema_ind
+
+        return cls(
+            plans,
+            first_byte_lengths,
+            first_byte_schemas,
+            second_byte_lengths,
+            second_byte_schemas,
+            trailing_fields,
+        )
+
+    def lookup(self, file_contents: bytes, offset: int) -> tuple[int, int]:
+        """:returns: (schema index, instruction length) of the instruction at offset"""
+        b0 = file_contents[offset]
+        length = self.first_byte_lengths[b0]
+        if length == NEEDS_SECOND_BYTE:
+            if offset + 1 >= len(file_contents):
+                raise ValueError(
+                    "Instruction stream ended in the middle of an instruction"
+                )
+            key = b0 << 8 | file_contents[offset + 1]
+            length, schema_ind = (
+                self.second_byte_lengths[key],
+                self.second_byte_schemas[key],
+            )
+        else:
+            schema_ind = self.first_byte_schemas[b0]
+        if length == UNDECODABLE:
+            raise ValueError(
+                f"Undecodable instruction at offset {offset}: {file_contents[offset:offset + 2].hex()}"
+            )
+        return schema_ind, length
+
+    def layout(self, file_contents: bytes, offset: int) -> EncodingLayout:
+        schema_ind, length = self.lookup(file_contents, offset)
+        plan = self.plans[schema_ind]
+        header_values = plan.extract_header(
+            file_contents[offset : offset + plan.header_size]
+        )
+        trailing = self.trailing_fields[trailing_key(schema_ind, header_values)]
+        return EncodingLayout(
+            schema_ind,
+            length,
+            header_values,
+            tuple((field, plan.header_size + i) for i, field in enumerate(trailing)),
+        )
+
+    def scan(self, file_contents: bytes) -> array:
+        """Offsets of every instruction, without building any operands"""
+        first_byte_lengths = self.first_byte_lengths
+        second_byte_lengths = self.second_byte_lengths
+        offsets = array("I")
+        offset, end = 0, len(file_contents)
+        while offset < end:
+            length = first_byte_lengths[file_contents[offset]]
+            if length == NEEDS_SECOND_BYTE and offset + 1 < end:
+                length = second_byte_lengths[
+                    file_contents[offset] << 8 | file_contents[offset + 1]
+                ]
+            if length in (UNDECODABLE, NEEDS_SECOND_BYTE):
+                self.lookup(file_contents, offset)  # raises with the reason
+            offsets.append(offset)
+            offset += length
+
+        if offset != end:
+            raise ValueError("Instruction stream ended in the middle of an instruction")
+        return offsets
@@ -1,14 +1,18 @@
 import logging
+from collections.abc import Iterable, Iterator
 
 from python_implementation.src.base.schema import InstructionSchema, NamedField
-from python_implementation.src.disassembled import Disassembly
+from python_implementation.src.disassembled import (
+    DisassembledInstruction,
+    Disassembly,
+)
 from python_implementation.src.intermediates.accumulator import DecodeAccumulator
 from python_implementation.src.trie import Trie
 from python_implementation.src.utils import BITS_PER_BYTE, get_sub_most_sig_bits
 
 
 class BitIterator:
-    def __init__(self, b: bytes):
+    def __init__(self, b: Iterable[int]):
         self.inst_bytes = b
         self.iterator = iter(b)
         self.curr_byte = None
@@ -58,10 +62,18 @@ class BitIterator:
         return bool(get_sub_most_sig_bits(self.curr_byte, self.msb_bit_ind, 1))
 
 
-def parse(trie: Trie, bit_iter: BitIterator):
+def parse(trie: Trie, bit_iter: BitIterator, acc: DecodeAccumulator | None = None):
+    """
+    :param acc: Scratch accumulator, reset and reused when given so a decode loop
+        allocates nothing per instruction but the instruction itself
+    """
+    if acc is None:
+        acc = DecodeAccumulator()
+    else:
+        acc.reset()
+
     head = trie.dummy_head
-    acc = DecodeAccumulator()
-    while head is not None and head.coil is None:
+    while head is not None and head.leaf is None:
         # We prefer matching the longest identifier literal first over going into named fields
         # prefer literal paths if they exist
         if (head.left is not None and not bit_iter.peek_bit()) or (
@@ -82,36 +94,48 @@ def parse(trie: Trie, bit_iter: BitIterator):
             raise ValueError(f"Unexpected {head.value}")
 
     assert head is not None
-    rest_of_coil = head.get_rest_of_coil()
-
-    while rest_of_coil.has_more() and not rest_of_coil.can_transition():
-        coil_bit = next(rest_of_coil)
-        assert isinstance(
-            coil_bit, bool
+    leaf = head.leaf
+    if leaf.literal_width:
+        read_bits = bit_iter.next_bits(leaf.literal_width)
+        assert (
+            read_bits == leaf.literal_value
         ), "We know instruction but failing to match literal bits"
-        read_bit = bool(bit_iter.next_bits(1))
-        assert read_bit == coil_bit
-        acc.with_bit(read_bit)
+        acc.bit_size += leaf.literal_width
 
-    acc.with_implied_fields(rest_of_coil.instruction.implied_values)
-    whole_iter = rest_of_coil.to_whole_field_iter()
-    for e in whole_iter:
+    acc.with_implied_fields(leaf.schema.implied_values)
+    for e in leaf.fields:
         if acc.is_needed(e):
-            val = bit_iter.next_bits(e.bit_width)
-            acc.with_field(e, val)
+            acc.with_field(e, bit_iter.next_bits(e.bit_width))
 
-    return acc.build(rest_of_coil.instruction)
+    return acc.build(leaf.schema)
 
 
 def parse_binary(
-    parsable_instructions: list[InstructionSchema], file_contents: bytes
+    parsable_instructions: list[InstructionSchema],
+    file_contents: bytes,
+    backend: str = "trie",
 ) -> Disassembly:
-    trie = Trie.from_parsable_instructions(parsable_instructions)
-    bit_iter = BitIterator(file_contents)
-    disassembled_instructions = []
-    while bit_iter.peek_whole_byte() is not None:
+    """:param backend: Name of a decoder in backends.BACKENDS, the trie walker below by default"""
+    if backend == "trie":
+        trie = Trie.from_parsable_instructions(parsable_instructions)
+        return parse_binary_with_trie(trie, file_contents)
+
+    # the other backends build on this module, so they can only be imported on use
+    from python_implementation.src.backends import create_backend
 
-        disassembled_instruction = parse(trie, bit_iter)
-        disassembled_instructions.append(disassembled_instruction)
+    decoder = create_backend(backend, parsable_instructions)
+    return Disassembly(list(decoder.iter_decode(file_contents)))
 
-    return Disassembly(disassembled_instructions)
+
+def parse_binary_with_trie(trie: Trie, file_contents: bytes) -> Disassembly:
+    return Disassembly(list(iter_parse_binary(trie, file_contents)))
+
+
+def iter_parse_binary(
+    trie: Trie, file_contents: Iterable[int]
+) -> Iterator[DisassembledInstruction]:
+    """:param file_contents: Bytes, or any iterable of them such as a file being read"""
+    bit_iter = BitIterator(file_contents)
+    acc = DecodeAccumulator()
+    while bit_iter.peek_whole_byte() is not None:
+        yield parse(trie, bit_iter, acc)
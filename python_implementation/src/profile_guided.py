@@ -0,0 +1,328 @@
+"""
+Decoding specialized for the encodings a workload actually uses.
+
+A DecodeProfile counts decoded instructions by (schema index, mod), mod being None
+for schemas without one. It is recorded by decoding through a ProfilingBackend, which
+counts from the columns of its own decode rather than decoding a second time, and
+saved as JSON named after the hash of the schemas, since schema indices only mean
+something for the schemas they came from:
+
+    {"schemas_hash": "...", "counts": [[schema index, mod or null, count], ...]}
+
+A SpecializedDecoder built from a profile decodes in three tiers:
+
+1. The hottest (schema, mod) pairs whose encodings are at most two bytes, e.g. reg to
+   reg movs and short jumps, have every instruction built up front, looked up by
+   those bytes.
+2. The other hot pairs have the layout of each of their opcode/ModRM bytes worked
+   out up front, so only trailing bytes are read and the instruction built.
+3. Everything else checks each schema's FieldPlan, the most used schemas first.
+
+Both are registered in backends.BACKENDS, "profiling" starting from and
+"specialized" using the profile in default_profile_directory(). Decoding never writes
+the profile, the caller saves it with ProfilingBackend.save.
+"""
+
+import json
+import os
+import tempfile
+from collections import Counter
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from itertools import product
+from pathlib import Path
+from typing import Self
+
+from python_implementation.src.base.config_loader import (
+    get_cache_directory,
+    get_schemas_hash,
+)
+from python_implementation.src.base.schema import InstructionSchema, NamedField
+from python_implementation.src.columnar import ABSENT, ColumnarDisassembly
+from python_implementation.src.disassembled import (
+    DisassembledInstruction,
+    Disassembly,
+)
+from python_implementation.src.field_plan import FieldPlan
+from python_implementation.src.intermediates.accumulator import DecodeAccumulator
+from python_implementation.src.opcode_table import OpcodeTable
+
+PROFILE_PREFIX = "decode_profile_"
+DEFAULT_MAX_FAST_PATHS = 8
+# tier 1 tables are only built for encodings this short
+MAX_PREBUILT_SIZE = 2
+
+type ProfileKey = tuple[int, int | None]
+
+
+def default_profile_directory() -> Path:
+    return get_cache_directory() / "profiles"
+
+
+def _mod_of(
+    schema: InstructionSchema, header_values: dict[NamedField, int]
+) -> int | None:
+    return header_values.get(NamedField.MOD, schema.implied_values.get(NamedField.MOD))
+
+
+@dataclass
+class DecodeProfile:
+    schemas_hash: str
+    counts: Counter[ProfileKey] = field(default_factory=Counter)
+
+    def record(self, columnar: ColumnarDisassembly):
+        """Counts every instruction of a decode"""
+        implied_mods = [
+            schema.implied_values.get(NamedField.MOD) for schema in columnar.schemas
+        ]
+        self.counts.update(
+            (int(schema_ind), implied_mods[schema_ind] if mod == ABSENT else int(mod))
+            for schema_ind, mod in zip(
+                columnar.schema_ids, columnar.fields[NamedField.MOD]
+            )
+        )
+
+    def hottest(self, count: int) -> list[ProfileKey]:
+        return [key for key, _ in self.counts.most_common(count)]
+
+    def schema_order(self, num_schemas: int) -> list[int]:
+        """Schema indices by how often they were decoded, config order among equals"""
+        per_schema: Counter[int] = Counter()
+        for (schema_ind, _), count in self.counts.items():
+            per_schema[schema_ind] += count
+        return sorted(range(num_schemas), key=lambda ind: -per_schema[ind])
+
+    @staticmethod
+    def path_for(directory: str | Path, schemas_hash: str) -> Path:
+        return Path(directory) / f"{PROFILE_PREFIX}{schemas_hash[:16]}.json"
+
+    def save(self, directory: str | Path) -> Path:
+        path = self.path_for(directory, self.schemas_hash)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "schemas_hash": self.schemas_hash,
+            "counts": [[*key, count] for key, count in self.counts.most_common()],
+        }
+        with tempfile.NamedTemporaryFile(
+            "w", dir=path.parent, suffix=".tmp", delete=False
+        ) as file:
+            json.dump(data, file)
+        os.replace(file.name, path)
+        return path
+
+    @classmethod
+    def load(
+        cls, directory: str | Path, parsable_instructions: list[InstructionSchema]
+    ) -> Self | None:
+        """The profile recorded against these schemas, None if there is none"""
+        schemas_hash = get_schemas_hash(parsable_instructions)
+        try:
+            data = json.loads(cls.path_for(directory, schemas_hash).read_text())
+        except FileNotFoundError:
+            return None
+        if data.get("schemas_hash") != schemas_hash:
+            return None
+        return cls(
+            schemas_hash,
+            Counter(
+                {(schema_ind, mod): count for schema_ind, mod, count in data["counts"]}
+            ),
+        )
+
+
+class ProfilingBackend:
+    """
+    Decodes through the opcode table and counts what it decoded into profile, which
+    is only written to directory when save is called
+    """
+
+    decodes_all_at_once = True
+
+    def __init__(
+        self,
+        parsable_instructions: list[InstructionSchema],
+        profile: DecodeProfile,
+        directory: str | Path | None = None,
+    ) -> None:
+        self.opcode_table = OpcodeTable.from_parsable_instructions(
+            parsable_instructions
+        )
+        self.profile = profile
+        self.directory = directory
+
+    @classmethod
+    def from_saved_profile(
+        cls,
+        parsable_instructions: list[InstructionSchema],
+        directory: str | Path | None = None,
+    ) -> Self:
+        """
+        Starts from the profile saved in directory, default_profile_directory() if
+        None, which save writes back to
+        """
+        directory = directory or default_profile_directory()
+        profile = DecodeProfile.load(directory, parsable_instructions) or DecodeProfile(
+            get_schemas_hash(parsable_instructions)
+        )
+        return cls(parsable_instructions, profile, directory)
+
+    def iter_decode(self, file_contents: bytes) -> Iterator[DisassembledInstruction]:
+        columnar = ColumnarDisassembly.from_bytes(self.opcode_table, file_contents)
+        self.profile.record(columnar)
+        return (columnar.instruction(i) for i in range(len(columnar)))
+
+    def save(self) -> Path:
+        if self.directory is None:
+            raise ValueError("No directory to save the profile to")
+        return self.profile.save(self.directory)
+
+
+@dataclass(frozen=True)
+class _FastLayout:
+    schema: InstructionSchema
+    header_size: int
+    size: int
+    header_values: dict[NamedField, int]
+    trailing_fields: tuple[NamedField, ...]
+
+
+@dataclass
+class SpecializationStats:
+    prebuilt: int = 0
+    fast_layout: int = 0
+    generic: int = 0
+
+
+class SpecializedDecoder:
+    def __init__(
+        self,
+        parsable_instructions: list[InstructionSchema],
+        profile: DecodeProfile | None,
+        max_fast_paths: int = DEFAULT_MAX_FAST_PATHS,
+    ) -> None:
+        self.plans = [FieldPlan.from_schema(schema) for schema in parsable_instructions]
+        profile = profile or DecodeProfile("")
+        self.generic_order = [
+            self.plans[ind] for ind in profile.schema_order(len(self.plans))
+        ]
+        # tier 1, by first byte for one byte encodings, by both bytes for two
+        self.prebuilt_one: list[DisassembledInstruction | None] = [None] * 256
+        self.prebuilt_two: dict[int, DisassembledInstruction] = {}
+        # tier 2, by the header bytes
+        self.fast_layouts_one: list[_FastLayout | None] = [None] * 256
+        self.fast_layouts_two: dict[int, _FastLayout] = {}
+        self.fast_paths = profile.hottest(max_fast_paths)
+        for schema_ind, mod in self.fast_paths:
+            self._specialize(self.plans[schema_ind], mod)
+        self.stats = SpecializationStats()
+
+    @classmethod
+    def from_saved_profile(
+        cls,
+        parsable_instructions: list[InstructionSchema],
+        directory: str | Path | None = None,
+    ) -> Self:
+        """
+        Specialized for the profile saved in directory, default_profile_directory() if
+        None, and not specialized at all if there is no profile for these schemas there
+        """
+        profile = DecodeProfile.load(
+            directory or default_profile_directory(), parsable_instructions
+        )
+        return cls(parsable_instructions, profile)
+
+    def _specialize(self, plan: FieldPlan, mod: int | None):
+        byte_values = [plan.matching_byte_values(i) for i in range(plan.header_size)]
+        for header in product(*byte_values):
+            header_values = plan.extract_header(header)
+            if _mod_of(plan.schema, header_values) != mod:
+                continue
+            trailing = plan.needed_trailing_fields(header_values)
+            layout = _FastLayout(
+                plan.schema,
+                plan.header_size,
+                plan.header_size + len(trailing),
+                header_values,
+                trailing,
+            )
+            if layout.size > MAX_PREBUILT_SIZE:
+                if plan.header_size == 1:
+                    self.fast_layouts_one[header[0]] = layout
+                else:
+                    self.fast_layouts_two[header[0] << 8 | header[1]] = layout
+                continue
+
+            for trailer in product(range(256), repeat=len(trailing)):
+                inst = _build(layout, (*header, *trailer), 0)
+                encoding = (*header, *trailer)
+                if len(encoding) == 1:
+                    self.prebuilt_one[encoding[0]] = inst
+                else:
+                    self.prebuilt_two[encoding[0] << 8 | encoding[1]] = inst
+
+    def _generic_layout(self, file_contents: bytes, offset: int) -> _FastLayout:
+        for plan in self.generic_order:
+            header = file_contents[offset : offset + plan.header_size]
+            if len(header) == plan.header_size and plan.matches(header):
+                header_values = plan.extract_header(header)
+                trailing = plan.needed_trailing_fields(header_values)
+                return _FastLayout(
+                    plan.schema,
+                    plan.header_size,
+                    plan.header_size + len(trailing),
+                    header_values,
+                    trailing,
+                )
+        if offset + 1 >= len(file_contents):
+            raise ValueError("Instruction stream ended in the middle of an instruction")
+        raise ValueError(
+            f"Undecodable instruction at offset {offset}: {file_contents[offset:offset + 2].hex()}"
+        )
+
+    def iter_decode(self, file_contents: bytes) -> Iterator[DisassembledInstruction]:
+        stats = self.stats
+        prebuilt_one, prebuilt_two = self.prebuilt_one, self.prebuilt_two
+        fast_layouts_one, fast_layouts_two = (
+            self.fast_layouts_one,
+            self.fast_layouts_two,
+        )
+        offset, end = 0, len(file_contents)
+        while offset < end:
+            b0 = file_contents[offset]
+            inst = prebuilt_one[b0]
+            if inst is None and offset + 1 < end:
+                inst = prebuilt_two.get(b0 << 8 | file_contents[offset + 1])
+            if inst is not None:
+                stats.prebuilt += 1
+                yield inst
+                offset += inst.inst_size
+                continue
+
+            layout = fast_layouts_one[b0]
+            if layout is None and offset + 1 < end:
+                layout = fast_layouts_two.get(b0 << 8 | file_contents[offset + 1])
+            if layout is not None:
+                stats.fast_layout += 1
+            else:
+                stats.generic += 1
+                layout = self._generic_layout(file_contents, offset)
+            if offset + layout.size > end:
+                raise ValueError(
+                    "Instruction stream ended in the middle of an instruction"
+                )
+            yield _build(layout, file_contents, offset)
+            offset += layout.size
+
+    def decode(self, file_contents: bytes) -> Disassembly:
+        return Disassembly(list(self.iter_decode(file_contents)))
+
+
+def _build(
+    layout: _FastLayout, file_contents: bytes | tuple[int, ...], offset: int
+) -> DisassembledInstruction:
+    parsed_fields = dict(layout.header_values)
+    for i, trailing_field in enumerate(layout.trailing_fields):
+        parsed_fields[trailing_field] = file_contents[offset + layout.header_size + i]
+    acc = DecodeAccumulator.from_parsed_fields(parsed_fields, layout.size)
+    acc.with_implied_fields(layout.schema.implied_values)
+    return acc.build(layout.schema)
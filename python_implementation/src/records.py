@@ -0,0 +1,265 @@
+"""
+Decoded instructions as fixed-width binary records, for tools that would otherwise
+parse listings back, losing offsets and sizes on the way.
+
+    magic b"DREC", u16 version, u16 record size, sha256 of the schemas,
+    u32 record count, u16 mnemonic count, u32 offset of the first record,
+    mnemonics as u8 length + utf-8, zero padding to a multiple of 8,
+    then one record per instruction in offset order, all LE:
+    u32 offset, u8 size, u16 schema id, u16 mnemonic id, i32 displacement,
+    i32 immediate (-1 when there is none), packed fields, zero padding
+
+Packed fields is a little-endian integer of PACKED_FIELDS_SIZE bytes, the lowest
+NUM_NAMED_FIELDS bits flagging which fields the instruction has, then each field's
+value in NamedField order taking its bit width. Displacement and immediate are the
+values the listing shows, as in ColumnarDisassembly.
+
+Records are all RECORD.size bytes, so RecordReader memory-maps the file and reads
+record i straight from where it is, and finds an offset by binary search over the
+records without reading the rest.
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Self
+
+from python_implementation.src.base.config_loader import get_schemas_hash
+from python_implementation.src.base.schema import (
+    NUM_NAMED_FIELDS,
+    InstructionSchema,
+    NamedField,
+)
+from python_implementation.src.columnar import ABSENT, ColumnarDisassembly
+from python_implementation.src.disassembled import DisassembledInstruction
+from python_implementation.src.intermediates.accumulator import DecodeAccumulator
+
+RECORDS_MAGIC = b"DREC"
+RECORDS_VERSION = 2
+RECORDS_HEADER = struct.Struct("<4sHH32sIHI")
+RECORDS_ALIGNMENT = 8
+
+PACKED_FIELDS_SIZE = (
+    NUM_NAMED_FIELDS + sum(field.bit_width for field in NamedField) + 7
+) // 8
+_RECORD_FIELDS = f"<IBHHii{PACKED_FIELDS_SIZE}s"
+RECORD = struct.Struct(
+    _RECORD_FIELDS + f"{-struct.calcsize(_RECORD_FIELDS) % RECORDS_ALIGNMENT}x"
+)
+_OFFSET = struct.Struct("<I")
+
+
+def _padding(size: int) -> bytes:
+    return bytes(-size % RECORDS_ALIGNMENT)
+
+
+def pack_fields(values: dict[NamedField, int]) -> bytes:
+    packed, shift = 0, NUM_NAMED_FIELDS
+    for field in NamedField:
+        value = values.get(field)
+        if value is not None:
+            packed |= 1 << field.ordinal | value << shift
+        shift += field.bit_width
+    return packed.to_bytes(PACKED_FIELDS_SIZE, "little")
+
+
+def unpack_fields(data: bytes) -> dict[NamedField, int]:
+    packed = int.from_bytes(data, "little")
+    values, shift = {}, NUM_NAMED_FIELDS
+    for field in NamedField:
+        if packed >> field.ordinal & 1:
+            values[field] = packed >> shift & ((1 << field.bit_width) - 1)
+        shift += field.bit_width
+    return values
+
+
+@dataclass(frozen=True)
+class InstructionRecord:
+    offset: int
+    size: int
+    schema_id: int
+    mnemonic: str
+    fields: dict[NamedField, int]
+    displacement: int
+    immediate: int
+
+
+def columnar_to_bytes(columnar: ColumnarDisassembly) -> bytes:
+    mnemonics = columnar.mnemonics
+    mnemonic_table = b"".join(
+        bytes([len(encoded)]) + encoded
+        for encoded in (mnemonic.encode() for mnemonic in mnemonics)
+    )
+    records_offset = RECORDS_HEADER.size + len(mnemonic_table)
+    records_offset += -records_offset % RECORDS_ALIGNMENT
+    parts = [
+        RECORDS_HEADER.pack(
+            RECORDS_MAGIC,
+            RECORDS_VERSION,
+            RECORD.size,
+            bytes.fromhex(get_schemas_hash(columnar.schemas)),
+            len(columnar),
+            len(mnemonics),
+            records_offset,
+        ),
+        mnemonic_table,
+        _padding(RECORDS_HEADER.size + len(mnemonic_table)),
+    ]
+    # (presence bit, value shift, column) of every field, packed like pack_fields
+    field_columns = []
+    shift = NUM_NAMED_FIELDS
+    for field in NamedField:
+        field_columns.append((1 << field.ordinal, shift, columnar.fields[field]))
+        shift += field.bit_width
+    for ind in range(len(columnar)):
+        packed = 0
+        for presence_bit, value_shift, column in field_columns:
+            value = int(column[ind])
+            if value != ABSENT:
+                packed |= presence_bit | value << value_shift
+        parts.append(
+            RECORD.pack(
+                int(columnar.offsets[ind]),
+                int(columnar.sizes[ind]),
+                int(columnar.schema_ids[ind]),
+                int(columnar.mnemonic_ids[ind]),
+                int(columnar.displacements[ind]),
+                int(columnar.immediates[ind]),
+                packed.to_bytes(PACKED_FIELDS_SIZE, "little"),
+            )
+        )
+    return b"".join(parts)
+
+
+def write_records(path: str | Path, columnar: ColumnarDisassembly):
+    path = Path(path)
+    data = columnar_to_bytes(columnar)
+    with tempfile.NamedTemporaryFile(
+        dir=path.parent, suffix=".tmp", delete=False
+    ) as file:
+        file.write(data)
+    os.replace(file.name, path)
+
+
+class RecordReader:
+    def __init__(
+        self,
+        path: str | Path,
+        schemas: list[InstructionSchema] | None = None,
+    ) -> None:
+        """
+        :param schemas: The parsable instructions, only needed to rebuild instructions,
+            which the reader refuses if the file was decoded with other schemas
+        """
+        self.schemas = schemas
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_header()
+        except BaseException:
+            self._mmap.close()
+            raise
+
+    def _read_header(self):
+        if len(self._mmap) < RECORDS_HEADER.size:
+            raise ValueError("Not a record file, too short for the header")
+        (
+            magic,
+            version,
+            record_size,
+            stored_schemas,
+            self.num_records,
+            num_mnemonics,
+            self.records_offset,
+        ) = RECORDS_HEADER.unpack_from(self._mmap)
+        if magic != RECORDS_MAGIC:
+            raise ValueError("Not a record file")
+        if version != RECORDS_VERSION or record_size != RECORD.size:
+            raise ValueError(
+                f"Record file version {version} with {record_size} byte records, "
+                f"this reader supports version {RECORDS_VERSION} with {RECORD.size}"
+            )
+        if len(self._mmap) < self.records_offset + self.num_records * RECORD.size:
+            raise ValueError("Record file is truncated")
+        self.schemas_hash = stored_schemas.hex()
+        self.matches_schemas = (
+            self.schemas is not None
+            and self.schemas_hash == get_schemas_hash(self.schemas)
+        )
+
+        self.mnemonics = []
+        pos = RECORDS_HEADER.size
+        for _ in range(num_mnemonics):
+            length = self._mmap[pos]
+            self.mnemonics.append(self._mmap[pos + 1 : pos + 1 + length].decode())
+            pos += 1 + length
+
+    def __len__(self) -> int:
+        return self.num_records
+
+    def _position(self, ind: int) -> int:
+        if ind < 0:
+            ind += self.num_records
+        if not 0 <= ind < self.num_records:
+            raise IndexError(f"Record {ind} out of range")
+        return self.records_offset + ind * RECORD.size
+
+    def __getitem__(self, ind: int) -> InstructionRecord:
+        (
+            offset,
+            size,
+            schema_id,
+            mnemonic_id,
+            displacement,
+            immediate,
+            packed_fields,
+        ) = RECORD.unpack_from(self._mmap, self._position(ind))
+        return InstructionRecord(
+            offset,
+            size,
+            schema_id,
+            self.mnemonics[mnemonic_id],
+            unpack_fields(packed_fields),
+            displacement,
+            immediate,
+        )
+
+    def offset(self, ind: int) -> int:
+        (offset,) = _OFFSET.unpack_from(self._mmap, self._position(ind))
+        return offset
+
+    def index_of_offset(self, offset: int) -> int | None:
+        """Record of the instruction starting at offset, None if none starts there"""
+        lo, hi = 0, self.num_records
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.offset(mid) < offset:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.num_records and self.offset(lo) == offset:
+            return lo
+        return None
+
+    def instruction(self, ind: int) -> DisassembledInstruction:
+        if not self.matches_schemas:
+            raise ValueError(
+                "Rebuilding instructions needs the schemas the file was decoded with"
+            )
+        record = self[ind]
+        schema = self.schemas[record.schema_id]
+        acc = DecodeAccumulator.from_parsed_fields(record.fields, record.size)
+        acc.with_implied_fields(schema.implied_values)
+        return acc.build(schema)
+
+    def close(self):
+        self._mmap.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -0,0 +1,231 @@
+"""
+Persistent cache of disassembly results, addressed by content.
+
+An entry is keyed by the sha256 of the input bytes, the hash of the instruction
+schemas of the disassembler that decodes it and the renderer version, so a changed
+binary, config or listing format is simply a miss.
+Each entry is one file holding the columnar decode result and the rendered listing,
+both zlib compressed:
+
+    magic b"DSMC", u32 LE columns length, u32 LE listing length, columns, listing
+
+Entries are written to a temp file and renamed into place, so workers sharing a cache
+directory only ever see whole entries. A hit bumps the entry's mtime, and once the
+cache grows past its size cap the least recently used entries are deleted. An entry
+that is cut short or does not decompress is a miss, and is deleted so it gets rewritten.
+"""
+
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from pathlib import Path
+
+from python_implementation.src.base.schema import InstructionSchema, NamedField
+from python_implementation.src.columnar import ColumnarDisassembly
+from python_implementation.src.disassembled import RENDERER_VERSION
+from python_implementation.src.disassembler import Disassembler
+
+ENTRY_MAGIC = b"DSMC"
+ENTRY_HEADER = "<4sII"
+ENTRY_SUFFIX = ".entry"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+WHOLE_BINARY_NAMESPACE = "binary"
+
+# (column name, typecode) in the order they are serialized, offsets are rebuilt from sizes
+_COLUMNS = (
+    ("sizes", "B"),
+    ("schema_ids", "h"),
+    ("mnemonic_ids", "h"),
+    ("displacements", "i"),
+    ("immediates", "i"),
+)
+_FIELD_TYPECODE = "h"
+
+
+def _to_le_bytes(typecode: str, column) -> bytes:
+    packed = array(typecode, column)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _from_le_bytes(typecode: str, data: memoryview) -> array:
+    unpacked = array(typecode)
+    unpacked.frombytes(data)
+    if sys.byteorder == "big":
+        unpacked.byteswap()
+    return unpacked
+
+
+def serialize_columnar(columnar: ColumnarDisassembly) -> bytes:
+    parts = [
+        _to_le_bytes(typecode, getattr(columnar, name)) for name, typecode in _COLUMNS
+    ]
+    parts.extend(
+        _to_le_bytes(_FIELD_TYPECODE, columnar.fields[field]) for field in NamedField
+    )
+    return struct.pack("<I", len(columnar)) + b"".join(parts)
+
+
+def deserialize_columnar(
+    data: bytes, schemas: list[InstructionSchema]
+) -> ColumnarDisassembly:
+    (num_instructions,) = struct.unpack_from("<I", data)
+    view = memoryview(data)[struct.calcsize("<I") :]
+
+    def take(typecode: str) -> array:
+        nonlocal view
+        num_bytes = num_instructions * array(typecode).itemsize
+        if len(view) < num_bytes:
+            raise ValueError("Columnar data is cut short")
+        column, view = _from_le_bytes(typecode, view[:num_bytes]), view[num_bytes:]
+        return column
+
+    columns = {name: take(typecode) for name, typecode in _COLUMNS}
+    fields = {field: take(_FIELD_TYPECODE) for field in NamedField}
+    offsets, offset = array("I"), 0
+    for size in columns["sizes"]:
+        offsets.append(offset)
+        offset += size
+    return ColumnarDisassembly(schemas, offsets, fields=fields, **columns)
+
+
+class ResultCache:
+    def __init__(
+        self,
+        directory: str | Path,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        renderer_version: int = RENDERER_VERSION,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.renderer_version = renderer_version
+        # other workers write too, this is only a hint for when to rescan and evict
+        self._approx_bytes = sum(size for _, _, size in self._scan())
+
+    def key(
+        self,
+        disassembler: Disassembler,
+        file_contents: bytes,
+        namespace: str = WHOLE_BINARY_NAMESPACE,
+    ) -> str:
+        """
+        :param namespace: Kept apart so entries stored for other uses of the same bytes,
+            which may not hold a listing, are never returned for another
+        """
+        input_hash = hashlib.sha256(file_contents).hexdigest()
+        key_source = ":".join(
+            (
+                namespace,
+                input_hash,
+                disassembler.schemas_hash,
+                str(self.renderer_version),
+            )
+        )
+        return hashlib.sha256(key_source.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / (key + ENTRY_SUFFIX)
+
+    def _read(self, key: str) -> tuple[bytes, bytes] | None:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as file:
+                entry = file.read()
+            os.utime(path)
+        except FileNotFoundError:  # never written, or evicted by another worker
+            return None
+        start = struct.calcsize(ENTRY_HEADER)
+        if len(entry) >= start:
+            magic, columns_len, listing_len = struct.unpack_from(ENTRY_HEADER, entry)
+            if magic == ENTRY_MAGIC and len(entry) == start + columns_len + listing_len:
+                return (
+                    entry[start : start + columns_len],
+                    entry[start + columns_len :],
+                )
+        self._discard(key)
+        return None
+
+    def _discard(self, key: str):
+        """Drops a corrupt entry, the next put writes it afresh"""
+        self._path(key).unlink(missing_ok=True)
+
+    def get_listing(self, key: str) -> str | None:
+        entry = self._read(key)
+        if entry is None:
+            return None
+        try:
+            return zlib.decompress(entry[1]).decode()
+        except (zlib.error, UnicodeDecodeError):
+            self._discard(key)
+            return None
+
+    def get_columnar(
+        self, key: str, schemas: list[InstructionSchema]
+    ) -> ColumnarDisassembly | None:
+        entry = self._read(key)
+        if entry is None:
+            return None
+        try:
+            return deserialize_columnar(zlib.decompress(entry[0]), schemas)
+        except (zlib.error, struct.error, ValueError):
+            self._discard(key)
+            return None
+
+    def put(self, key: str, columnar: ColumnarDisassembly, listing: str):
+        columns = zlib.compress(serialize_columnar(columnar))
+        rendered = zlib.compress(listing.encode())
+        entry = (
+            struct.pack(ENTRY_HEADER, ENTRY_MAGIC, len(columns), len(rendered))
+            + columns
+            + rendered
+        )
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        # write then rename so a concurrent reader never sees half an entry
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, suffix=".tmp", delete=False
+        ) as file:
+            file.write(entry)
+        os.replace(file.name, path)
+
+        self._approx_bytes += len(entry)
+        if self._approx_bytes > self.max_bytes:
+            self.evict()
+
+    def _scan(self) -> list[tuple[int, Path, int]]:
+        """(mtime, path, size) of every entry"""
+        entries = []
+        for path in self.directory.glob("*/*" + ENTRY_SUFFIX):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, path, stat.st_size))
+        return entries
+
+    def evict(self):
+        """Delete least recently used entries until the cache is under its size cap"""
+        entries = sorted(self._scan())
+        total = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        self._approx_bytes = total
+
+    def disassemble(self, disassembler: Disassembler, file_contents: bytes) -> str:
+        """The rendered listing, decoded and stored on a miss"""
+        key = self.key(disassembler, file_contents)
+        listing = self.get_listing(key)
+        if listing is None:
+            columnar = disassembler.decode_columnar(file_contents)
+            listing = str(columnar)
+            self.put(key, columnar, listing)
+        return listing
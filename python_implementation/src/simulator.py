@@ -0,0 +1,396 @@
+"""
+Execute decoded 8086 code.
+
+The machine has the 8 general and 4 segment registers, the flags and a 1 MB memory.
+Code runs from cs:ip until ip leaves the loaded program or an instruction limit is
+reached, data goes through ds, or ss for addresses based on bp, and the stack
+through ss:sp.
+
+Each instruction is decoded once, through the OpcodeTable, into the same operand
+classes the listing uses, and kept in a cache keyed by its physical address. A write
+to memory that overlaps a cached instruction drops that entry, so self modifying
+code is decoded again while loops that leave their code alone never are.
+
+Listings render some values the way the reference assembler output does, which is not
+always the value the CPU uses, e.g. a 16 bit displacement under 0x100 is shown as a
+negative byte and a sign extended immediate as its low byte. Memory and immediate
+operands are rebuilt here from the raw fields instead.
+"""
+
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, replace
+
+from python_implementation.src.base.schema import NamedField
+from python_implementation.src.disassembled import (
+    DisassembledBinaryInstruction,
+    DisassembledInstruction,
+    DisassembledJumpInstruction,
+    DisassembledUnaryInstruction,
+)
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.intermediates.accumulator import DecodeAccumulator
+from python_implementation.src.intermediates.operands import (
+    ImmediateOperand,
+    MemoryOperand,
+    Operand,
+    RegOperand,
+    SegmentRegOperand,
+)
+from python_implementation.src.utils import combine_bytes
+
+MEMORY_SIZE = 1 << 20
+MAX_INSTRUCTION_SIZE = 6
+
+CARRY_FLAG = 1 << 0
+PARITY_FLAG = 1 << 2
+AUX_CARRY_FLAG = 1 << 4
+ZERO_FLAG = 1 << 6
+SIGN_FLAG = 1 << 7
+OVERFLOW_FLAG = 1 << 11
+ARITHMETIC_FLAGS = (
+    CARRY_FLAG | PARITY_FLAG | AUX_CARRY_FLAG | ZERO_FLAG | SIGN_FLAG | OVERFLOW_FLAG
+)
+FLAG_NAMES = [
+    (CARRY_FLAG, "C"),
+    (PARITY_FLAG, "P"),
+    (AUX_CARRY_FLAG, "A"),
+    (ZERO_FLAG, "Z"),
+    (SIGN_FLAG, "S"),
+    (OVERFLOW_FLAG, "O"),
+]
+
+WORD_REGISTER_NAMES = ["ax", "cx", "dx", "bx", "sp", "bp", "si", "di"]
+CX, SP, BP = 1, 4, 5
+ES, CS, SS, DS = range(4)
+# memory bases that address the stack segment by default
+_BP_BASES = {2, 3, 6}
+_BASE_REGISTERS = [
+    tuple(WORD_REGISTER_NAMES.index(name) for name in names)
+    for names in MemoryOperand.RM_TO_EFFECTIVE_ADDR_CALC
+]
+
+
+def _parity(value: int) -> bool:
+    return bin(value & 0xFF).count("1") % 2 == 0
+
+
+_JUMP_CONDITIONS: dict[str, Callable[[int], bool]] = {
+    "je": lambda f: bool(f & ZERO_FLAG),
+    "jne": lambda f: not f & ZERO_FLAG,
+    "jl": lambda f: bool(f & SIGN_FLAG) != bool(f & OVERFLOW_FLAG),
+    "jnl": lambda f: bool(f & SIGN_FLAG) == bool(f & OVERFLOW_FLAG),
+    "jle": lambda f: bool(f & ZERO_FLAG)
+    or bool(f & SIGN_FLAG) != bool(f & OVERFLOW_FLAG),
+    "jg": lambda f: not f & ZERO_FLAG
+    and bool(f & SIGN_FLAG) == bool(f & OVERFLOW_FLAG),
+    "jb": lambda f: bool(f & CARRY_FLAG),
+    "jnb": lambda f: not f & CARRY_FLAG,
+    "jbe": lambda f: bool(f & (CARRY_FLAG | ZERO_FLAG)),
+    "ja": lambda f: not f & (CARRY_FLAG | ZERO_FLAG),
+    "jp": lambda f: bool(f & PARITY_FLAG),
+    "jnp": lambda f: not f & PARITY_FLAG,
+    "jo": lambda f: bool(f & OVERFLOW_FLAG),
+    "jno": lambda f: not f & OVERFLOW_FLAG,
+    "js": lambda f: bool(f & SIGN_FLAG),
+    "jns": lambda f: not f & SIGN_FLAG,
+}
+# cx is decremented first, then the jump is taken when the condition holds
+_LOOP_CONDITIONS: dict[str, Callable[[int], bool]] = {
+    "loop": lambda f: True,
+    "loopz": lambda f: bool(f & ZERO_FLAG),
+    "loopnz": lambda f: not f & ZERO_FLAG,
+}
+
+
+def true_displacement(parsed_fields: dict[NamedField, int]) -> int:
+    """16 bit displacement of a memory operand, a byte displacement sign extended"""
+    disp_lo = parsed_fields.get(NamedField.DISP_LO)
+    if disp_lo is None:
+        return 0
+    disp_hi = parsed_fields.get(NamedField.DISP_HI)
+    if disp_hi is None:
+        return disp_lo - 0x100 if disp_lo & 0x80 else disp_lo
+    return disp_hi << 8 | disp_lo
+
+
+def true_immediate(parsed_fields: dict[NamedField, int]) -> int | None:
+    data = parsed_fields.get(NamedField.DATA)
+    if data is None:
+        return None
+    for high_field in (NamedField.DATA_IF_W1, NamedField.DATA_IF_SW_01):
+        if high_field in parsed_fields:
+            return combine_bytes(data, parsed_fields[high_field])
+    if parsed_fields.get(NamedField.S) == 1 and parsed_fields.get(NamedField.W) == 1:
+        return data | 0xFF00 if data & 0x80 else data
+    return data
+
+
+@dataclass(frozen=True)
+class DecodedInstruction:
+    """An instruction with the operands the CPU uses, see the module docstring"""
+
+    instruction: DisassembledInstruction
+    operands: tuple[Operand, ...]
+
+
+@dataclass
+class SimulationStats:
+    instructions: int = 0
+    decodes: int = 0
+    invalidations: int = 0
+    seconds: float = 0.0
+
+    @property
+    def instructions_per_second(self) -> float:
+        return self.instructions / self.seconds if self.seconds else 0.0
+
+
+class Simulator:
+    def __init__(self, disassembler: Disassembler) -> None:
+        self.opcode_table = disassembler.opcode_table
+        self.schemas = disassembler.parsable_instructions
+        self.memory = bytearray(MEMORY_SIZE)
+        self.registers = [0] * 8
+        self.segments = [0] * 4
+        self.ip = 0
+        self.flags = 0
+        self.program_end = 0
+        # physical address -> decoded instruction starting there
+        self.decoded: dict[int, DecodedInstruction] = {}
+        # how many cached instructions cover each byte of memory
+        self.code_coverage = bytearray(MEMORY_SIZE)
+        self.stats = SimulationStats()
+        self._handlers: dict[str, Callable[[DecodedInstruction], None]] = {
+            "mov": self._mov,
+            "add": self._add,
+            "sub": self._sub,
+            "cmp": self._cmp,
+            "push": self._push,
+            "pop": self._pop,
+            "jcxz": self._jcxz,
+            **{mnemonic: self._jump for mnemonic in _JUMP_CONDITIONS},
+            **{mnemonic: self._loop for mnemonic in _LOOP_CONDITIONS},
+        }
+
+    def load(self, program: bytes, code_segment: int = 0):
+        """Place program at code_segment:0 and point cs:ip at it"""
+        start = code_segment << 4
+        self.write_bytes(start, program)
+        self.segments[CS] = code_segment
+        self.ip = 0
+        self.program_end = len(program)
+
+    def register(self, name: str) -> int:
+        if name in WORD_REGISTER_NAMES:
+            return self.registers[WORD_REGISTER_NAMES.index(name)]
+        return self.segments[SegmentRegOperand.SEGMENT_NAMES.index(name)]
+
+    def flag_string(self) -> str:
+        return "".join(name for bit, name in FLAG_NAMES if self.flags & bit)
+
+    # memory
+
+    def write_bytes(self, address: int, data: bytes):
+        for i, byte in enumerate(data):
+            self._write_byte((address + i) % MEMORY_SIZE, byte)
+
+    def _write_byte(self, address: int, value: int):
+        self.memory[address] = value
+        if self.code_coverage[address]:
+            self._invalidate(address)
+
+    def _invalidate(self, address: int):
+        for start in range(address - MAX_INSTRUCTION_SIZE + 1, address + 1):
+            decoded = self.decoded.get(start % MEMORY_SIZE)
+            if decoded is None or start + decoded.instruction.inst_size <= address:
+                continue
+            del self.decoded[start % MEMORY_SIZE]
+            self.stats.invalidations += 1
+            for covered in range(start, start + decoded.instruction.inst_size):
+                self.code_coverage[covered % MEMORY_SIZE] -= 1
+
+    def _read(self, address: int, word: bool) -> int:
+        value = self.memory[address]
+        if word:
+            value |= self.memory[(address + 1) % MEMORY_SIZE] << 8
+        return value
+
+    def _write(self, address: int, word: bool, value: int):
+        self._write_byte(address, value & 0xFF)
+        if word:
+            self._write_byte((address + 1) % MEMORY_SIZE, value >> 8)
+
+    def _address(self, op: MemoryOperand) -> int:
+        offset = op.displacement
+        segment = DS
+        if op.memory_base is not None:
+            offset += sum(
+                self.registers[reg] for reg in _BASE_REGISTERS[op.memory_base]
+            )
+            if op.memory_base in _BP_BASES:
+                segment = SS
+        return ((self.segments[segment] << 4) + (offset & 0xFFFF)) % MEMORY_SIZE
+
+    # operands
+
+    def _get(self, op: Operand) -> int:
+        if isinstance(op, RegOperand):
+            if op.word:
+                return self.registers[op.register_index]
+            value = self.registers[op.register_index & 0b11]
+            return value >> 8 if op.register_index & 0b100 else value & 0xFF
+        if isinstance(op, SegmentRegOperand):
+            return self.segments[op.sr_index]
+        if isinstance(op, MemoryOperand):
+            return self._read(self._address(op), op.word)
+        return op.value
+
+    def _set(self, op: Operand, value: int):
+        if isinstance(op, RegOperand):
+            if op.word:
+                self.registers[op.register_index] = value & 0xFFFF
+                return
+            reg = op.register_index & 0b11
+            if op.register_index & 0b100:
+                self.registers[reg] = (self.registers[reg] & 0xFF) | (value & 0xFF) << 8
+            else:
+                self.registers[reg] = (self.registers[reg] & 0xFF00) | value & 0xFF
+        elif isinstance(op, SegmentRegOperand):
+            self.segments[op.sr_index] = value & 0xFFFF
+        elif isinstance(op, MemoryOperand):
+            self._write(self._address(op), op.word, value)
+        else:
+            raise ValueError(f"Can't write to {op}")
+
+    # decoding
+
+    def _decode(self, address: int) -> DecodedInstruction:
+        layout = self.opcode_table.layout(self.memory, address)
+        parsed_fields = dict(layout.header_values)
+        for field, field_offset in layout.trailing_offsets:
+            parsed_fields[field] = self.memory[(address + field_offset) % MEMORY_SIZE]
+        schema = self.schemas[layout.schema_ind]
+        acc = DecodeAccumulator.from_parsed_fields(parsed_fields, layout.size)
+        acc.with_implied_fields(schema.implied_values)
+        inst = acc.build(schema)
+
+        if isinstance(inst, DisassembledBinaryInstruction):
+            operands = (inst.dest, inst.source)
+        elif isinstance(inst, DisassembledUnaryInstruction):
+            operands = (inst.op,)
+        else:
+            operands = ()
+        displacement = true_displacement(parsed_fields)
+        immediate = true_immediate(parsed_fields)
+        operands = tuple(
+            (
+                replace(op, displacement=displacement)
+                if isinstance(op, MemoryOperand)
+                else (
+                    replace(op, value=immediate)
+                    if isinstance(op, ImmediateOperand)
+                    else op
+                )
+            )
+            for op in operands
+        )
+
+        decoded = DecodedInstruction(inst, operands)
+        self.decoded[address] = decoded
+        for covered in range(address, address + layout.size):
+            self.code_coverage[covered % MEMORY_SIZE] += 1
+        self.stats.decodes += 1
+        return decoded
+
+    # execution
+
+    def step(self):
+        address = ((self.segments[CS] << 4) + self.ip) % MEMORY_SIZE
+        decoded = self.decoded.get(address)
+        if decoded is None:
+            decoded = self._decode(address)
+        self.ip = (self.ip + decoded.instruction.inst_size) & 0xFFFF
+        self._handlers[decoded.instruction.mnemonic](decoded)
+        self.stats.instructions += 1
+
+    def run(self, max_instructions: int | None = None) -> SimulationStats:
+        """Until ip leaves the loaded program or max_instructions have run"""
+        start = time.perf_counter()
+        executed = 0
+        while self.ip < self.program_end and (
+            max_instructions is None or executed < max_instructions
+        ):
+            self.step()
+            executed += 1
+        self.stats.seconds += time.perf_counter() - start
+        return self.stats
+
+    def _mov(self, decoded: DecodedInstruction):
+        dest, source = decoded.operands
+        self._set(dest, self._get(source))
+
+    def _arithmetic(self, decoded: DecodedInstruction, subtract: bool) -> int:
+        dest, source = decoded.operands
+        bits = 16 if dest.word else 8
+        mask, sign = (1 << bits) - 1, 1 << (bits - 1)
+        a, b = self._get(dest), self._get(source) & mask
+        if subtract:
+            full = a - b
+            carry = a < b
+            overflow = (a ^ b) & (a ^ full) & sign
+        else:
+            full = a + b
+            carry = full > mask
+            overflow = ~(a ^ b) & (a ^ full) & sign
+        result = full & mask
+        flags = self.flags & ~ARITHMETIC_FLAGS
+        flags |= CARRY_FLAG if carry else 0
+        flags |= PARITY_FLAG if _parity(result) else 0
+        flags |= AUX_CARRY_FLAG if (a ^ b ^ full) & 0x10 else 0
+        flags |= ZERO_FLAG if result == 0 else 0
+        flags |= SIGN_FLAG if result & sign else 0
+        flags |= OVERFLOW_FLAG if overflow else 0
+        self.flags = flags
+        return result
+
+    def _add(self, decoded: DecodedInstruction):
+        self._set(decoded.operands[0], self._arithmetic(decoded, subtract=False))
+
+    def _sub(self, decoded: DecodedInstruction):
+        self._set(decoded.operands[0], self._arithmetic(decoded, subtract=True))
+
+    def _cmp(self, decoded: DecodedInstruction):
+        self._arithmetic(decoded, subtract=True)
+
+    def _push(self, decoded: DecodedInstruction):
+        # the 8086 decrements first, so push sp pushes the decremented sp
+        self.registers[SP] = (self.registers[SP] - 2) & 0xFFFF
+        value = self._get(decoded.operands[0])
+        self._write(self._stack_address(), True, value)
+
+    def _pop(self, decoded: DecodedInstruction):
+        value = self._read(self._stack_address(), True)
+        self.registers[SP] = (self.registers[SP] + 2) & 0xFFFF
+        self._set(decoded.operands[0], value)
+
+    def _stack_address(self) -> int:
+        return ((self.segments[SS] << 4) + self.registers[SP]) % MEMORY_SIZE
+
+    def _take(self, decoded: DecodedInstruction):
+        jump = decoded.instruction
+        assert isinstance(jump, DisassembledJumpInstruction)
+        self.ip = (self.ip + jump.displ) & 0xFFFF
+
+    def _jump(self, decoded: DecodedInstruction):
+        if _JUMP_CONDITIONS[decoded.instruction.mnemonic](self.flags):
+            self._take(decoded)
+
+    def _loop(self, decoded: DecodedInstruction):
+        cx = self.registers[CX] = (self.registers[CX] - 1) & 0xFFFF
+        if cx != 0 and _LOOP_CONDITIONS[decoded.instruction.mnemonic](self.flags):
+            self._take(decoded)
+
+    def _jcxz(self, decoded: DecodedInstruction):
+        if self.registers[CX] == 0:
+            self._take(decoded)
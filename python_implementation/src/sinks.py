@@ -0,0 +1,177 @@
+"""
+One decode feeding any number of outputs.
+
+run_pipeline hands every decoded instruction, with its byte offset, to each sink in
+turn, then closes them all, or aborts them all if decoding failed part way. When a
+sink fails to close, the sinks after it are aborted. A sink is anything with write,
+close and abort, so adding an output never adds a decode:
+
+- ListingSink writes the listing str(Disassembly) would give. Labels are only known
+  once every jump has been seen, so unlabelled lines are spooled to a temp file
+  and the listing is written from it on close.
+- NdjsonSink writes a JSON object per instruction as it is decoded:
+  {"offset": 0, "size": 2, "mnemonic": "mov", "operands": ["cx", "bx"]},
+  jumps also have their absolute "target" offset.
+- StatsSink counts instructions, bytes, jumps and mnemonics, writing them as JSON
+  on close if given a path.
+
+The file sinks buffer lines and are written atomically, compressed if the path
+ends in .gz, .xz or .bz2.
+"""
+
+import json
+import tempfile
+from collections import Counter
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Protocol
+
+from python_implementation.src.compressed_io import AtomicLineWriter
+from python_implementation.src.disassembled import (
+    DisassembledBinaryInstruction,
+    DisassembledInstruction,
+    DisassembledJumpInstruction,
+    DisassembledUnaryInstruction,
+    LabelFinder,
+)
+
+SPOOL_BUFFER_SIZE = 1024 * 1024
+
+
+class InstructionSink(Protocol):
+    def write(self, offset: int, inst: DisassembledInstruction):
+        """Called once per instruction, in order"""
+        ...
+
+    def close(self):
+        """Every instruction has been written"""
+        ...
+
+    def abort(self):
+        """Decoding failed, nothing partial should be left behind"""
+        ...
+
+
+def run_pipeline(
+    instructions: Iterable[DisassembledInstruction], sinks: Sequence[InstructionSink]
+):
+    offset = 0
+    try:
+        for inst in instructions:
+            for sink in sinks:
+                sink.write(offset, inst)
+            offset += inst.inst_size
+    except BaseException:
+        for sink in sinks:
+            sink.abort()
+        raise
+    for ind, sink in enumerate(sinks):
+        try:
+            sink.close()
+        except BaseException:
+            # the sinks closed before it are written, the rest never will be
+            for unclosed in sinks[ind + 1 :]:
+                unclosed.abort()
+            raise
+
+
+class ListingSink:
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.label_finder = LabelFinder()
+        # a line per instruction: offset, rendered text, then for jumps the
+        # mnemonic, displacement and size to render it again with its label
+        self.spool = tempfile.TemporaryFile(
+            "w+", dir=self.path.parent, buffering=SPOOL_BUFFER_SIZE
+        )
+
+    def write(self, offset: int, inst: DisassembledInstruction):
+        self.label_finder.add(inst)
+        if isinstance(inst, DisassembledJumpInstruction):
+            self.spool.write(
+                f"{offset}\t{inst}\t{inst.mnemonic}\t{inst.displ}\t{inst.inst_size}\n"
+            )
+        else:
+            self.spool.write(f"{offset}\t{inst}\n")
+
+    def _iter_lines(self, offset_to_label: dict[int, str]) -> Iterator[str]:
+        yield "bits 16"
+        for spooled in self.spool:
+            offset, text, *jump = spooled.rstrip("\n").split("\t")
+            if int(offset) in offset_to_label:
+                yield offset_to_label[int(offset)] + ":"
+            if jump:
+                mnemonic, displ, inst_size = jump
+                inst = DisassembledJumpInstruction(mnemonic, int(displ), int(inst_size))
+                label = offset_to_label.get(inst.get_abs_label_offset(int(offset)))
+                if label is not None:
+                    text = str(inst.with_label(label))
+            yield text
+
+    def close(self):
+        self.spool.seek(0)
+        with self.spool, AtomicLineWriter(self.path) as writer:
+            writer.write_lines(self._iter_lines(self.label_finder.labels()))
+
+    def abort(self):
+        self.spool.close()
+
+
+def instruction_record(offset: int, inst: DisassembledInstruction) -> dict:
+    record: dict = {"offset": offset, "size": inst.inst_size, "mnemonic": inst.mnemonic}
+    match inst:
+        case DisassembledUnaryInstruction():
+            record["operands"] = [str(inst.op)]
+        case DisassembledBinaryInstruction():
+            record["operands"] = [str(inst.dest), str(inst.source)]
+        case DisassembledJumpInstruction():
+            record["operands"] = [f"${inst.displ:+}"]
+            record["target"] = inst.get_abs_label_offset(offset)
+        case _:
+            record["operands"] = []
+    return record
+
+
+class NdjsonSink:
+    def __init__(self, path: str | Path) -> None:
+        self.writer = AtomicLineWriter(path)
+
+    def write(self, offset: int, inst: DisassembledInstruction):
+        self.writer.write_line(json.dumps(instruction_record(offset, inst)))
+
+    def close(self):
+        self.writer.close()
+
+    def abort(self):
+        self.writer.abort()
+
+
+@dataclass
+class InstructionStats:
+    instructions: int = 0
+    bytes: int = 0
+    jumps: int = 0
+    mnemonics: Counter[str] = field(default_factory=Counter)
+
+
+class StatsSink:
+    def __init__(self, path: str | Path | None = None) -> None:
+        self.path = path
+        self.stats = InstructionStats()
+
+    def write(self, offset: int, inst: DisassembledInstruction):
+        self.stats.instructions += 1
+        self.stats.bytes += inst.inst_size
+        self.stats.jumps += isinstance(inst, DisassembledJumpInstruction)
+        self.stats.mnemonics[inst.mnemonic] += 1
+
+    def close(self):
+        if self.path is not None:
+            stats = asdict(self.stats)
+            stats["mnemonics"] = dict(self.stats.mnemonics.most_common())
+            with AtomicLineWriter(self.path) as writer:
+                writer.write_line(json.dumps(stats))
+
+    def abort(self):
+        pass
@@ -0,0 +1,301 @@
+"""
+Export of disassembled binaries to SQLite, to query them with SQL:
+
+    binaries(id, name, sha256, size, config_hash, instructions)
+    instructions(binary_id, offset, size, mnemonic, operands, text)
+    labels(binary_id, offset, name)
+    jumps(binary_id, source, target, mnemonic, label)
+
+config_hash is the Disassembler.schemas_hash of the schemas the binary was decoded
+with. text is the instruction as the listing shows it, operands joined by ", ", and
+a jump's label is None when its target does not start an instruction. Binaries are
+identified by their sha256, so exporting into an existing database only appends
+the ones it does not have yet.
+
+Rows are inserted with executemany batch_size at a time. A transaction is only
+committed between binaries, once rows_per_transaction rows are pending, so an
+interrupted export never leaves part of a binary behind. The database runs in WAL
+mode with synchronous=NORMAL, so a commit does not wait for an fsync of the whole
+database.
+
+Building an index once over all rows is much cheaper than keeping it up to date
+row by row, but only when the load is a good part of the table, rebuilding the
+indexes of a big database to append a small binary costs far more than it saves.
+So the query indexes are dropped once the instructions loaded reach
+DEFER_INDEXES_FRACTION of those already in the database, which a fresh database
+always does, and are built again, with ANALYZE, on close or abort.
+"""
+
+import argparse
+import hashlib
+import sqlite3
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Self
+
+from python_implementation.src.compressed_io import read_file
+from python_implementation.src.disassembled import DisassembledJumpInstruction
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.sinks import instruction_record
+
+DEFAULT_BATCH_SIZE = 10_000
+DEFAULT_ROWS_PER_TRANSACTION = 500_000
+DEFER_INDEXES_FRACTION = 0.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS binaries (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    sha256 TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    config_hash TEXT NOT NULL,
+    instructions INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS instructions (
+    binary_id INTEGER NOT NULL REFERENCES binaries(id),
+    offset INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mnemonic TEXT NOT NULL,
+    operands TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS labels (
+    binary_id INTEGER NOT NULL REFERENCES binaries(id),
+    offset INTEGER NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jumps (
+    binary_id INTEGER NOT NULL REFERENCES binaries(id),
+    source INTEGER NOT NULL,
+    target INTEGER NOT NULL,
+    mnemonic TEXT NOT NULL,
+    label TEXT
+);
+"""
+INDEXES = {
+    "instructions_by_offset": "instructions(binary_id, offset)",
+    "instructions_by_mnemonic": "instructions(mnemonic)",
+    "labels_by_offset": "labels(binary_id, offset)",
+    "jumps_by_source": "jumps(binary_id, source)",
+    "jumps_by_target": "jumps(binary_id, target)",
+}
+INSERTS = {
+    "instructions": "INSERT INTO instructions VALUES (?, ?, ?, ?, ?, ?)",
+    "labels": "INSERT INTO labels VALUES (?, ?, ?)",
+    "jumps": "INSERT INTO jumps VALUES (?, ?, ?, ?, ?)",
+}
+
+
+@dataclass
+class ExportStats:
+    binaries: int = 0
+    # already in the database
+    skipped: int = 0
+    rows: int = 0
+    load_seconds: float = 0.0
+    index_seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        seconds = self.load_seconds + self.index_seconds
+        return self.rows / seconds if seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.binaries} binaries exported, {self.skipped} already there, "
+            f"{self.rows} rows in {self.load_seconds:.2f} s "
+            f"+ {self.index_seconds:.2f} s of indexing, "
+            f"{self.rows_per_second:,.0f} rows/s"
+        )
+
+
+class SqliteExporter:
+    def __init__(
+        self,
+        path: str | Path,
+        disassembler: Disassembler,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        rows_per_transaction: int = DEFAULT_ROWS_PER_TRANSACTION,
+    ) -> None:
+        self.disassembler = disassembler
+        self.batch_size = batch_size
+        self.rows_per_transaction = rows_per_transaction
+        self.stats = ExportStats()
+        # transactions are begun and committed here, not by the sqlite3 module
+        self.connection = sqlite3.connect(path, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.execute("PRAGMA temp_store = MEMORY")
+        self.connection.executescript(SCHEMA)
+        # missing in a fresh database, or left dropped by an export that was killed
+        self.indexes_deferred = not set(INDEXES) <= self._index_names()
+        ((self.existing_instructions,),) = self.connection.execute(
+            "SELECT coalesce(sum(instructions), 0) FROM binaries"
+        )
+        self.loaded_instructions = 0
+        self.known = {
+            sha256
+            for (sha256,) in self.connection.execute("SELECT sha256 FROM binaries")
+        }
+        self.pending: dict[str, list[tuple]] = {table: [] for table in INSERTS}
+        self.uncommitted_rows = 0
+        self.connection.execute("BEGIN")
+
+    def _flush(self, table: str):
+        self.connection.executemany(INSERTS[table], self.pending[table])
+        self.pending[table].clear()
+
+    def _add_row(self, table: str, row: tuple):
+        rows = self.pending[table]
+        rows.append(row)
+        if len(rows) >= self.batch_size:
+            self._flush(table)
+
+    def add(self, name: str, file_contents: bytes) -> bool:
+        """:returns: False if the binary was already in the database"""
+        start = time.perf_counter()
+        sha256 = hashlib.sha256(file_contents).hexdigest()
+        if sha256 in self.known:
+            self.stats.skipped += 1
+            return False
+
+        disassembly = self.disassembler.decode(file_contents)
+        self.loaded_instructions += len(disassembly.instructions)
+        if (
+            not self.indexes_deferred
+            and self.loaded_instructions
+            >= DEFER_INDEXES_FRACTION * self.existing_instructions
+        ):
+            self._drop_indexes()
+        cursor = self.connection.execute(
+            "INSERT INTO binaries (name, sha256, size, config_hash, instructions) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                name,
+                sha256,
+                len(file_contents),
+                self.disassembler.schemas_hash,
+                len(disassembly.instructions),
+            ),
+        )
+        binary_id = cursor.lastrowid
+        rows = 1
+        offset = 0
+        for inst in disassembly.instructions_with_labels:
+            if isinstance(inst, str):
+                self._add_row("labels", (binary_id, offset, inst.removesuffix(":")))
+                rows += 1
+                continue
+            record = instruction_record(offset, inst)
+            self._add_row(
+                "instructions",
+                (
+                    binary_id,
+                    offset,
+                    inst.inst_size,
+                    inst.mnemonic,
+                    ", ".join(record["operands"]),
+                    str(inst),
+                ),
+            )
+            if isinstance(inst, DisassembledJumpInstruction):
+                self._add_row(
+                    "jumps",
+                    (binary_id, offset, record["target"], inst.mnemonic, inst.label),
+                )
+                rows += 1
+            rows += 1
+            offset += inst.inst_size
+
+        self.known.add(sha256)
+        self.stats.binaries += 1
+        self.stats.rows += rows
+        self.uncommitted_rows += rows
+        if self.uncommitted_rows >= self.rows_per_transaction:
+            self._commit()
+            self.connection.execute("BEGIN")
+        self.stats.load_seconds += time.perf_counter() - start
+        return True
+
+    def add_files(self, paths: Iterable[str | Path]):
+        for path in paths:
+            self.add(Path(path).name, read_file(path))
+
+    def _index_names(self) -> set[str]:
+        return {
+            name
+            for (name,) in self.connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index'"
+            )
+        }
+
+    def _drop_indexes(self):
+        # in the open transaction, so a rollback before the next commit brings them back
+        for index_name in INDEXES:
+            self.connection.execute(f"DROP INDEX IF EXISTS {index_name}")
+        self.indexes_deferred = True
+
+    def _build_indexes(self):
+        start = time.perf_counter()
+        for index_name, columns in INDEXES.items():
+            self.connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {index_name} ON {columns}"
+            )
+        self.connection.execute("ANALYZE")
+        self.indexes_deferred = False
+        self.stats.index_seconds += time.perf_counter() - start
+
+    def _commit(self):
+        for table in INSERTS:
+            self._flush(table)
+        self.connection.execute("COMMIT")
+        self.uncommitted_rows = 0
+
+    def close(self) -> ExportStats:
+        """Commits what is left and builds the indexes if they were dropped"""
+        start = time.perf_counter()
+        self._commit()
+        self.stats.load_seconds += time.perf_counter() - start
+        if self.indexes_deferred:
+            self._build_indexes()
+        self.connection.close()
+        return self.stats
+
+    def abort(self):
+        """
+        Throws away the binaries added since the last commit, and builds the indexes
+        again if they were dropped in a transaction that was already committed
+        """
+        self.connection.execute("ROLLBACK")
+        if not set(INDEXES) <= self._index_names():
+            self._build_indexes()
+        self.connection.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def main(argv: list[str] | None = None):
+    arg_parser = argparse.ArgumentParser(description="Export disassembly to SQLite")
+    arg_parser.add_argument("database_path")
+    arg_parser.add_argument("binary_paths", nargs="+")
+    arg_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = arg_parser.parse_args(argv)
+
+    with SqliteExporter(
+        args.database_path, Disassembler.from_config(), batch_size=args.batch_size
+    ) as exporter:
+        exporter.add_files(args.binary_paths)
+    print(exporter.stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Disassembly of many files as four overlapping stages:
+
+    read -> decode -> render -> write
+
+Each stage is a pool of worker threads taking work from a bounded queue and putting
+its results on the next one, so a stage that falls behind fills its input queue and
+the stages before it block instead of piling up work in memory. Reading and writing
+overlap with decoding and rendering, and on a free-threaded interpreter the decode
+and render workers scale with threads too.
+
+A file bigger than chunk_size is cut into pieces at instruction boundaries by the
+read stage, so decode workers can share one big file. The render stage joins a
+file's pieces once all of them are decoded, resolves labels and renders the
+listing, which the write stage writes atomically, compressed if output_suffix says so.
+Outputs keep the inputs' paths relative to their common directory, like BatchJob's.
+
+Every stage times how long its workers spend working, waiting for input and
+blocked on a full output queue. The stage with the highest utilization is the one
+to give more workers.
+"""
+
+import queue
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from python_implementation.src.batch import instruction_aligned_edges, output_paths
+from python_implementation.src.columnar import ColumnarDisassembly
+from python_implementation.src.compressed_io import read_file, write_lines_atomically
+from python_implementation.src.disassembler import Disassembler
+
+STAGES = ("read", "decode", "render", "write")
+DEFAULT_WORKERS = {"read": 1, "decode": 2, "render": 1, "write": 1}
+DEFAULT_QUEUE_SIZE = 8
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+_DONE = object()
+
+
+@dataclass
+class StageMetrics:
+    name: str
+    workers: int
+    items: int = 0
+    busy_seconds: float = 0.0
+    # waiting for input
+    idle_seconds: float = 0.0
+    # waiting for room in the next stage's queue
+    blocked_seconds: float = 0.0
+    lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def add(self, busy: float, idle: float, blocked: float):
+        with self.lock:
+            self.items += 1
+            self.busy_seconds += busy
+            self.idle_seconds += idle
+            self.blocked_seconds += blocked
+
+    def utilization(self, wall_seconds: float) -> float:
+        """Fraction of the workers' time spent working"""
+        if not wall_seconds:
+            return 0.0
+        return self.busy_seconds / (self.workers * wall_seconds)
+
+
+@dataclass
+class PipelineReport:
+    stages: list[StageMetrics]
+    wall_seconds: float = 0.0
+    files: int = 0
+    errors: list[tuple[Path, Exception]] = field(default_factory=list)
+
+    @property
+    def bottleneck(self) -> StageMetrics:
+        return max(self.stages, key=lambda stage: stage.utilization(self.wall_seconds))
+
+    def __str__(self) -> str:
+        lines = [
+            f"{self.files} files in {self.wall_seconds:.2f} s, {len(self.errors)} failed"
+        ]
+        for stage in self.stages:
+            lines.append(
+                f"  {stage.name:<6} {stage.workers} workers, {stage.items} items, "
+                f"{stage.utilization(self.wall_seconds):.0%} busy, "
+                f"{stage.idle_seconds:.2f} s idle, {stage.blocked_seconds:.2f} s blocked"
+            )
+        lines.append(f"bottleneck: {self.bottleneck.name}")
+        lines.extend(f"  {path}: {error}" for path, error in self.errors)
+        return "\n".join(lines)
+
+
+@dataclass
+class _Job:
+    input_path: Path
+    output_path: Path
+    num_pieces: int = 0
+    pieces: dict[int, tuple[int, ColumnarDisassembly]] = field(default_factory=dict)
+    error: Exception | None = None
+
+
+class StagedPipeline:
+    def __init__(
+        self,
+        disassembler: Disassembler,
+        output_directory: str | Path,
+        output_suffix: str = ".asm",
+        workers: dict[str, int] | None = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        """:param workers: Worker threads by stage name, DEFAULT_WORKERS for the rest"""
+        unknown = set(workers or {}) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown stages {', '.join(sorted(unknown))}")
+        too_few = [
+            f"{name}={count}" for name, count in (workers or {}).items() if count < 1
+        ]
+        if too_few:
+            raise ValueError(f"Every stage needs a worker, not {', '.join(too_few)}")
+        self.disassembler = disassembler
+        self.output_directory = Path(output_directory)
+        self.output_suffix = output_suffix
+        self.workers = DEFAULT_WORKERS | (workers or {})
+        self.queue_size = queue_size
+        self.chunk_size = chunk_size
+
+    def run(self, input_paths: list[str | Path]) -> PipelineReport:
+        """:raises ValueError: If two inputs would be written to the same output"""
+        input_paths = list(map(Path, input_paths))
+        outputs = output_paths(input_paths, self.output_directory, self.output_suffix)
+        self.output_directory.mkdir(parents=True, exist_ok=True)
+        self._report = PipelineReport(
+            [StageMetrics(name, self.workers[name]) for name in STAGES]
+        )
+        self._lock = threading.Lock()
+        self._remaining = [self.workers[name] for name in STAGES]
+        # the read stage's queue holds every path up front, the others are bounded
+        self._queues = [queue.Queue()] + [
+            queue.Queue(self.queue_size) for _ in STAGES[1:]
+        ]
+        for input_path, output_path in zip(input_paths, outputs):
+            self._queues[0].put((_Job(input_path, output_path),))
+        for _ in range(self.workers["read"]):
+            self._queues[0].put(_DONE)
+
+        threads = [
+            threading.Thread(
+                target=self._worker, args=(stage_ind,), name=f"{name}-worker"
+            )
+            for stage_ind, name in enumerate(STAGES)
+            for _ in range(self.workers[name])
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self._report.wall_seconds = time.perf_counter() - start
+        self._report.files = len(input_paths)
+        return self._report
+
+    def _worker(self, stage_ind: int):
+        work: Callable[..., list] = getattr(self, "_" + STAGES[stage_ind])
+        metrics = self._report.stages[stage_ind]
+        inbox = self._queues[stage_ind]
+        outbox = self._queues[stage_ind + 1] if stage_ind + 1 < len(STAGES) else None
+        while True:
+            waited = time.perf_counter()
+            item = inbox.get()
+            started = time.perf_counter()
+            if item is _DONE:
+                break
+            # every item is a tuple with the job first
+            job: _Job = item[0]
+            try:
+                results = work(*item) if job.error is None else []
+            except Exception as e:
+                # the file fails, the worker carries on with the next one
+                self._fail(job, e)
+                results = []
+            finished = time.perf_counter()
+            if outbox is not None:
+                for result in results:
+                    outbox.put(result)
+            metrics.add(
+                finished - started, started - waited, time.perf_counter() - finished
+            )
+
+        with self._lock:
+            self._remaining[stage_ind] -= 1
+            last = self._remaining[stage_ind] == 0
+        # the last worker of a stage to finish tells every worker of the next one
+        if last and outbox is not None:
+            for _ in range(self.workers[STAGES[stage_ind + 1]]):
+                outbox.put(_DONE)
+
+    def _fail(self, job: _Job, error: Exception):
+        with self._lock:
+            if job.error is None:
+                job.error = error
+                self._report.errors.append((job.input_path, error))
+            # pieces of a failed file are dropped as they come
+            job.pieces.clear()
+
+    def _read(self, job: _Job) -> list:
+        file_contents = read_file(job.input_path)
+        edges = [len(file_contents)]
+        if len(file_contents) > self.chunk_size:
+            edges = instruction_aligned_edges(
+                self.disassembler, file_contents, self.chunk_size
+            )
+        job.num_pieces = len(edges)
+        pieces, piece_start = [], 0
+        for piece_ind, piece_end in enumerate(edges):
+            pieces.append(
+                (job, piece_ind, piece_start, file_contents[piece_start:piece_end])
+            )
+            piece_start = piece_end
+        return pieces
+
+    def _decode(self, job: _Job, piece_ind: int, piece_start: int, piece: bytes):
+        columnar = self.disassembler.decode_columnar(piece)
+        return [(job, piece_ind, piece_start, columnar)]
+
+    def _render(
+        self,
+        job: _Job,
+        piece_ind: int,
+        piece_start: int,
+        columnar: ColumnarDisassembly,
+    ) -> list:
+        with self._lock:
+            if job.error is not None:
+                return []
+            job.pieces[piece_ind] = (piece_start, columnar)
+            if len(job.pieces) < job.num_pieces:
+                return []
+        parts = [job.pieces.pop(ind) for ind in range(job.num_pieces)]
+        columnar = ColumnarDisassembly.concatenate(
+            self.disassembler.parsable_instructions, parts
+        )
+        return [(job, list(columnar.to_disassembly().iter_lines()))]
+
+    def _write(self, job: _Job, lines: list[str]) -> list:
+        job.output_path.parent.mkdir(parents=True, exist_ok=True)
+        write_lines_atomically(job.output_path, lines)
+        return []
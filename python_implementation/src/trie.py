@@ -1,5 +1,5 @@
 from collections.abc import Iterator
-from functools import cached_property
+from dataclasses import dataclass
 from typing import Self
 
 from python_implementation.src.base.schema import (
@@ -20,14 +20,11 @@ class BitModeSchemaIterator:
         self.instruction = instruction
         self.whole_ind = whole_ind or 0
         self.bit_ind = bit_ind or 0
+        self._fields = (instruction.identifier_literal, *instruction.fields)
 
     def clone(self):
         return BitModeSchemaIterator(self.instruction, self.whole_ind, self.bit_ind)
 
-    @cached_property
-    def _fields(self):
-        return [self.instruction.identifier_literal] + self.instruction.fields
-
     @property
     def _curr_inst(self):
         return self._fields[self.whole_ind]
@@ -74,12 +71,42 @@ class BitModeSchemaIterator:
 
     def to_whole_field_iter(self) -> Iterator[SchemaField]:
         assert self.can_transition()
-        if isinstance(self._curr_inst, NamedField):
+        if self.is_next_named():
             assert self.bit_ind == 0, "Inconsistent bit index state"
 
         return (self._fields[i] for i in range(self.whole_ind, len(self._fields)))
 
 
+@dataclass(frozen=True)
+class LeafPlan:
+    """
+    What is left to decode once the trie walk has identified the instruction, worked out
+    when the trie is frozen instead of by cloning and stepping the coil on every decode.
+    """
+
+    schema: InstructionSchema
+    # bits left over in the literal the walk stopped inside, read and checked as one value
+    literal_width: int
+    literal_value: int
+    fields: tuple[SchemaField, ...]
+
+    @classmethod
+    def from_coil(cls, coil: BitModeSchemaIterator) -> Self:
+        rest_of_coil = coil.clone()
+        literal_width = literal_value = 0
+        while rest_of_coil.has_more() and not rest_of_coil.can_transition():
+            coil_bit = next(rest_of_coil)
+            assert isinstance(coil_bit, bool)
+            literal_value = literal_value << 1 | coil_bit
+            literal_width += 1
+        return cls(
+            rest_of_coil.instruction,
+            literal_width,
+            literal_value,
+            tuple(rest_of_coil.to_whole_field_iter()),
+        )
+
+
 class Node:
     """
     How this works:
@@ -104,7 +131,8 @@ class Node:
 
         self.value = value
         self.coil = coil
-        self.children: list[Node | None] = [None, None, None]
+        self.children: list[Node | None] | tuple[Node | None, ...] = [None, None, None]
+        self.leaf: LeafPlan | None = None
 
     LEFT, NAMED, RIGHT = 0, 1, 2
 
@@ -139,7 +167,13 @@ class Node:
         ind = self.get_ind(val)
         return self.children[ind]
 
+    @property
+    def frozen(self) -> bool:
+        return isinstance(self.children, tuple)
+
     def insert(self, inst: BitModeSchemaIterator):
+        if self.frozen:
+            raise TypeError("Cannot insert into a frozen trie")
         if self.coil is not None:
             new_child = Node(self.coil)
             ind = self.get_ind(new_child.value)
@@ -156,12 +190,22 @@ class Node:
                 assert child.value == nxt, "Ambiguous ISA"
             child.insert(inst)
 
+    def freeze(self):
+        """Make the node and all below it read only, so a built trie can be shared between threads"""
+        self.children = tuple(self.children)
+        if self.coil is not None:
+            self.leaf = LeafPlan.from_coil(self.coil)
+        for child in self.children:
+            if child is not None:
+                child.freeze()
+
 
 class DummyNode(Node):
     def __init__(self) -> None:
         self.value = True
         self.coil = None
-        self.children: list[Node | None] = [None, None, None]
+        self.children = [None, None, None]
+        self.leaf = None
 
 
 class Trie:
@@ -174,4 +218,5 @@ class Trie:
         for instruction in instructions:
             head.insert(BitModeSchemaIterator(instruction))
 
+        head.freeze()
         return cls(head)
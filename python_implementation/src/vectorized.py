@@ -0,0 +1,154 @@
+"""
+NumPy decoding backend, optional: install with the `numpy` extra.
+
+Every instruction starts with an opcode byte and maybe a ModRM byte, so everything
+about an instruction except its trailing displacement/data bytes is a function of the
+16 bit key (b0 << 8 | b1). All of that is precomputed into 65536 entry tables, and
+decoding is table gathers at every offset, pointer doubling to find which offsets are
+on the instruction chain starting at 0, then gathers for the trailing bytes.
+"""
+
+from python_implementation.src.base.schema import NamedField
+from python_implementation.src.columnar import (
+    ABSENT,
+    ColumnarDisassembly,
+    get_mnemonic_ids,
+)
+from python_implementation.src.opcode_table import (
+    NEEDS_SECOND_BYTE,
+    NO_SCHEMA,
+    OpcodeTable,
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+NUM_KEYS = 256 * 256
+# bytes read past an instruction start, the padding makes those reads safe at the end
+MAX_INSTRUCTION_SIZE = 6
+
+
+class VectorizedDecoder:
+    def __init__(self, opcode_table: OpcodeTable) -> None:
+        if np is None:
+            raise ImportError(
+                "The vectorized backend needs numpy, install the `numpy` extra"
+            )
+        self.opcode_table = opcode_table
+        self.schemas = [plan.schema for plan in opcode_table.plans]
+        _, schema_mnemonic_ids = get_mnemonic_ids(self.schemas)
+        self.schema_mnemonic_ids = np.array(schema_mnemonic_ids, dtype=np.int16)
+
+        self.lengths = np.zeros(NUM_KEYS, dtype=np.uint8)
+        self.schema_ids = np.full(NUM_KEYS, NO_SCHEMA, dtype=np.int16)
+        self.header_values = {
+            field: np.full(NUM_KEYS, ABSENT, dtype=np.int32) for field in NamedField
+        }
+        # byte offset of the field from the instruction start
+        self.trailing_offsets = {
+            field: np.full(NUM_KEYS, ABSENT, dtype=np.int8) for field in NamedField
+        }
+
+        for b0 in range(256):
+            if opcode_table.first_byte_lengths[b0] == NEEDS_SECOND_BYTE:
+                for b1 in range(256):
+                    if opcode_table.second_byte_lengths[b0 << 8 | b1]:
+                        self._fill_keys(bytes([b0, b1]), b0 << 8 | b1, 1)
+            elif opcode_table.first_byte_lengths[b0]:
+                # the second byte is irrelevant, every key with this opcode shares a layout
+                self._fill_keys(bytes([b0]), b0 << 8, 256)
+
+    def _fill_keys(self, header: bytes, first_key: int, num_keys: int):
+        keys = slice(first_key, first_key + num_keys)
+        layout = self.opcode_table.layout(header, 0)
+        self.lengths[keys] = layout.size
+        self.schema_ids[keys] = layout.schema_ind
+        for field, value in layout.header_values.items():
+            self.header_values[field][keys] = value
+        for field, field_offset in layout.trailing_offsets:
+            self.trailing_offsets[field][keys] = field_offset
+
+    def _resolve_chain(self, lengths):
+        """
+        Which offsets are reached by following lengths from 0, in O(n log n) vector ops.
+        After round k `on_chain` holds the first 2^k instructions and `jump` skips 2^k of them.
+        """
+        end = len(lengths)
+        error = end + 1
+        nxt = np.arange(end + 2, dtype=np.int64)
+        nxt[:end] += lengths
+        nxt[:end][lengths == 0] = error
+        nxt[:end][nxt[:end] > end] = error
+        nxt[end], nxt[error] = end, error
+
+        on_chain = np.zeros(end + 2, dtype=bool)
+        on_chain[0] = True
+        jump = nxt
+        for _ in range(max(1, end.bit_length())):
+            on_chain[jump[on_chain]] = True
+            jump = jump[jump]
+
+        offsets = np.flatnonzero(on_chain[:end])
+        if on_chain[error]:
+            bad = offsets[nxt[offsets] == error][0]
+            if lengths[bad] == 0:
+                raise ValueError(f"Undecodable instruction at offset {bad}")
+            raise ValueError("Instruction stream ended in the middle of an instruction")
+        return offsets
+
+    def decode(self, file_contents: bytes) -> ColumnarDisassembly:
+        data = np.frombuffer(file_contents, dtype=np.uint8)
+        padded = np.zeros(len(data) + MAX_INSTRUCTION_SIZE, dtype=np.int32)
+        padded[: len(data)] = data
+
+        all_keys = padded[: len(data)] << 8 | padded[1 : len(data) + 1]
+        offsets = self._resolve_chain(self.lengths[all_keys])
+        keys = all_keys[offsets]
+        schema_ids = self.schema_ids[keys]
+
+        fields = {}
+        for field in NamedField:
+            field_offsets = self.trailing_offsets[field][keys]
+            trailing = np.where(
+                field_offsets >= 0,
+                padded[offsets + np.maximum(field_offsets, 0)],
+                ABSENT,
+            )
+            header = self.header_values[field][keys]
+            fields[field] = np.where(header != ABSENT, header, trailing)
+
+        return ColumnarDisassembly(
+            self.schemas,
+            offsets,
+            self.lengths[keys],
+            schema_ids,
+            fields,
+            self.schema_mnemonic_ids[schema_ids],
+            self._displacements(fields),
+            self._immediates(fields),
+        )
+
+    @staticmethod
+    def _displacements(fields):
+        """Same sign extension as utils.as_signed_int, which picks the width from the value"""
+        disp_lo, disp_hi = fields[NamedField.DISP_LO], fields[NamedField.DISP_HI]
+        disp = np.where(disp_hi != ABSENT, disp_lo | disp_hi << 8, disp_lo)
+        ip_inc8 = fields[NamedField.IP_INC8]
+        disp = np.where(ip_inc8 != ABSENT, ip_inc8, disp)
+        disp = np.where(disp == ABSENT, 0, disp)
+        return np.where(
+            disp < 0x100,
+            np.where(disp >= 0x80, disp - 0x100, disp),
+            np.where(disp >= 0x8000, disp - 0x10000, disp),
+        )
+
+    @staticmethod
+    def _immediates(fields):
+        data, data_hi = fields[NamedField.DATA], fields[NamedField.DATA_IF_W1]
+        return np.where(
+            data == ABSENT,
+            ABSENT,
+            np.where(data_hi != ABSENT, data | data_hi << 8, data),
+        )
@@ -0,0 +1,233 @@
+"""
+Cross-reference index from jump targets to the jumps that reach them.
+
+Jumps are kept twice, sorted by (target, source) to answer "what jumps to X" and in
+source order to answer "where does the jump at X go", both with a binary search over
+array.arrays. The index can be saved next to the binary it describes:
+
+    magic b"XREF", u8 version, sha256 of the instruction schemas, sha256 of the binary,
+    u32 LE jump count, u16 LE mnemonic count, mnemonics as u8 length + utf-8,
+    then i32 LE targets, target sources, source targets and sources,
+    then i16 LE target mnemonic ids
+
+A saved index that is cut short or otherwise unreadable loads as None, like a stale
+one, so it is rebuilt.
+"""
+
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Self
+
+from python_implementation.src.base.schema import NamedField
+from python_implementation.src.columnar import ABSENT, ColumnarDisassembly
+
+XREF_MAGIC = b"XREF"
+XREF_VERSION = 2
+XREF_HEADER = "<4sB32s32sIH"
+XREF_SUFFIX = ".xref"
+
+
+@dataclass(frozen=True)
+class Xref:
+    source: int
+    target: int
+    mnemonic: str
+
+
+def _le(column: array) -> bytes:
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+class XrefIndex:
+    def __init__(
+        self,
+        mnemonics: list[str],
+        targets: array,
+        target_sources: array,
+        target_mnemonic_ids: array,
+        sources: array,
+        source_targets: array,
+    ) -> None:
+        """
+        :param targets: Jump targets sorted, ties by source, with target_sources and
+            target_mnemonic_ids in the same order
+        :param sources: Jump offsets sorted, with source_targets in the same order
+        """
+        self.mnemonics = mnemonics
+        self.targets = targets
+        self.target_sources = target_sources
+        self.target_mnemonic_ids = target_mnemonic_ids
+        self.sources = sources
+        self.source_targets = source_targets
+
+    @classmethod
+    def from_columnar(cls, columnar: ColumnarDisassembly) -> Self:
+        ip_inc8 = columnar.fields[NamedField.IP_INC8]
+        jumps = sorted(
+            (
+                int(columnar.offsets[i])
+                + int(columnar.sizes[i])
+                + int(columnar.displacements[i]),
+                int(columnar.offsets[i]),
+                int(columnar.mnemonic_ids[i]),
+            )
+            for i in range(len(columnar))
+            if ip_inc8[i] != ABSENT
+        )
+        by_source = sorted((source, target) for target, source, _ in jumps)
+        return cls(
+            columnar.mnemonics,
+            array("i", (target for target, _, _ in jumps)),
+            array("i", (source for _, source, _ in jumps)),
+            array("h", (mnemonic_id for _, _, mnemonic_id in jumps)),
+            array("i", (source for source, _ in by_source)),
+            array("i", (target for _, target in by_source)),
+        )
+
+    def __len__(self) -> int:
+        return len(self.targets)
+
+    def _xref(self, ind: int) -> Xref:
+        return Xref(
+            self.target_sources[ind],
+            self.targets[ind],
+            self.mnemonics[self.target_mnemonic_ids[ind]],
+        )
+
+    def jumps_to(self, target: int) -> list[Xref]:
+        lo = bisect_left(self.targets, target)
+        hi = bisect_right(self.targets, target, lo)
+        return [self._xref(i) for i in range(lo, hi)]
+
+    def jumps_into(self, start: int, end: int) -> list[Xref]:
+        """Jumps with a target in [start, end)"""
+        lo = bisect_left(self.targets, start)
+        hi = bisect_left(self.targets, end, lo)
+        return [self._xref(i) for i in range(lo, hi)]
+
+    def jump_target(self, source: int) -> int | None:
+        """Where the jump at offset source goes, None if there is no jump there"""
+        ind = bisect_left(self.sources, source)
+        if ind < len(self.sources) and self.sources[ind] == source:
+            return self.source_targets[ind]
+        return None
+
+    def to_bytes(self, schemas_hash: str, binary_hash: str) -> bytes:
+        header = struct.pack(
+            XREF_HEADER,
+            XREF_MAGIC,
+            XREF_VERSION,
+            bytes.fromhex(schemas_hash),
+            bytes.fromhex(binary_hash),
+            len(self),
+            len(self.mnemonics),
+        )
+        mnemonic_table = b"".join(
+            bytes([len(encoded)]) + encoded
+            for encoded in (mnemonic.encode() for mnemonic in self.mnemonics)
+        )
+        return b"".join(
+            [
+                header,
+                mnemonic_table,
+                _le(self.targets),
+                _le(self.target_sources),
+                _le(self.source_targets),
+                _le(self.sources),
+                _le(self.target_mnemonic_ids),
+            ]
+        )
+
+    @classmethod
+    def from_bytes(
+        cls, data: bytes, schemas_hash: str, binary_hash: str
+    ) -> Self | None:
+        """None when data is not a whole index of this binary under these schemas"""
+        pos = struct.calcsize(XREF_HEADER)
+        if len(data) < pos:
+            return None
+        magic, version, stored_schemas, stored_binary, num_jumps, num_mnemonics = (
+            struct.unpack_from(XREF_HEADER, data)
+        )
+        if (
+            magic != XREF_MAGIC
+            or version != XREF_VERSION
+            or stored_schemas.hex() != schemas_hash
+            or stored_binary.hex() != binary_hash
+        ):
+            return None
+
+        mnemonics = []
+        for _ in range(num_mnemonics):
+            if pos >= len(data):
+                return None
+            length = data[pos]
+            try:
+                mnemonics.append(data[pos + 1 : pos + 1 + length].decode())
+            except UnicodeDecodeError:
+                return None
+            pos += 1 + length
+        # four i32 columns and one i16 column
+        if len(data) != pos + num_jumps * (4 * 4 + 2):
+            return None
+
+        def take(typecode: str) -> array:
+            nonlocal pos
+            column = array(typecode)
+            num_bytes = num_jumps * column.itemsize
+            column.frombytes(data[pos : pos + num_bytes])
+            if sys.byteorder == "big":
+                column.byteswap()
+            pos += num_bytes
+            return column
+
+        targets, target_sources, source_targets, sources = (take("i") for _ in range(4))
+        return cls(
+            mnemonics, targets, target_sources, take("h"), sources, source_targets
+        )
+
+    @staticmethod
+    def path_for(binary_path: str | Path) -> Path:
+        binary_path = Path(binary_path)
+        return binary_path.with_name(binary_path.name + XREF_SUFFIX)
+
+    def save(
+        self,
+        binary_path: str | Path,
+        file_contents: bytes,
+        schemas_hash: str,
+    ):
+        """:param schemas_hash: That of the disassembler the index was built with"""
+        path = self.path_for(binary_path)
+        data = self.to_bytes(schemas_hash, hashlib.sha256(file_contents).hexdigest())
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, suffix=".tmp", delete=False
+        ) as file:
+            file.write(data)
+        os.replace(file.name, path)
+
+    @classmethod
+    def load(
+        cls,
+        binary_path: str | Path,
+        file_contents: bytes,
+        schemas_hash: str,
+    ) -> Self | None:
+        """The index saved next to the binary, None if missing, stale or unreadable"""
+        try:
+            data = cls.path_for(binary_path).read_bytes()
+        except FileNotFoundError:
+            return None
+        return cls.from_bytes(
+            data, schemas_hash, hashlib.sha256(file_contents).hexdigest()
+        )
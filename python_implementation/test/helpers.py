@@ -0,0 +1,29 @@
+"""Binaries shared by the tests"""
+
+import random
+from pathlib import Path
+
+from python_implementation.src.disassembler import Disassembler
+
+EXAMPLE_BINARIES = Path(__file__).parent / ".." / ".." / "example_asm" / "assembled"
+# jumps in both directions between two movs, one of them with a 16 bit displacement
+JUMPS_BIN = bytes(
+    [0x75, 0xFE, 0x89, 0xD9, 0x75, 0x04, 0x8A, 0x80, 0x87, 0x13, 0x75, 0xF6]
+)
+
+
+def get_binaries() -> list[bytes]:
+    return [p.read_bytes() for p in sorted(EXAMPLE_BINARIES.iterdir())] + [JUMPS_BIN]
+
+
+def random_program(disassembler: Disassembler, num_bytes: int, seed: int) -> bytes:
+    """Instructions of the example binaries in random order, jumps included"""
+    encodings = []
+    for binary in get_binaries():
+        offsets = [*disassembler.scan(binary), len(binary)]
+        encodings.extend(binary[a:b] for a, b in zip(offsets, offsets[1:]))
+    rng = random.Random(seed)
+    program = bytearray()
+    while len(program) < num_bytes:
+        program += rng.choice(encodings)
+    return bytes(program)
@@ -0,0 +1,51 @@
+import asyncio
+import unittest
+from pathlib import Path
+from typing import override
+
+from python_implementation.src.aio import AsyncDisassembler
+from python_implementation.src.disassembler import Disassembler
+
+EXAMPLE_BINARIES = Path(__file__).parent / ".." / ".." / "example_asm" / "assembled"
+
+
+class TestAsyncDisassembler(unittest.IsolatedAsyncioTestCase):
+    @override
+    def setUp(self) -> None:
+        self.disassembler = Disassembler.from_config()
+        self.binary_paths = sorted(EXAMPLE_BINARIES.iterdir())
+
+    async def test_decode_files_matches_sync(self):
+        async_disassembler = AsyncDisassembler(self.disassembler, batch_size=3)
+        disassemblies = await async_disassembler.decode_files_async(self.binary_paths)
+        for path, disassembly in zip(self.binary_paths, disassemblies):
+            self.assertEqual(str(disassembly), str(self.disassembler.decode_file(path)))
+
+    async def test_iter_instructions(self):
+        binary = (EXAMPLE_BINARIES / "listing_0039_more_movs").read_bytes()
+        async_disassembler = AsyncDisassembler(self.disassembler, batch_size=5)
+        instructions = [i async for i in async_disassembler.iter_instructions(binary)]
+        self.assertEqual(instructions, self.disassembler.decode(binary).instructions)
+
+    async def test_abandoned_iterator_releases_limit(self):
+        binary = (EXAMPLE_BINARIES / "listing_0039_more_movs").read_bytes()
+        async_disassembler = AsyncDisassembler(
+            self.disassembler, max_concurrency=1, batch_size=5
+        )
+        abandoned = async_disassembler.iter_instructions(binary)
+        async for _ in abandoned:
+            break
+        disassembly = await asyncio.wait_for(
+            async_disassembler.decode_async(binary), timeout=5
+        )
+        self.assertEqual(str(disassembly), str(self.disassembler.decode(binary)))
+        await abandoned.aclose()
+
+    async def test_cancel_large_decode(self):
+        binary = (EXAMPLE_BINARIES / "listing_0039_more_movs").read_bytes() * 5000
+        async_disassembler = AsyncDisassembler(self.disassembler, batch_size=64)
+        task = asyncio.create_task(async_disassembler.decode_async(binary))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
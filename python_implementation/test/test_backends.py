@@ -0,0 +1,145 @@
+import unittest
+from collections.abc import Iterator
+from dataclasses import replace
+
+from python_implementation.src.backends import (
+    BACKENDS,
+    DifferentialRunner,
+    TrieBackend,
+    create_backend,
+    enumerate_encodings,
+    register_backend,
+)
+from python_implementation.src.base.config_loader import (
+    get_parsable_instructions_from_config,
+)
+from python_implementation.src.disassembled import DisassembledInstruction
+from python_implementation.src.opcode_table import UNDECODABLE
+from python_implementation.src.parser import parse_binary
+from python_implementation.src.vectorized import np
+from python_implementation.test.helpers import JUMPS_BIN, get_binaries
+
+CANDIDATES = ["compact_trie", "lazy", "opcode_table"] + (
+    ["vectorized"] if np is not None else []
+)
+
+
+class RenamesFourthInstruction(TrieBackend):
+    def iter_decode(self, file_contents: bytes) -> Iterator[DisassembledInstruction]:
+        for ind, inst in enumerate(super().iter_decode(file_contents)):
+            yield replace(inst, mnemonic="xor") if ind == 3 else inst
+
+
+class StopsAfterTwoInstructions(TrieBackend):
+    def iter_decode(self, file_contents: bytes) -> Iterator[DisassembledInstruction]:
+        for ind, inst in enumerate(super().iter_decode(file_contents)):
+            if ind == 2:
+                raise ValueError("Gave up")
+            yield inst
+
+
+class Crashes(TrieBackend):
+    def iter_decode(self, file_contents: bytes) -> Iterator[DisassembledInstruction]:
+        raise IndexError("Read past the end")
+
+
+class TestBackends(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.parsable_instructions = get_parsable_instructions_from_config()
+
+    def test_parse_binary_with_every_backend(self):
+        for binary in get_binaries():
+            expected = str(parse_binary(self.parsable_instructions, binary))
+            for backend in CANDIDATES:
+                with self.subTest(backend=backend):
+                    self.assertEqual(
+                        str(parse_binary(self.parsable_instructions, binary, backend)),
+                        expected,
+                    )
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_backend("no_such_backend", self.parsable_instructions)
+
+    def test_encodings_cover_the_config(self):
+        reference = TrieBackend(self.parsable_instructions)
+        first_bytes = set()
+        for encoding in enumerate_encodings(self.parsable_instructions, [b"\x80"]):
+            self.assertTrue(1 <= len(encoding) <= 6)
+            (inst,) = reference.iter_decode(encoding)
+            self.assertEqual(inst.inst_size, len(encoding))
+            first_bytes.add(encoding[0])
+
+        table = create_backend("opcode_table", self.parsable_instructions)
+        decodable = {
+            b0
+            for b0 in range(256)
+            if table.opcode_table.first_byte_lengths[b0] != UNDECODABLE
+        }
+        self.assertEqual(first_bytes, decodable)
+
+    def test_candidates_agree_on_every_encoding(self):
+        for backend in CANDIDATES:
+            with self.subTest(backend=backend):
+                report = DifferentialRunner(
+                    self.parsable_instructions, backend
+                ).run_encodings(trailing_patterns=[b"\x7f\x80"])
+                self.assertEqual(report.divergences, [])
+                self.assertGreater(report.instructions, 4000)
+                self.assertGreater(report.relative_throughput, 0)
+
+    def test_reports_first_divergence(self):
+        register_backend("renames_fourth", RenamesFourthInstruction)
+        self.addCleanup(BACKENDS.pop, "renames_fourth")
+        report = DifferentialRunner(self.parsable_instructions, "renames_fourth").run(
+            [("jumps", JUMPS_BIN)]
+        )
+        (divergence,) = report.divergences
+        self.assertEqual(divergence.offset, 6)
+        self.assertEqual(str(divergence.reference), "mov al, [bx + si + 4999]")
+        self.assertEqual(str(divergence.candidate), "xor al, [bx + si + 4999]")
+
+    def test_reports_errors(self):
+        # the opcode table rejects a truncated binary as a whole, like the trie walker
+        report = DifferentialRunner(self.parsable_instructions, "opcode_table").run(
+            [("truncated", JUMPS_BIN[:7]), ("undecodable", JUMPS_BIN[:6] + b"\x0f")]
+        )
+        self.assertEqual(report.divergences, [])
+
+        register_backend("stops_early", StopsAfterTwoInstructions)
+        self.addCleanup(BACKENDS.pop, "stops_early")
+        report = DifferentialRunner(self.parsable_instructions, "stops_early").run(
+            [("jumps", JUMPS_BIN)]
+        )
+        (divergence,) = report.divergences
+        self.assertEqual(divergence.offset, 4)
+        self.assertEqual(str(divergence.reference), "jne $+4")
+        self.assertIsInstance(divergence.candidate, ValueError)
+
+    def test_earlier_error_is_a_divergence(self):
+        # the reference decodes three instructions and then fails on the cut off one,
+        # a candidate that gives up after two does not agree with it
+        register_backend("stops_early", StopsAfterTwoInstructions)
+        self.addCleanup(BACKENDS.pop, "stops_early")
+        report = DifferentialRunner(self.parsable_instructions, "stops_early").run(
+            [("truncated", JUMPS_BIN[:7])]
+        )
+        (divergence,) = report.divergences
+        self.assertEqual(divergence.offset, 4)
+        self.assertEqual(str(divergence.reference), "jne $+4")
+        self.assertIsInstance(divergence.candidate, ValueError)
+
+    def test_any_candidate_exception_is_reported(self):
+        register_backend("crashes", Crashes)
+        self.addCleanup(BACKENDS.pop, "crashes")
+        report = DifferentialRunner(self.parsable_instructions, "crashes").run(
+            [("jumps", JUMPS_BIN)]
+        )
+        (divergence,) = report.divergences
+        self.assertEqual(divergence.offset, 0)
+        self.assertIsInstance(divergence.candidate, IndexError)
+
+
+if __name__ == "__main__":
+    unittest.main()
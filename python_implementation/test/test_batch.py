@@ -0,0 +1,169 @@
+import gzip
+import json
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+from typing import override
+
+from python_implementation.src.batch import BatchJob, Journal
+from python_implementation.src.compressed_io import read_file
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.test.helpers import get_binaries, random_program
+
+
+class TestBatchJob(unittest.TestCase):
+    @classmethod
+    @override
+    def setUpClass(cls) -> None:
+        cls.disassembler = Disassembler.from_config()
+
+    @override
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.input_dir = Path(temp_dir.name) / "in"
+        self.output_dir = Path(temp_dir.name) / "out"
+        self.input_dir.mkdir()
+        self.input_paths = []
+        for ind, binary in enumerate(get_binaries()):
+            self.input_paths.append(self.input_dir / f"binary_{ind}")
+            self.input_paths[-1].write_bytes(binary)
+        self.big_path = self.input_dir / "big"
+        self.big_path.write_bytes(random_program(self.disassembler, 8192, seed=4))
+        self.input_paths.append(self.big_path)
+
+    def new_job(self) -> BatchJob:
+        return BatchJob(self.disassembler, self.output_dir, chunk_size=1024)
+
+    def expected_listing(self, path: Path) -> str:
+        return str(self.disassembler.decode(path.read_bytes()))
+
+    def test_outputs_and_journal(self):
+        stats = self.new_job().run(self.input_paths)
+        self.assertEqual(stats.files_done, len(self.input_paths))
+        self.assertGreater(stats.chunks_done, 4)
+        for path in self.input_paths:
+            output = self.output_dir / (path.name + ".asm")
+            self.assertEqual(output.read_text(), self.expected_listing(path))
+        # only the listings and the journal are left behind
+        self.assertEqual(
+            len(list(self.output_dir.iterdir())), len(self.input_paths) + 1
+        )
+
+    def test_resume_skips_finished_files(self):
+        self.new_job().run(self.input_paths)
+        stats = self.new_job().run(self.input_paths, resume=True)
+        self.assertEqual(stats.files_skipped, len(self.input_paths))
+        self.assertEqual(stats.files_done, 0)
+
+        # a damaged output is done again, without resume everything is
+        damaged = self.output_dir / (self.input_paths[0].name + ".asm")
+        damaged.write_text("bits 16\n")
+        stats = self.new_job().run(self.input_paths, resume=True)
+        self.assertEqual((stats.files_done, stats.redone), (1, 1))
+        self.assertEqual(
+            damaged.read_text(), self.expected_listing(self.input_paths[0])
+        )
+        stats = self.new_job().run(self.input_paths)
+        self.assertEqual(stats.files_done, len(self.input_paths))
+
+    def test_resume_from_chunk_checkpoints(self):
+        job = self.new_job()
+        edges = job.chunk_edges(self.big_path.read_bytes())
+        journal = Journal(job.journal.path)
+
+        # a job killed halfway through the big input, and in the middle of a journal line
+        original_append = Journal.append
+        appended = 0
+
+        def append_then_die(journal: Journal, entry: dict):
+            nonlocal appended
+            if appended == 3:
+                with open(journal.path, "a") as file:
+                    file.write(json.dumps(entry)[:10])
+                raise KeyboardInterrupt
+            original_append(journal, entry)
+            appended += 1
+
+        with unittest.mock.patch.object(Journal, "append", append_then_die):
+            with self.assertRaises(KeyboardInterrupt):
+                job.run([self.big_path])
+        self.assertEqual(len(journal.entries()), 3)
+
+        # one finished chunk damaged on disk as well
+        chunk_directory = self.output_dir / "big.asm.chunks"
+        (chunk_directory / "1.chunk").write_bytes(b"\0\0\0\0")
+        stats = self.new_job().run([self.big_path], resume=True)
+        self.assertEqual(stats.chunks_skipped, 2)
+        self.assertEqual(stats.chunks_done, len(edges) - 2)
+        self.assertEqual(stats.redone, 1)
+        self.assertEqual(
+            (self.output_dir / "big.asm").read_text(),
+            self.expected_listing(self.big_path),
+        )
+        self.assertFalse(chunk_directory.exists())
+        types = [entry["type"] for entry in journal.entries()]
+        self.assertEqual(types.count("file"), 1)
+
+    def test_changed_input_is_redone(self):
+        self.new_job().run(self.input_paths)
+        self.input_paths[0].write_bytes(self.input_paths[1].read_bytes())
+        stats = self.new_job().run(self.input_paths, resume=True)
+        self.assertEqual(stats.files_done, 1)
+        self.assertEqual(
+            (self.output_dir / (self.input_paths[0].name + ".asm")).read_text(),
+            self.expected_listing(self.input_paths[1]),
+        )
+
+    def test_same_name_in_different_directories(self):
+        other_dir = self.input_dir / "other"
+        other_dir.mkdir()
+        other_big_path = other_dir / "big"
+        other_big_path.write_bytes(self.input_paths[0].read_bytes())
+        self.new_job().run([self.big_path, other_big_path])
+        self.assertEqual(
+            (self.output_dir / "big.asm").read_text(),
+            self.expected_listing(self.big_path),
+        )
+        self.assertEqual(
+            (self.output_dir / "other" / "big.asm").read_text(),
+            self.expected_listing(other_big_path),
+        )
+
+        # resuming with one of them changed only redoes that one
+        other_big_path.write_bytes(self.input_paths[1].read_bytes())
+        stats = self.new_job().run([self.big_path, other_big_path], resume=True)
+        self.assertEqual((stats.files_skipped, stats.files_done), (1, 1))
+        self.assertEqual(
+            (self.output_dir / "other" / "big.asm").read_text(),
+            self.expected_listing(other_big_path),
+        )
+
+    def test_inputs_sharing_an_output_are_rejected(self):
+        compressed_path = self.input_dir / "big.gz"
+        compressed_path.write_bytes(gzip.compress(self.big_path.read_bytes()))
+        with self.assertRaises(ValueError):
+            self.new_job().run([self.big_path, compressed_path])
+        self.assertFalse(self.output_dir.exists())
+
+    def test_compressed_inputs_and_outputs(self):
+        compressed_path = self.input_dir / "big.bin.gz"
+        compressed_path.write_bytes(gzip.compress(self.big_path.read_bytes()))
+        job = BatchJob(
+            self.disassembler,
+            self.output_dir,
+            chunk_size=1024,
+            output_suffix=".asm.xz",
+        )
+        job.run([compressed_path])
+        output = self.output_dir / "big.bin.asm.xz"
+        self.assertEqual(
+            read_file(output).decode(), self.expected_listing(self.big_path)
+        )
+        stats = job.run([compressed_path], resume=True)
+        self.assertEqual(stats.files_skipped, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import tempfile
+import unittest
+
+from python_implementation.src.chunk_cache import ChunkedDecoder
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.result_cache import ResultCache
+from python_implementation.test.helpers import get_binaries, random_program
+
+
+class TestChunkedDecoder(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.disassembler = Disassembler.from_config()
+        cls.version_1 = random_program(cls.disassembler, 24 * 1024, seed=1)
+        # a new build of the same binary, a few instructions patched in the middle
+        offsets = cls.disassembler.scan(cls.version_1)
+        middle = offsets[len(offsets) // 2]
+        cls.version_2 = (
+            cls.version_1[:middle]
+            + random_program(cls.disassembler, 64, seed=2)
+            + cls.version_1[middle:]
+        )
+
+    def new_decoder(self, **kwargs) -> ChunkedDecoder:
+        return ChunkedDecoder(
+            self.disassembler, avg_chunk_bits=10, min_chunk_size=256, **kwargs
+        )
+
+    def test_chunks_end_on_instruction_boundaries(self):
+        decoder = self.new_decoder()
+        edges = decoder.chunk_edges(self.version_1)
+        self.assertGreater(len(edges), 4)
+        self.assertEqual(edges[-1], len(self.version_1))
+        boundaries = set(self.disassembler.scan(self.version_1))
+        self.assertTrue(all(edge in boundaries for edge in edges[:-1]))
+
+    def test_new_version_reuses_unchanged_chunks(self):
+        decoder = self.new_decoder()
+        self.assertEqual(
+            str(decoder.decode(self.version_1)),
+            str(self.disassembler.decode(self.version_1)),
+        )
+        self.assertEqual(decoder.stats.reused_chunks, 0)
+
+        first_pass_chunks = decoder.stats.chunks
+        self.assertEqual(
+            str(decoder.decode(self.version_2)),
+            str(self.disassembler.decode(self.version_2)),
+        )
+        second_pass_chunks = decoder.stats.chunks - first_pass_chunks
+        self.assertGreaterEqual(decoder.stats.reused_chunks, second_pass_chunks - 3)
+        self.assertLess(decoder.stats.decoded_bytes, len(self.version_1) * 1.5)
+
+    def test_chunks_persist_in_result_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            self.new_decoder(result_cache=ResultCache(cache_dir)).decode(self.version_1)
+            decoder = self.new_decoder(result_cache=ResultCache(cache_dir))
+            self.assertEqual(
+                str(decoder.decode(self.version_1)),
+                str(self.disassembler.decode(self.version_1)),
+            )
+            self.assertEqual(decoder.stats.decoded_bytes, 0)
+
+    def test_shares_result_cache_with_whole_binaries(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            result_cache = ResultCache(cache_dir)
+            decoder = self.new_decoder(result_cache=result_cache)
+            chunk = self.version_1[: decoder.chunk_edges(self.version_1)[0]]
+            expected = str(self.disassembler.decode(chunk))
+
+            decoder.decode(self.version_1)
+            self.assertEqual(
+                result_cache.disassemble(self.disassembler, chunk), expected
+            )
+            self.assertEqual(
+                result_cache.get_listing(result_cache.key(self.disassembler, chunk)),
+                expected,
+            )
+            self.assertEqual(
+                str(self.new_decoder(result_cache=result_cache).decode(chunk)),
+                expected,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+
+from python_implementation.src.base.schema import NamedField
+from python_implementation.src.columnar import ABSENT
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.vectorized import VectorizedDecoder, np
+from python_implementation.test.helpers import JUMPS_BIN, get_binaries
+
+
+class TestColumnar(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.disassembler = Disassembler.from_config()
+        cls.binaries = get_binaries()
+
+    def test_renders_like_reference(self):
+        for binary in self.binaries:
+            columnar = self.disassembler.decode_columnar(binary)
+            reference = self.disassembler.decode(binary)
+            self.assertEqual(
+                columnar.to_disassembly().instructions, reference.instructions
+            )
+            self.assertEqual(str(columnar), str(reference))
+
+    def test_columns(self):
+        columnar = self.disassembler.decode_columnar(JUMPS_BIN)
+        self.assertEqual(list(columnar.offsets), [0, 2, 4, 6, 10])
+        self.assertEqual(list(columnar.sizes), [2, 2, 2, 4, 2])
+        self.assertEqual(list(columnar.displacements), [-2, 0, 4, 4999, -10])
+        self.assertEqual(columnar.fields[NamedField.MOD][1], 0b11)
+        self.assertEqual(columnar.fields[NamedField.DISP_LO][1], ABSENT)
+        self.assertEqual(
+            [columnar.mnemonics[i] for i in columnar.mnemonic_ids],
+            ["jne", "mov", "jne", "mov", "jne"],
+        )
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestVectorized(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.disassembler = Disassembler.from_config()
+        cls.binaries = get_binaries()
+        cls.decoder = VectorizedDecoder(cls.disassembler.opcode_table)
+
+    def test_matches_pure_python_columns(self):
+        for binary in self.binaries:
+            vectorized = self.decoder.decode(binary)
+            columnar = self.disassembler.decode_columnar(binary)
+            self.assertEqual(str(vectorized), str(columnar))
+            for name in (
+                "offsets",
+                "sizes",
+                "schema_ids",
+                "displacements",
+                "immediates",
+            ):
+                self.assertEqual(
+                    list(getattr(vectorized, name)), list(getattr(columnar, name))
+                )
+
+    def test_rejects_bad_input(self):
+        with self.assertRaisesRegex(ValueError, "offset 2"):
+            self.decoder.decode(b"\x89\xd9\x0f")
+        with self.assertRaisesRegex(ValueError, "middle of an instruction"):
+            self.decoder.decode(b"\xb9\x0c")
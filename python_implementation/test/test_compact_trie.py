@@ -0,0 +1,75 @@
+import unittest
+
+from python_implementation.src.base.schema import (
+    InstructionSchema,
+    LiteralField,
+    NamedField,
+)
+from python_implementation.src.compact_trie import BRANCH, RUN, CompactTrie
+from python_implementation.src.disassembled import DisassembledJumpInstruction
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.intermediates.accumulator import DecodeAccumulator
+from python_implementation.test.helpers import get_binaries
+
+
+def two_byte_jump(mnemonic: str, second_opcode: int) -> InstructionSchema:
+    return InstructionSchema(
+        mnemonic,
+        LiteralField(0x0F, 8),
+        [LiteralField(second_opcode, 8), NamedField.IP_INC8],
+        {},
+    )
+
+
+class TestCompactTrie(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.disassembler = Disassembler.from_config()
+        cls.compact = CompactTrie.from_parsable_instructions(
+            cls.disassembler.parsable_instructions
+        )
+
+    def test_renders_like_reference(self):
+        for binary in get_binaries():
+            self.assertEqual(
+                str(self.compact.decode(binary)),
+                str(self.disassembler.decode(binary)),
+            )
+
+    def test_fewer_nodes_than_object_trie(self):
+        def count_nodes(node):
+            if node is None:
+                return 0
+            return 1 + sum(count_nodes(child) for child in node.children)
+
+        self.assertLess(
+            len(self.compact), count_nodes(self.disassembler.trie.dummy_head)
+        )
+
+    def test_rejects_undecodable_and_truncated(self):
+        with self.assertRaisesRegex(ValueError, "Undecodable"):
+            self.compact.decode(bytes([0x0F, 0x00]))
+        with self.assertRaisesRegex(ValueError, "ended in the middle"):
+            self.compact.decode(bytes([0x89]))
+
+    def test_deeper_literal_prefix(self):
+        mov = self.disassembler.parsable_instructions[0]
+        trie = CompactTrie.from_parsable_instructions(
+            [mov, two_byte_jump("jo", 0x80), two_byte_jump("jno", 0x81)]
+        )
+        # 0x0F splits from mov on its first bit, its other 7 bits are one run, then the
+        # shared 7 bits of the second opcode are another run before the last bit branches
+        self.assertEqual(list(trie.kinds), [BRANCH, RUN, RUN, BRANCH])
+
+        acc = DecodeAccumulator()
+        self.assertEqual(
+            trie.decode_one(bytes([0x0F, 0x81, 0xFA]), 0, acc),
+            DisassembledJumpInstruction("jno", -6, 3),
+        )
+        self.assertEqual(
+            str(trie.decode_one(bytes([0x89, 0xD9]), 0, acc)), "mov cx, bx"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import gzip
+import tempfile
+import unittest
+from pathlib import Path
+from typing import override
+
+from python_implementation.src.compressed_io import (
+    OPENERS,
+    iter_file_bytes,
+    read_file,
+    write_lines_atomically,
+)
+from python_implementation.src.disassembled import iter_listing_lines
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.test.helpers import JUMPS_BIN, get_binaries, random_program
+
+
+class TestCompressedIO(unittest.TestCase):
+    @classmethod
+    @override
+    def setUpClass(cls) -> None:
+        cls.disassembler = Disassembler.from_config()
+
+    @override
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.dir = Path(temp_dir.name)
+
+    def write_compressed(self, name: str, data: bytes) -> Path:
+        path = self.dir / name
+        with OPENERS.get(path.suffix, open)(path, "wb") as file:
+            file.write(data)
+        return path
+
+    def test_streaming_listing_matches(self):
+        binaries = [*get_binaries(), random_program(self.disassembler, 4096, seed=5)]
+        # a jump into the middle of an instruction and one past the end get no label
+        binaries.append(bytes([0x74, 0x01, 0xB8, 0x01, 0x00, 0x75, 0x10]))
+        for binary in binaries:
+            lines = list(
+                iter_listing_lines(lambda: self.disassembler.iter_decode(binary))
+            )
+            self.assertEqual("\n".join(lines), str(self.disassembler.decode(binary)))
+
+    def test_compressed_input_and_output(self):
+        program = random_program(self.disassembler, 16 * 1024, seed=6)
+        expected = str(self.disassembler.decode(program))
+        for suffix in ["", *OPENERS]:
+            with self.subTest(suffix=suffix):
+                input_path = self.write_compressed(f"program{suffix}", program)
+                self.assertEqual(read_file(input_path), program)
+                self.assertEqual(bytes(iter_file_bytes(input_path, 1000)), program)
+                self.assertEqual(
+                    str(self.disassembler.decode_file(input_path)), expected
+                )
+
+                output_path = self.dir / f"program.asm{suffix}"
+                self.disassembler.write_listing(input_path, output_path)
+                self.assertEqual(read_file(output_path).decode(), expected)
+                if suffix:
+                    self.assertLess(
+                        output_path.stat().st_size, len(expected.encode()) // 3
+                    )
+
+    def test_failed_write_leaves_nothing(self):
+        output_path = self.dir / "jumps.asm.gz"
+        write_lines_atomically(output_path, ["bits 16"])
+
+        def lines():
+            yield "bits 16"
+            raise ValueError("Undecodable")
+
+        with self.assertRaises(ValueError):
+            write_lines_atomically(output_path, lines())
+        self.assertEqual([p.name for p in self.dir.iterdir()], ["jumps.asm.gz"])
+        self.assertEqual(gzip.decompress(output_path.read_bytes()), b"bits 16")
+
+        input_path = self.write_compressed("jumps.xz", JUMPS_BIN[:7])
+        with self.assertRaises(AssertionError):
+            self.disassembler.write_listing(input_path, self.dir / "jumps.asm")
+        self.assertFalse((self.dir / "jumps.asm").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
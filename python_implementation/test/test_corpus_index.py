@@ -0,0 +1,94 @@
+import tempfile
+import unittest
+from pathlib import Path
+from typing import override
+
+from python_implementation.src.corpus_index import (
+    CorpusIndex,
+    immediate_term,
+    memory_term,
+    mnemonic_term,
+    register_term,
+)
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.test.helpers import EXAMPLE_BINARIES
+
+# cmp ax, 4660 / mov ax, [bp + di + 4] / mov [bp + di + 16], ax / mov bx, [5]
+SEARCH_BIN = bytes(
+    [0x3D, 0x34, 0x12, 0x8B, 0x43, 0x04, 0x89, 0x83, 0x10, 0x00]
+    + [0x8B, 0x1E, 0x05, 0x00]
+)
+
+
+class TestCorpusIndex(unittest.TestCase):
+    @classmethod
+    @override
+    def setUpClass(cls) -> None:
+        cls.disassembler = Disassembler.from_config()
+
+    @override
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.index_dir = Path(temp_dir.name)
+        self.index = CorpusIndex(self.index_dir)
+        self.index.add(self.disassembler, "search", SEARCH_BIN)
+        self.index.add_files(self.disassembler, sorted(EXAMPLE_BINARIES.iterdir()))
+
+    def test_queries(self):
+        self.assertEqual(
+            list(self.index.search(mnemonic_term("cmp"), immediate_term(0x1234))),
+            [("search", 0)],
+        )
+        self.assertEqual(
+            list(
+                self.index.search(mnemonic_term("mov"), memory_term("bp + di + disp"))
+            ),
+            [("search", 3), ("search", 6)],
+        )
+        self.assertIn(
+            ("search", 10),
+            list(self.index.search(memory_term("disp"), register_term("bx"))),
+        )
+        self.assertEqual(list(self.index.search(immediate_term(0xBEEF))), [])
+
+    def test_matches_decoded_listing(self):
+        path = EXAMPLE_BINARIES / "listing_0039_more_movs"
+        hits = [
+            offset
+            for file, offset in self.index.search(register_term("cx"))
+            if file == str(path)
+        ]
+        offset, expected = 0, []
+        for inst in self.disassembler.decode_file(path).instructions:
+            if "cx" in str(inst).replace(",", " ").split():
+                expected.append(offset)
+            offset += inst.inst_size
+        self.assertEqual(hits, expected)
+
+    def test_bloom_skips_files(self):
+        list(self.index.search(mnemonic_term("cmp")))
+        self.assertEqual(self.index.last_search.files, len(self.index.files))
+        self.assertLess(self.index.last_search.shards_opened, len(self.index.files))
+
+    def test_reopened_index(self):
+        reopened = CorpusIndex(self.index_dir)
+        self.assertEqual(list(reopened.search(immediate_term(0x1234))), [("search", 0)])
+
+    def test_corrupt_shard(self):
+        shard, _ = self.index.files["search"]
+        data = (self.index_dir / shard).read_bytes()
+        for name, damaged in [
+            ("magic", b"XREF" + data[4:]),
+            ("header", data[:6]),
+            ("truncated", data[:-1]),
+            ("trailing", data + b"\0"),
+        ]:
+            with self.subTest(name=name):
+                (self.index_dir / shard).write_bytes(damaged)
+                with self.assertRaisesRegex(ValueError, "search"):
+                    list(self.index.search(immediate_term(0x1234)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+from python_implementation.src.cycles import Loop, Region
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.test.helpers import JUMPS_BIN, random_program
+
+# mov cx, 3 / label_0: add ax, bx / add [bx + si], bx / loop label_0
+COUNTED_LOOP = bytes([0xB9, 0x03, 0x00, 0x01, 0xD8, 0x01, 0x18, 0xE2, 0xFA])
+
+
+class TestCycles(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.disassembler = Disassembler.from_config()
+
+    def cycles(self, encoding: list[int]) -> int:
+        return self.disassembler.cost_report(bytes(encoding)).estimates[0].cycles
+
+    def test_effective_address_and_odd_penalty(self):
+        self.assertEqual(self.cycles([0x89, 0xD9]), 2)  # mov cx, bx
+        self.assertEqual(self.cycles([0x8B, 0x56, 0x00]), 17)  # mov dx, [bp]
+        self.assertEqual(self.cycles([0x8B, 0x00]), 15)  # mov ax, [bx + si]
+        self.assertEqual(self.cycles([0x8B, 0x41, 0x05]), 20)  # mov ax, [bx + di + 5]
+        self.assertEqual(self.cycles([0x8B, 0x2E, 0x04, 0x00]), 14)  # mov bp, [4]
+        self.assertEqual(self.cycles([0x8B, 0x2E, 0x05, 0x00]), 18)  # mov bp, [5]
+        self.assertEqual(self.cycles([0x8A, 0x2E, 0x05, 0x00]), 14)  # mov ch, [5]
+        self.assertEqual(self.cycles([0xA1, 0x05, 0x00]), 14)  # mov ax, [5]
+        # read and write both pay the penalty
+        self.assertEqual(self.cycles([0x01, 0x1E, 0x05, 0x00]), 30)  # add [5], bx
+        self.assertEqual(self.cycles([0x39, 0x1E, 0x05, 0x00]), 19)  # cmp [5], bx
+
+    def test_jumps(self):
+        estimate = self.disassembler.cost_report(bytes([0xE2, 0xFE])).estimates[0]
+        self.assertEqual((estimate.cycles, estimate.taken_cycles), (5, 17))
+
+    def test_loops_and_regions(self):
+        report = self.disassembler.cost_report(COUNTED_LOOP)
+        self.assertEqual(report.loops, [Loop(1, 4, 3, 9, 3 + 23 + 17)])
+        self.assertEqual(
+            report.regions,
+            [Region(1, 4, 3, 9, 3 + 23 + 5, 1), Region(0, 1, 0, 3, 4, 0)],
+        )
+
+    def test_nested_loops_rank_first(self):
+        report = self.disassembler.cost_report(JUMPS_BIN)
+        self.assertEqual(
+            [(loop.start_offset, loop.end_offset) for loop in report.loops],
+            [(2, 12), (0, 2)],
+        )
+        self.assertTrue(all(region.loop_depth == 1 for region in report.regions))
+
+    def test_annotated_listing(self):
+        self.assertEqual(
+            self.disassembler.cost_report(COUNTED_LOOP).annotated_listing(),
+            "\n".join(
+                [
+                    "bits 16",
+                    "mov cx, 3 ; +4 = 4",
+                    "label_0:",
+                    "add ax, bx ; +3 = 7",
+                    "add [bx + si], bx ; +23 (16 + 7ea) = 30",
+                    "loop label_0 ; +5 (17 taken) = 35",
+                ]
+            ),
+        )
+
+    def test_every_instruction_has_a_timing(self):
+        program = random_program(self.disassembler, 4096, seed=4)
+        report = self.disassembler.cost_report(program)
+        self.assertEqual(len(report.estimates), len(self.disassembler.scan(program)))
+        self.assertEqual(
+            sum(region.cycles for region in report.regions), report.total_cycles
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import socket
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import override
+
+from python_implementation.src.daemon import (
+    FRAME_HEADER,
+    DisassemblyClient,
+    DisassemblyServer,
+)
+from python_implementation.src.disassembler import Disassembler
+
+EXAMPLE_BINARIES = Path(__file__).parent / ".." / ".." / "example_asm" / "assembled"
+
+
+class TestDaemon(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.socket_path = str(Path(self.temp_dir.name) / "disasm.sock")
+        self.disassembler = Disassembler.from_config()
+        self.server = DisassemblyServer(
+            self.socket_path, self.disassembler, num_workers=2
+        )
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.start()
+
+    @override
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server_thread.join()
+        self.server.server_close()
+        self.temp_dir.cleanup()
+
+    def test_matches_in_process_decode(self):
+        with DisassemblyClient(self.socket_path) as client:
+            for binary_path in sorted(EXAMPLE_BINARIES.iterdir()):
+                binary = binary_path.read_bytes()
+                self.assertEqual(
+                    client.disassemble(binary), str(self.disassembler.decode(binary))
+                )
+
+    def test_concurrent_clients(self):
+        binary = (EXAMPLE_BINARIES / "listing_0039_more_movs").read_bytes()
+        expected = str(self.disassembler.decode(binary))
+
+        def decode_with_new_client(_):
+            with DisassemblyClient(self.socket_path) as client:
+                return client.disassemble(binary)
+
+        with ThreadPoolExecutor(4) as pool:
+            for listing in pool.map(decode_with_new_client, range(16)):
+                self.assertEqual(listing, expected)
+
+    def test_error_keeps_connection_usable(self):
+        with DisassemblyClient(self.socket_path) as client:
+            with self.assertRaises(RuntimeError):
+                # mov with a missing mod/reg/rm byte
+                client.disassemble(b"\x89")
+            self.assertEqual(client.disassemble(b"\x89\xd9"), "bits 16\nmov cx, bx")
+
+    def test_closed_mid_request_gets_no_response(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(5)
+            sock.connect(self.socket_path)
+            sock.sendall(FRAME_HEADER.pack(10))
+            sock.shutdown(socket.SHUT_WR)
+            self.assertEqual(sock.recv(1), b"")
+
+    def test_idle_connections_hold_no_worker(self):
+        idle_clients = [DisassemblyClient(self.socket_path) for _ in range(4)]
+        try:
+            with DisassemblyClient(self.socket_path) as client:
+                client.sock.settimeout(5)
+                self.assertEqual(client.disassemble(b"\x89\xd9"), "bits 16\nmov cx, bx")
+        finally:
+            for idle_client in idle_clients:
+                idle_client.close()
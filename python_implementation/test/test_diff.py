@@ -0,0 +1,111 @@
+import random
+import unittest
+
+from python_implementation.src.diff import (
+    DiffHunk,
+    InstructionStream,
+    diff_binaries,
+    diff_streams,
+)
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.test.helpers import random_program
+
+
+class TestDiff(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.disassembler = Disassembler.from_config()
+        cls.program = random_program(cls.disassembler, 8 * 1024, seed=1)
+        cls.offsets = list(cls.disassembler.scan(cls.program))
+
+    def stream(self, contents: bytes) -> InstructionStream:
+        return InstructionStream.from_bytes(self.disassembler, contents)
+
+    def diff(self, old: bytes, new: bytes) -> list[DiffHunk]:
+        return diff_streams(self.stream(old), self.stream(new))
+
+    def test_identical(self):
+        self.assertEqual(self.diff(self.program, self.program), [])
+        self.assertEqual(
+            diff_binaries(self.disassembler, self.program, self.program), ""
+        )
+
+    def jumps_to_boundaries(self) -> dict[int, int]:
+        """Offset of each jump in the program that lands on an instruction, to its target"""
+        stream = self.stream(self.program)
+        return {
+            stream.boundaries[ind]: stream.boundaries[target]
+            for ind, target in stream.jump_targets.items()
+        }
+
+    def test_insertion_moves_no_jumps(self):
+        ind = len(self.offsets) // 2
+        inserted = random_program(self.disassembler, 16, seed=2)
+        num_inserted = len(self.disassembler.scan(inserted))
+        middle = self.offsets[ind]
+        new = bytearray(self.program[:middle] + inserted + self.program[middle:])
+
+        def moved(offset: int) -> int:
+            return offset + len(inserted) if offset > middle else offset
+
+        # jumps over the insertion get new displacements to keep their targets, which
+        # is not a change
+        for offset, target in self.jumps_to_boundaries().items():
+            displacement = moved(target) - (moved(offset) + 2)
+            self.assertIn(displacement, range(-128, 128))
+            new[moved(offset) + 1] = displacement & 0xFF
+
+        self.assertEqual(
+            self.diff(self.program, bytes(new)),
+            [DiffHunk(ind, ind, ind, ind + num_inserted)],
+        )
+
+    def test_retargeted_jump_is_reported(self):
+        jumps = self.jumps_to_boundaries()
+        new = bytearray(self.program)
+        retargeted = []
+        for offset, target in list(jumps.items())[::50]:
+            # to the instruction after its target instead
+            next_target = self.offsets[self.offsets.index(target) + 1]
+            new[offset + 1] = (new[offset + 1] + next_target - target) & 0xFF
+            ind = self.offsets.index(offset)
+            retargeted.append(DiffHunk(ind, ind + 1, ind, ind + 1))
+        self.assertGreater(len(retargeted), 2)
+        self.assertEqual(self.diff(self.program, bytes(new)), retargeted)
+
+    def test_hunks_rebuild_new(self):
+        for seed in range(5):
+            rng = random.Random(seed)
+            new = bytearray(self.program)
+            offsets = self.offsets + [len(self.program)]
+            for ind in sorted(rng.sample(range(len(self.offsets)), 6), reverse=True):
+                replacement = random_program(self.disassembler, rng.randrange(8), seed)
+                new[offsets[ind] : offsets[ind + rng.randrange(3)]] = replacement
+            old_stream, new_stream = self.stream(self.program), self.stream(bytes(new))
+
+            hunks = diff_streams(old_stream, new_stream)
+            rebuilt, pos = [], 0
+            for hunk in hunks:
+                rebuilt += old_stream.hashes[pos : hunk.old_start]
+                rebuilt += new_stream.hashes[hunk.new_start : hunk.new_end]
+                pos = hunk.old_end
+            rebuilt += old_stream.hashes[pos:]
+            self.assertEqual(rebuilt, new_stream.hashes)
+            self.assertLessEqual(len(hunks), 6)
+
+    def test_text(self):
+        old = bytes([0x89, 0xD9, 0x75, 0x02, 0x89, 0xD9])
+        new = bytes([0x89, 0xD9, 0x75, 0x04, 0x01, 0xD9, 0x89, 0xD9])
+        self.assertEqual(
+            diff_binaries(self.disassembler, old, new),
+            "@@ -4,0 +4,1 @@\n+add cx, bx",
+        )
+        retargeted = bytes([0x89, 0xD9, 0x75, 0x00, 0x89, 0xD9])
+        self.assertEqual(
+            diff_binaries(self.disassembler, old, retargeted),
+            "@@ -2,1 +2,1 @@\n-jne $+2\n+jne $+0",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,7 +6,10 @@ import tempfile
 import unittest
 from typing import override
 
-from ..src import main as disasm
+from ..src.base.config_loader import get_parsable_instructions_from_config
+from ..src.disassembled import DisassembledJumpInstruction
+from ..src.disassembler import Disassembler
+from ..src.parser import parse_binary
 
 logging.basicConfig(level=logging.DEBUG)
 test_logger = logging.getLogger("tests")
@@ -21,7 +24,7 @@ class TestDisassembler(unittest.TestCase):
     @classmethod
     @override
     def setUpClass(cls) -> None:
-        cls.parsable_instructions = disasm.get_parsable_instructions_from_config()
+        cls.parsable_instructions = get_parsable_instructions_from_config()
         return super().setUpClass()
 
     def get_bin_from_nasm(self, asm_instructions: str):
@@ -60,7 +63,7 @@ class TestDisassembler(unittest.TestCase):
             "\n".join(itertools.chain(["bits 16"], asm_instructions))
         )
         try:
-            disassembled = disasm.parse_binary(self.parsable_instructions, original_bin)
+            disassembled = parse_binary(self.parsable_instructions, original_bin)
         except Exception as e:
             test_logger.error("Our Disassembler errored")
             test_logger.error(f"For test asm, nasm gave us:\n {bin_pp(original_bin)}")
@@ -404,3 +407,26 @@ class TestPop(TestDisassembler):
                 "pop si",
             ]
         )
+
+
+class TestThreadSafety(unittest.TestCase):
+    # jne to itself, mov cx, bx, jne to the next instruction, jne back to the mov
+    JUMPS_BIN = bytes([0x75, 0xFE, 0x89, 0xD9, 0x75, 0x00, 0x75, 0xFA])
+
+    def test_labels_do_not_mutate_instructions(self):
+        disassembler = Disassembler.from_config()
+        disassembly = disassembler.decode(self.JUMPS_BIN)
+        self.assertEqual(
+            str(disassembly),
+            "bits 16\nlabel_0:\njne label_0\nlabel_1:\nmov cx, bx\njne label_2\nlabel_2:\njne label_1",
+        )
+        for inst in disassembly.instructions:
+            if isinstance(inst, DisassembledJumpInstruction):
+                self.assertIsNone(inst.label)
+
+    def test_decode_batch_matches_sequential(self):
+        disassembler = Disassembler.from_config()
+        inputs = [self.JUMPS_BIN * n for n in range(1, 20)]
+        expected = [str(disassembler.decode(b)) for b in inputs]
+        got = [str(d) for d in disassembler.decode_batch(inputs, max_workers=4)]
+        self.assertEqual(got, expected)
@@ -0,0 +1,73 @@
+import unittest
+
+from python_implementation.src.base.schema import NamedField
+from python_implementation.src.disassembled import DisassembledJumpInstruction
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.filtered import DecodeFilter, touches_register
+from python_implementation.test.helpers import random_program
+
+SP = 0b100
+# mov sp, bx / mov cx, bx / mov [bx + si + 4], sp / mov ah, bl (ah shares sp's index)
+SP_BIN = bytes([0x89, 0xDC, 0x89, 0xD9, 0x89, 0x60, 0x04, 0x88, 0xDC])
+
+
+class TestFilteredDecode(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.disassembler = Disassembler.from_config()
+        cls.program = random_program(cls.disassembler, 4096, seed=4)
+        cls.all_instructions = []
+        offset = 0
+        for inst in cls.disassembler.decode(cls.program).instructions:
+            cls.all_instructions.append((offset, inst))
+            offset += inst.inst_size
+
+    def test_jumps_only(self):
+        jumps = {
+            schema.mnemonic
+            for schema in self.disassembler.parsable_instructions
+            if schema.mnemonic.startswith("j")
+        }
+        found = self.disassembler.decode_filtered(
+            self.program, DecodeFilter(mnemonics=frozenset(jumps))
+        )
+        expected = [
+            (offset, inst)
+            for offset, inst in self.all_instructions
+            if isinstance(inst, DisassembledJumpInstruction)
+        ]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(found, expected)
+
+    def test_raw_field_values(self):
+        found = self.disassembler.decode_filtered(
+            self.program,
+            DecodeFilter(field_values={NamedField.MOD: frozenset([0b01, 0b10])}),
+        )
+        mods = self.disassembler.decode_columnar(self.program).fields[NamedField.MOD]
+        expected = [
+            entry for entry, mod in zip(self.all_instructions, mods) if mod in (1, 2)
+        ]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(found, expected)
+
+    def test_touches_sp(self):
+        found = self.disassembler.decode_filtered(
+            SP_BIN, DecodeFilter(predicate=touches_register(SP, word=True))
+        )
+        self.assertEqual(
+            [(offset, str(inst)) for offset, inst in found],
+            [(0, "mov sp, bx"), (4, "mov [bx + si + 4], sp")],
+        )
+
+    def test_schema_variation(self):
+        found = self.disassembler.decode_filtered(
+            self.program, DecodeFilter(schema_ids=frozenset([0]))
+        )
+        mov_reg_rm = self.disassembler.parsable_instructions[0]
+        self.assertTrue(all(inst.mnemonic == mov_reg_rm.mnemonic for _, inst in found))
+        self.assertLess(len(found), len(self.all_instructions))
+
+
+if __name__ == "__main__":
+    unittest.main()
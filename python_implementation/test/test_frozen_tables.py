@@ -0,0 +1,167 @@
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from typing import override
+from unittest import mock
+
+from python_implementation.bench.bench_cold_start import (
+    SCRIPTS,
+    budget_ms,
+    measure_cold_start,
+)
+from python_implementation.src.base.config_loader import (
+    DEFAULT_CONFIG_PATH,
+    get_config_hash,
+)
+from python_implementation.src.compressed_io import read_file
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.frozen_tables import (
+    PACKAGED_MODULE_PATH,
+    FrozenDisassembler,
+    cached_module_path,
+    load_frozen_tables,
+)
+from python_implementation.src.sinks import ListingSink, StatsSink
+from python_implementation.test.helpers import JUMPS_BIN
+
+EXAMPLE_BINARIES = Path(__file__).parent / ".." / ".." / "example_asm" / "assembled"
+
+
+class TestFrozenTables(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.module_path = Path(self.temp_dir.name) / "_frozen_tables.py"
+        self.config_path = Path(self.temp_dir.name) / "asm_config.json"
+        self.config_path.write_bytes(DEFAULT_CONFIG_PATH.read_bytes())
+
+    @override
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_decodes_like_config(self):
+        frozen = FrozenDisassembler.load(self.module_path, self.config_path)
+        reference = Disassembler.from_config()
+        for binary_path in sorted(EXAMPLE_BINARIES.iterdir()):
+            binary = binary_path.read_bytes()
+            self.assertEqual(str(frozen.decode(binary)), str(reference.decode(binary)))
+
+    def test_regenerated_when_config_changes(self):
+        schemas, _ = load_frozen_tables(self.module_path, self.config_path)
+        self.assertIn(get_config_hash(self.config_path), self.module_path.read_text())
+
+        config = json.loads(self.config_path.read_text())
+        del config["instructions"][0]["variations"][0]
+        self.config_path.write_text(json.dumps(config))
+
+        fewer_schemas, opcode_table = load_frozen_tables(
+            self.module_path, self.config_path
+        )
+        self.assertEqual(len(fewer_schemas), len(schemas) - 1)
+        self.assertIn(get_config_hash(self.config_path), self.module_path.read_text())
+        with self.assertRaises(ValueError):
+            # mov cx, bx is no longer in the config
+            opcode_table.scan(b"\x89\xd9")
+
+    def test_generated_into_user_cache(self):
+        packaged = PACKAGED_MODULE_PATH.exists()
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": self.temp_dir.name}):
+            # a changed config, the packaged module can never match it
+            self.config_path.write_text(self.config_path.read_text() + " ")
+            FrozenDisassembler.load(config_path=self.config_path)
+            self.assertTrue(cached_module_path().exists())
+            self.assertTrue(cached_module_path().is_relative_to(self.temp_dir.name))
+        self.assertEqual(PACKAGED_MODULE_PATH.exists(), packaged)
+
+
+class TestFileEntryPoints(unittest.TestCase):
+    """Every file entry point, on the trie decoder and on the frozen tables one"""
+
+    @classmethod
+    @override
+    def setUpClass(cls) -> None:
+        # the frozen tables may be generated into the user cache, keep it out of $HOME
+        cache_dir = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(cache_dir.cleanup)
+        cache_patch = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": cache_dir.name})
+        cache_patch.start()
+        cls.addClassCleanup(cache_patch.stop)
+        cls.disassemblers = [Disassembler.from_config(), FrozenDisassembler.load()]
+
+    @override
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.dir = Path(temp_dir.name)
+        self.input_path = self.dir / "jumps.gz"
+        self.input_path.write_bytes(gzip.compress(JUMPS_BIN))
+        self.expected = Disassembler.from_config().decode(JUMPS_BIN)
+
+    def test_file_entry_points(self):
+        for disassembler in self.disassemblers:
+            with self.subTest(disassembler=type(disassembler).__name__):
+                self.assertEqual(
+                    str(disassembler.decode_file(self.input_path)), str(self.expected)
+                )
+                self.assertEqual(
+                    list(disassembler.iter_decode_file(self.input_path)),
+                    self.expected.instructions,
+                )
+
+                listing_path = self.dir / "jumps.asm.xz"
+                disassembler.write_listing(self.input_path, listing_path)
+                self.assertEqual(read_file(listing_path).decode(), str(self.expected))
+
+                sink_listing_path = self.dir / "sink.asm"
+                stats = StatsSink()
+                disassembler.decode_to_sinks(
+                    self.input_path, [ListingSink(sink_listing_path), stats]
+                )
+                self.assertEqual(sink_listing_path.read_text(), str(self.expected))
+                self.assertEqual(
+                    stats.stats.instructions, len(self.expected.instructions)
+                )
+
+
+class TestColdStart(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.env = os.environ | {"XDG_CACHE_HOME": temp_dir.name}
+        self.env.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    def test_frozen_path_skips_json_and_trie(self):
+        script = SCRIPTS["frozen tables"] + "\nimport sys\nprint(*sys.modules)"
+        # the first run generates the tables, which needs the json config
+        subprocess.run([sys.executable, "-c", script], env=self.env, check=True)
+        modules = subprocess.run(
+            [sys.executable, "-c", script],
+            env=self.env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.split()
+        for module in [
+            "json",
+            "hashlib",
+            "logging",
+            "python_implementation.src.parser",
+            "python_implementation.src.trie",
+            "python_implementation.src.xref",
+            "python_implementation.src.sinks",
+        ]:
+            self.assertNotIn(module, modules)
+
+    @unittest.skipUnless(
+        os.environ.get("RUN_TIMING_TESTS"),
+        "compares wall times, set RUN_TIMING_TESTS=1 or run bench_cold_start",
+    )
+    def test_within_budget(self):
+        medians = measure_cold_start(runs=15, env=self.env)
+        self.assertLessEqual(medians["frozen tables"], budget_ms(medians), medians)
@@ -0,0 +1,46 @@
+import unittest
+from typing import override
+
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.lazy_decoder import LazyDecoder
+from python_implementation.test.helpers import get_binaries
+
+MOV_CX_BX = bytes([0x89, 0xD9])
+MOV_BYTE_CL_BL = bytes([0x88, 0xD9])
+
+
+class TestLazyDecoder(unittest.TestCase):
+    @classmethod
+    @override
+    def setUpClass(cls) -> None:
+        cls.disassembler = Disassembler.from_config()
+
+    @override
+    def setUp(self) -> None:
+        self.lazy = LazyDecoder(self.disassembler.parsable_instructions)
+
+    def test_renders_like_reference(self):
+        for binary in get_binaries():
+            self.assertEqual(
+                str(self.lazy.decode(binary)), str(self.disassembler.decode(binary))
+            )
+
+    def test_builds_only_used_groups(self):
+        self.assertEqual(self.lazy.builds, {})
+        self.lazy.decode(MOV_CX_BX)
+        self.assertEqual(len(self.lazy.builds), 1)
+        (build,) = self.lazy.builds.values()
+        self.assertEqual(build.opcode_bits, ["100010"])
+        self.assertIn("built 1 of", self.lazy.build_report())
+
+        # another first byte from the same group reuses what was built
+        self.lazy.decode(MOV_BYTE_CL_BL)
+        self.assertEqual(len(self.lazy.builds), 1)
+
+    def test_rejects_unknown_opcode(self):
+        with self.assertRaisesRegex(ValueError, "Undecodable"):
+            self.lazy.decode(bytes([0x0F, 0x00]))
+
+
+if __name__ == "__main__":
+    unittest.main()
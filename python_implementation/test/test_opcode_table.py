@@ -0,0 +1,80 @@
+import unittest
+from pathlib import Path
+
+from python_implementation.src.base.config_loader import (
+    get_parsable_instructions_from_config,
+)
+from python_implementation.src.base.schema import NamedField
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.field_plan import FieldPlan
+from python_implementation.src.opcode_table import NEEDS_SECOND_BYTE, OpcodeTable
+from python_implementation.src.parser import parse_binary
+
+EXAMPLE_BINARIES = Path(__file__).parent / ".." / ".." / "example_asm" / "assembled"
+
+
+class TestFieldPlan(unittest.TestCase):
+    def test_mod_reg_rm_layout(self):
+        mov = get_parsable_instructions_from_config()[0]
+        plan = FieldPlan.from_schema(mov)
+        self.assertEqual(plan.header_size, 2)
+        self.assertEqual(plan.literal_checks, ((0, 0b11111100, 0b10001000),))
+        self.assertEqual(
+            plan.extract_header([0b10001001, 0b11011001]),
+            {
+                NamedField.D: 0,
+                NamedField.W: 1,
+                NamedField.MOD: 0b11,
+                NamedField.REG: 0b011,
+                NamedField.RM: 0b001,
+            },
+        )
+        self.assertEqual(plan.trailing_fields, (NamedField.DISP_LO, NamedField.DISP_HI))
+
+
+class TestOpcodeTable(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.parsable_instructions = get_parsable_instructions_from_config()
+        cls.table = OpcodeTable.from_parsable_instructions(cls.parsable_instructions)
+
+    def test_lengths(self):
+        # mov cx, 12 / mov cl, 12
+        self.assertEqual(self.table.first_byte_lengths[0xB9], 3)
+        self.assertEqual(self.table.first_byte_lengths[0xB1], 2)
+        # mov [bx + si + 4999], al depends on the ModRM byte
+        self.assertEqual(self.table.first_byte_lengths[0x88], NEEDS_SECOND_BYTE)
+        self.assertEqual(self.table.second_byte_lengths[0x88 << 8 | 0b10000000], 4)
+        self.assertEqual(self.table.second_byte_lengths[0x88 << 8 | 0b00000110], 4)
+        self.assertEqual(self.table.second_byte_lengths[0x88 << 8 | 0b11000000], 2)
+        # sub word [bx], 34 with and without sign extension
+        self.assertEqual(self.table.second_byte_lengths[0x81 << 8 | 0b00101111], 4)
+        self.assertEqual(self.table.second_byte_lengths[0x83 << 8 | 0b00101111], 3)
+
+    def test_scan_matches_decode(self):
+        for binary_path in sorted(EXAMPLE_BINARIES.iterdir()):
+            binary = binary_path.read_bytes()
+            expected, offset = [], 0
+            for inst in parse_binary(self.parsable_instructions, binary).instructions:
+                expected.append(offset)
+                offset += inst.inst_size
+            self.assertEqual(list(self.table.scan(binary)), expected)
+
+    def test_rejects_undecodable(self):
+        with self.assertRaisesRegex(ValueError, "offset 2"):
+            self.table.scan(b"\x89\xd9\x0f\x89\xd9")
+        # push with a reg field that is not 110
+        with self.assertRaisesRegex(ValueError, "offset 0"):
+            self.table.scan(b"\xff\x00")
+
+    def test_rejects_truncated(self):
+        with self.assertRaisesRegex(ValueError, "middle of an instruction"):
+            self.table.scan(b"\xb9\x0c")
+
+    def test_built_on_first_use(self):
+        disassembler = Disassembler(self.parsable_instructions)
+        self.assertNotIn("opcode_table", vars(disassembler))
+        str(disassembler.decode(b"\x89\xd9"))
+        self.assertNotIn("opcode_table", vars(disassembler))
+        self.assertEqual(list(disassembler.scan(b"\x89\xd9")), [0])
+        self.assertIs(disassembler.opcode_table, disassembler.opcode_table)
@@ -0,0 +1,67 @@
+import tracemalloc
+import unittest
+from pathlib import Path
+
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.intermediates.accumulator import DecodeAccumulator
+from python_implementation.src.parser import BitIterator, parse
+
+EXAMPLE_BINARIES = Path(__file__).parent / ".." / ".." / "example_asm" / "assembled"
+# memory, immediate and jump forms on top of the example movs
+EXTRA_BIN = bytes([0x75, 0xFE, 0x83, 0xC6, 0x02, 0x81, 0x2F, 0xE8, 0x03])
+
+# bytes briefly alive while decoding one instruction on top of what it returns, a
+# fresh accumulator and coil per instruction was around 1000
+TRANSIENT_BYTES_BUDGET = 256
+# the instruction, up to two operands and a 16 bit immediate or displacement int
+RETAINED_BLOCKS_BUDGET = 4
+
+
+class TestSteadyStateAllocations(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.disassembler = Disassembler.from_config()
+        movs = (EXAMPLE_BINARIES / "listing_0039_more_movs").read_bytes()
+        cls.binary = (movs + EXTRA_BIN) * 20
+
+    def test_reused_accumulator_matches_fresh(self):
+        bit_iter, acc = BitIterator(self.binary), DecodeAccumulator()
+        for expected in self.disassembler.iter_decode(self.binary):
+            bit_iter.peek_whole_byte()
+            self.assertEqual(parse(self.disassembler.trie, bit_iter, acc), expected)
+
+    def test_allocations_per_instruction(self):
+        list(self.disassembler.iter_decode(self.binary))  # warm up lazy state
+        instructions = []
+        instruction_iter = self.disassembler.iter_decode(self.binary)
+        tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            worst_transient = 0
+            while True:
+                tracemalloc.reset_peak()
+                try:
+                    instructions.append(next(instruction_iter))
+                except StopIteration:
+                    break
+                current, peak = tracemalloc.get_traced_memory()
+                worst_transient = max(worst_transient, peak - current)
+            after = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+
+        src_filter = [tracemalloc.Filter(True, "*python_implementation/src/*")]
+        retained_blocks = sum(
+            stat.count_diff
+            for stat in after.filter_traces(src_filter).compare_to(
+                before.filter_traces(src_filter), "filename"
+            )
+        )
+        self.assertLessEqual(worst_transient, TRANSIENT_BYTES_BUDGET)
+        self.assertLessEqual(
+            retained_blocks / len(instructions), RETAINED_BLOCKS_BUDGET
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
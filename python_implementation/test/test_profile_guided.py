@@ -0,0 +1,131 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from typing import override
+from unittest import mock
+
+from python_implementation.src.backends import (
+    BACKENDS,
+    DifferentialRunner,
+    create_backend,
+    register_backend,
+)
+from python_implementation.src.base.config_loader import (
+    get_parsable_instructions_from_config,
+    get_schemas_hash,
+)
+from python_implementation.src.base.schema import NamedField
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.parser import parse_binary
+from python_implementation.src.profile_guided import (
+    DecodeProfile,
+    ProfilingBackend,
+    SpecializedDecoder,
+    default_profile_directory,
+)
+from python_implementation.test.helpers import JUMPS_BIN, get_binaries, random_program
+
+
+class TestProfileGuided(unittest.TestCase):
+    @classmethod
+    @override
+    def setUpClass(cls) -> None:
+        cls.parsable_instructions = get_parsable_instructions_from_config()
+        cls.program = random_program(Disassembler.from_config(), 16 * 1024, seed=3)
+        cls.profile = DecodeProfile(get_schemas_hash(cls.parsable_instructions))
+        profiling = ProfilingBackend(cls.parsable_instructions, cls.profile)
+        cls.instructions = list(profiling.iter_decode(cls.program))
+
+    def test_records_schema_and_mod(self):
+        self.assertEqual(self.profile.counts.total(), len(self.instructions))
+        for (schema_ind, mod), count in self.profile.counts.items():
+            schema = self.parsable_instructions[schema_ind]
+            has_mod = NamedField.MOD in schema.fields or NamedField.MOD in (
+                schema.implied_values
+            )
+            self.assertEqual(mod is not None, has_mod)
+            self.assertGreater(count, 0)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            schemas = self.parsable_instructions
+            self.assertIsNone(DecodeProfile.load(temp_dir, schemas))
+            path = self.profile.save(temp_dir)
+            self.assertIn(self.profile.schemas_hash[:16], path.name)
+            self.assertEqual(DecodeProfile.load(temp_dir, schemas), self.profile)
+
+            # a profile recorded against other schemas is never picked up
+            self.assertIsNone(DecodeProfile.load(temp_dir, list(reversed(schemas))))
+            data = json.loads(path.read_text())
+            data["schemas_hash"] = "0" * 64
+            path.write_text(json.dumps(data))
+            self.assertIsNone(DecodeProfile.load(temp_dir, schemas))
+            self.assertEqual([p.suffix for p in Path(temp_dir).iterdir()], [".json"])
+
+    def test_registered_backends_share_the_saved_profile(self):
+        with (
+            tempfile.TemporaryDirectory() as cache_dir,
+            mock.patch.dict(os.environ, {"XDG_CACHE_HOME": cache_dir}),
+        ):
+            unprofiled = create_backend("specialized", self.parsable_instructions)
+            self.assertEqual(unprofiled.fast_paths, [])
+
+            self.assertEqual(
+                str(
+                    parse_binary(self.parsable_instructions, self.program, "profiling")
+                ),
+                str(parse_binary(self.parsable_instructions, self.program)),
+            )
+            # decoding alone never writes the saved profile
+            self.assertFalse(default_profile_directory().exists())
+
+            profiling = create_backend("profiling", self.parsable_instructions)
+            for _ in profiling.iter_decode(self.program):
+                pass
+            profiling.save()
+            self.assertEqual(
+                DecodeProfile.load(
+                    default_profile_directory(), self.parsable_instructions
+                ),
+                self.profile,
+            )
+            specialized = create_backend("specialized", self.parsable_instructions)
+            self.assertEqual(
+                specialized.fast_paths,
+                SpecializedDecoder(self.parsable_instructions, self.profile).fast_paths,
+            )
+
+    def test_hot_encodings_take_fast_paths(self):
+        decoder = SpecializedDecoder(self.parsable_instructions, self.profile)
+        self.assertEqual(list(decoder.iter_decode(self.program)), self.instructions)
+        stats = decoder.stats
+        self.assertGreater(stats.prebuilt + stats.fast_layout, stats.generic)
+
+        hottest = max(self.profile.counts, key=self.profile.counts.__getitem__)
+        self.assertEqual(decoder.fast_paths[0], hottest)
+        self.assertEqual(decoder.generic_order[0].schema.mnemonic, "mov")
+
+    def test_agrees_with_reference(self):
+        for name, profile in [("profiled", self.profile), ("unprofiled", None)]:
+            register_backend(
+                name,
+                lambda instructions, profile=profile: SpecializedDecoder(
+                    instructions, profile
+                ),
+            )
+            self.addCleanup(BACKENDS.pop, name)
+            with self.subTest(profile=name):
+                runner = DifferentialRunner(self.parsable_instructions, name)
+                report = runner.run_encodings(trailing_patterns=[b"\x7f\x80"])
+                self.assertEqual(report.divergences, [])
+                report = runner.run(
+                    [(str(binary), binary) for binary in get_binaries()]
+                    + [("truncated", JUMPS_BIN[:7]), ("program", self.program)]
+                )
+                self.assertEqual(report.divergences, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import struct
+import tempfile
+import unittest
+from pathlib import Path
+from typing import override
+
+from python_implementation.src.base.schema import NamedField
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.records import (
+    RECORD,
+    RECORDS_HEADER,
+    RecordReader,
+    pack_fields,
+    unpack_fields,
+    write_records,
+)
+from python_implementation.test.helpers import JUMPS_BIN, random_program
+
+
+class TestRecords(unittest.TestCase):
+    @classmethod
+    @override
+    def setUpClass(cls) -> None:
+        cls.disassembler = Disassembler.from_config()
+        cls.program = random_program(cls.disassembler, 8192, seed=9)
+        cls.columnar = cls.disassembler.decode_columnar(cls.program)
+
+    @override
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.dir = Path(temp_dir.name)
+        self.path = self.dir / "program.drec"
+        write_records(self.path, self.columnar)
+
+    def open_reader(self) -> RecordReader:
+        reader = RecordReader(self.path, self.disassembler.parsable_instructions)
+        self.addCleanup(reader.close)
+        return reader
+
+    def test_pack_fields(self):
+        values = {NamedField.W: 1, NamedField.MOD: 2, NamedField.DATA_IF_W1: 0xFF}
+        self.assertEqual(unpack_fields(pack_fields(values)), values)
+        self.assertEqual(unpack_fields(pack_fields({})), {})
+
+    def test_random_access(self):
+        reader = self.open_reader()
+        self.assertEqual(len(reader), len(self.columnar))
+        self.assertEqual(reader.mnemonics, self.columnar.mnemonics)
+        self.assertEqual(
+            self.path.stat().st_size, reader.records_offset + len(reader) * RECORD.size
+        )
+        for ind in [0, 1, len(reader) // 2, len(reader) - 1]:
+            record = reader[ind]
+            self.assertEqual(record.offset, self.columnar.offsets[ind])
+            self.assertEqual(record.size, self.columnar.sizes[ind])
+            self.assertEqual(record.schema_id, self.columnar.schema_ids[ind])
+            self.assertEqual(record.fields, self.columnar.parsed_fields(ind))
+            self.assertEqual(record.displacement, self.columnar.displacements[ind])
+            self.assertEqual(record.immediate, self.columnar.immediates[ind])
+            self.assertEqual(
+                record.mnemonic,
+                self.columnar.mnemonics[self.columnar.mnemonic_ids[ind]],
+            )
+        self.assertEqual(reader[-1], reader[len(reader) - 1])
+        with self.assertRaises(IndexError):
+            reader[len(reader)]
+        self.assertEqual(
+            [reader.instruction(i) for i in range(len(reader))],
+            self.disassembler.decode(self.program).instructions,
+        )
+
+    def test_index_of_offset(self):
+        reader = self.open_reader()
+        for ind in [0, 7, len(reader) - 1]:
+            self.assertEqual(reader.index_of_offset(self.columnar.offsets[ind]), ind)
+        long_ind = next(i for i in range(len(reader)) if reader[i].size > 1)
+        self.assertIsNone(reader.index_of_offset(reader[long_ind].offset + 1))
+        self.assertIsNone(reader.index_of_offset(len(self.program)))
+
+    def test_jumps(self):
+        path = self.dir / "jumps.drec"
+        write_records(path, self.disassembler.decode_columnar(JUMPS_BIN))
+        with RecordReader(path) as reader:
+            self.assertEqual(reader[0].mnemonic, "jne")
+            self.assertEqual(reader[0].displacement, -2)
+            self.assertEqual(reader[0].immediate, -1)
+
+    def test_rejects_other_files(self):
+        data = bytearray(self.path.read_bytes())
+        for name, damaged in [
+            ("magic", b"XREF" + data[4:]),
+            ("version", data[:4] + struct.pack("<H", 99) + data[6:]),
+            ("truncated", data[:-1]),
+            ("header", data[: RECORDS_HEADER.size - 1]),
+        ]:
+            with self.subTest(name=name):
+                self.path.write_bytes(damaged)
+                with self.assertRaises(ValueError):
+                    RecordReader(self.path)
+
+    def test_other_schemas(self):
+        schemas = list(reversed(self.disassembler.parsable_instructions))
+        path = self.dir / "reversed.drec"
+        write_records(path, Disassembler(schemas).decode_columnar(self.program))
+        with RecordReader(path, self.disassembler.parsable_instructions) as reader:
+            self.assertFalse(reader.matches_schemas)
+            self.assertEqual(reader[0].offset, 0)
+            with self.assertRaises(ValueError):
+                reader.instruction(0)
+        with RecordReader(path, schemas) as reader:
+            self.assertTrue(reader.matches_schemas)
+            self.assertEqual(
+                reader.instruction(0),
+                self.disassembler.decode(self.program).instructions[0],
+            )
+        with RecordReader(path) as reader:
+            self.assertFalse(reader.matches_schemas)
+
+
+if __name__ == "__main__":
+    unittest.main()
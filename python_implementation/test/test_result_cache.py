@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import override
+
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.result_cache import ResultCache
+from python_implementation.test.helpers import get_binaries
+
+
+class TestResultCache(unittest.TestCase):
+    @classmethod
+    @override
+    def setUpClass(cls) -> None:
+        cls.disassembler = Disassembler.from_config()
+        cls.binaries = get_binaries()
+
+    @override
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.cache_dir = Path(temp_dir.name)
+
+    def test_hit_matches_decode(self):
+        cache = ResultCache(self.cache_dir)
+        for binary in self.binaries:
+            expected = str(self.disassembler.decode(binary))
+            self.assertEqual(cache.disassemble(self.disassembler, binary), expected)
+            key = cache.key(self.disassembler, binary)
+            self.assertEqual(cache.get_listing(key), expected)
+            columnar = cache.get_columnar(key, self.disassembler.parsable_instructions)
+            assert columnar is not None
+            self.assertEqual(str(columnar), expected)
+            self.assertEqual(
+                list(columnar.offsets), list(self.disassembler.scan(binary))
+            )
+
+    def test_key_covers_schemas_and_renderer(self):
+        binary = self.binaries[0]
+        key = ResultCache(self.cache_dir).key(self.disassembler, binary)
+        self.assertEqual(
+            ResultCache(self.cache_dir).key(Disassembler.from_config(), binary), key
+        )
+        self.assertNotEqual(
+            ResultCache(self.cache_dir).key(self.disassembler, binary + b"\x00"), key
+        )
+        self.assertNotEqual(
+            ResultCache(self.cache_dir, renderer_version=-1).key(
+                self.disassembler, binary
+            ),
+            key,
+        )
+        fewer_schemas = Disassembler(self.disassembler.parsable_instructions[:-1])
+        self.assertNotEqual(ResultCache(self.cache_dir).key(fewer_schemas, binary), key)
+
+    def test_corrupt_entry_is_a_miss(self):
+        cache = ResultCache(self.cache_dir)
+        binary = self.binaries[0]
+        expected = str(self.disassembler.decode(binary))
+        key = cache.key(self.disassembler, binary)
+        cache.disassemble(self.disassembler, binary)
+        entry = cache._path(key).read_bytes()
+        for corrupt in (
+            entry[:5],
+            entry[:-3],
+            entry[:12] + b"\x00" * (len(entry) - 12),
+        ):
+            with self.subTest(size=len(corrupt)):
+                cache._path(key).write_bytes(corrupt)
+                self.assertIsNone(
+                    cache.get_columnar(key, self.disassembler.parsable_instructions)
+                )
+                self.assertFalse(cache._path(key).exists())
+                self.assertEqual(cache.disassemble(self.disassembler, binary), expected)
+                self.assertEqual(cache._path(key).read_bytes(), entry)
+
+    def test_evicts_least_recently_used(self):
+        cache = ResultCache(self.cache_dir)
+        keys = []
+        for i, binary in enumerate(self.binaries[:3]):
+            cache.disassemble(self.disassembler, binary)
+            keys.append(cache.key(self.disassembler, binary))
+            # mtimes can tie on coarse filesystems, make the access order explicit
+            os.utime(cache._path(keys[-1]), ns=(i, i))
+        cache.get_listing(keys[0])
+
+        cache.max_bytes = sum(cache._path(key).stat().st_size for key in keys[:2])
+        cache.evict()
+        self.assertIsNotNone(cache.get_listing(keys[0]))
+        self.assertIsNone(cache.get_listing(keys[1]))
+        self.assertIsNotNone(cache.get_listing(keys[2]))
+
+    def test_concurrent_workers(self):
+        def worker(binary: bytes) -> str:
+            return ResultCache(self.cache_dir).disassemble(self.disassembler, binary)
+
+        work = self.binaries * 8
+        with ThreadPoolExecutor(8) as pool:
+            listings = list(pool.map(worker, work))
+        for binary, listing in zip(work, listings):
+            self.assertEqual(listing, str(self.disassembler.decode(binary)))
+        self.assertEqual(list(self.cache_dir.glob("*/*.tmp")), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
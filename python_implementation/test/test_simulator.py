@@ -0,0 +1,122 @@
+import unittest
+from typing import override
+
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.simulator import Simulator
+
+ARITHMETIC = bytes(
+    [
+        *[0xBB, 0x03, 0xF0],  # mov bx, 61443
+        *[0xB9, 0x01, 0x0F],  # mov cx, 3841
+        *[0x29, 0xCB],  # sub bx, cx
+        *[0xBC, 0xE6, 0x03],  # mov sp, 998
+        *[0xBD, 0xE7, 0x03],  # mov bp, 999
+        *[0x39, 0xE5],  # cmp bp, sp
+        *[0x81, 0xC5, 0x03, 0x04],  # add bp, 1027
+        *[0x81, 0xED, 0xEA, 0x07],  # sub bp, 2026
+    ]
+)
+STORE_LOOP = bytes(
+    [
+        *[0xB9, 0x05, 0x00],  # mov cx, 5
+        *[0xBB, 0x00, 0x00],  # mov bx, 0
+        *[0x83, 0xC3, 0x0A],  # label_0: add bx, 10
+        *[0x89, 0x9F, 0xC8, 0x00],  # mov [bx + 200], bx, a 16 bit displacement
+        *[0xE2, 0xF7],  # loop label_0
+    ]
+)
+SELF_MODIFYING = bytes(
+    [
+        *[0xB9, 0x02, 0x00],  # mov cx, 2
+        *[0xB8, 0x01, 0x00],  # label_0: mov ax, 1
+        *[0xC6, 0x06, 0x04, 0x00, 0x09],  # mov [4], byte 9, the data of mov ax
+        *[0xE2, 0xF6],  # loop label_0
+    ]
+)
+
+
+class TestSimulator(unittest.TestCase):
+    @classmethod
+    @override
+    def setUpClass(cls) -> None:
+        cls.disassembler = Disassembler.from_config()
+
+    def run_program(self, program: bytes) -> Simulator:
+        simulator = Simulator(self.disassembler)
+        simulator.load(program)
+        simulator.run()
+        return simulator
+
+    def test_arithmetic_and_flags(self):
+        simulator = self.run_program(ARITHMETIC)
+        self.assertEqual(simulator.register("bx"), 0xE102)
+        self.assertEqual(simulator.register("cx"), 0x0F01)
+        self.assertEqual(simulator.register("sp"), 998)
+        self.assertEqual(simulator.register("bp"), 0)
+        self.assertEqual(simulator.flag_string(), "PZ")
+
+    def test_sign_extended_immediate(self):
+        simulator = self.run_program(bytes([0x83, 0xC5, 0xFE]))  # add bp, -2
+        self.assertEqual(simulator.register("bp"), 0xFFFE)
+        self.assertEqual(simulator.flag_string(), "S")
+
+    def test_loop_decodes_once(self):
+        simulator = self.run_program(STORE_LOOP)
+        self.assertEqual(simulator.register("bx"), 50)
+        self.assertEqual(simulator.register("cx"), 0)
+        for value in range(10, 51, 10):
+            address = 200 + value
+            self.assertEqual(simulator.memory[address : address + 2], bytes([value, 0]))
+        self.assertEqual(simulator.stats.instructions, 2 + 5 * 3)
+        self.assertEqual(simulator.stats.decodes, 5)
+        self.assertEqual(simulator.ip, len(STORE_LOOP))
+        self.assertGreater(simulator.stats.instructions_per_second, 0)
+
+    def test_stack_and_byte_registers(self):
+        simulator = self.run_program(
+            bytes(
+                [
+                    *[0xB4, 0x12],  # mov ah, 18
+                    *[0xB0, 0x34],  # mov al, 52
+                    *[0xBC, 0x00, 0x01],  # mov sp, 256
+                    0x50,  # push ax
+                    0x5A,  # pop dx
+                ]
+            )
+        )
+        self.assertEqual(simulator.register("ax"), 0x1234)
+        self.assertEqual(simulator.register("dx"), 0x1234)
+        self.assertEqual(simulator.register("sp"), 0x100)
+        self.assertEqual(simulator.memory[0xFE:0x100], bytes([0x34, 0x12]))
+
+    def test_push_sp_pushes_the_decremented_sp(self):
+        simulator = self.run_program(
+            bytes(
+                [
+                    *[0xBC, 0x00, 0x01],  # mov sp, 256
+                    0x54,  # push sp
+                    0x5B,  # pop bx
+                ]
+            )
+        )
+        self.assertEqual(simulator.register("bx"), 0xFE)
+        self.assertEqual(simulator.register("sp"), 0x100)
+
+    def test_write_to_code_invalidates(self):
+        simulator = self.run_program(SELF_MODIFYING)
+        self.assertEqual(simulator.register("ax"), 9)
+        self.assertEqual(simulator.stats.invalidations, 2)
+        self.assertEqual(simulator.stats.decodes, 5)
+
+    def test_code_segment(self):
+        simulator = Simulator(self.disassembler)
+        simulator.load(STORE_LOOP, code_segment=0x100)
+        simulator.run(max_instructions=3)
+        self.assertEqual(simulator.register("bx"), 10)
+        self.assertEqual(
+            simulator.memory[0x1000 : 0x1000 + len(STORE_LOOP)], STORE_LOOP
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from typing import override
+
+from python_implementation.src.compressed_io import read_file
+from python_implementation.src.disassembled import DisassembledInstruction
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.sinks import (
+    ListingSink,
+    NdjsonSink,
+    StatsSink,
+    run_pipeline,
+)
+from python_implementation.test.helpers import JUMPS_BIN, get_binaries, random_program
+
+
+class CountingSink:
+    def __init__(self) -> None:
+        self.writes = 0
+        self.closed = self.aborted = False
+
+    def write(self, offset: int, inst: DisassembledInstruction):
+        self.writes += 1
+
+    def close(self):
+        self.closed = True
+
+    def abort(self):
+        self.aborted = True
+
+
+class TestSinks(unittest.TestCase):
+    @classmethod
+    @override
+    def setUpClass(cls) -> None:
+        cls.disassembler = Disassembler.from_config()
+
+    @override
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.dir = Path(temp_dir.name)
+
+    def test_listing_matches_disassembly(self):
+        binaries = [*get_binaries(), random_program(self.disassembler, 8192, seed=7)]
+        for ind, binary in enumerate(binaries):
+            path = self.dir / f"{ind}.asm"
+            run_pipeline(self.disassembler.iter_decode(binary), [ListingSink(path)])
+            self.assertEqual(path.read_text(), str(self.disassembler.decode(binary)))
+
+    def test_one_decode_many_sinks(self):
+        input_path = self.dir / "jumps"
+        input_path.write_bytes(JUMPS_BIN)
+        counting, stats = CountingSink(), StatsSink(self.dir / "stats.json")
+        self.disassembler.decode_to_sinks(
+            input_path,
+            [
+                ListingSink(self.dir / "jumps.asm.gz"),
+                NdjsonSink(self.dir / "jumps.ndjson"),
+                stats,
+                counting,
+            ],
+        )
+        disassembly = self.disassembler.decode(JUMPS_BIN)
+        self.assertEqual(
+            read_file(self.dir / "jumps.asm.gz").decode(), str(disassembly)
+        )
+
+        records = [
+            json.loads(line)
+            for line in (self.dir / "jumps.ndjson").read_text().splitlines()
+        ]
+        self.assertEqual(len(records), len(disassembly.instructions))
+        self.assertEqual(sum(record["size"] for record in records), len(JUMPS_BIN))
+        self.assertEqual(
+            records[2],
+            {
+                "offset": 4,
+                "size": 2,
+                "mnemonic": "jne",
+                "operands": ["$+4"],
+                "target": 10,
+            },
+        )
+        self.assertEqual(records[3]["operands"], ["al", "[bx + si + 4999]"])
+
+        self.assertEqual(stats.stats.instructions, counting.writes)
+        self.assertEqual(stats.stats.bytes, len(JUMPS_BIN))
+        summary = json.loads((self.dir / "stats.json").read_text())
+        self.assertEqual(sum(summary["mnemonics"].values()), counting.writes)
+        self.assertTrue(counting.closed)
+
+    def test_failed_decode_aborts_every_sink(self):
+        counting = CountingSink()
+        with self.assertRaises(AssertionError):
+            run_pipeline(
+                self.disassembler.iter_decode(JUMPS_BIN[:7]),
+                [
+                    ListingSink(self.dir / "jumps.asm"),
+                    NdjsonSink(self.dir / "jumps.ndjson"),
+                    counting,
+                ],
+            )
+        self.assertTrue(counting.aborted)
+        self.assertFalse(counting.closed)
+        self.assertEqual(list(self.dir.iterdir()), [])
+
+    def test_failed_close_aborts_the_remaining_sinks(self):
+        class FailsToClose(CountingSink):
+            @override
+            def close(self):
+                raise OSError("disk full")
+
+        counting = CountingSink()
+        with self.assertRaises(OSError):
+            run_pipeline(
+                self.disassembler.iter_decode(JUMPS_BIN),
+                [
+                    NdjsonSink(self.dir / "first.ndjson"),
+                    FailsToClose(),
+                    NdjsonSink(self.dir / "last.ndjson"),
+                    counting,
+                ],
+            )
+        self.assertTrue(counting.aborted)
+        self.assertFalse(counting.closed)
+        self.assertEqual([path.name for path in self.dir.iterdir()], ["first.ndjson"])
+
+
+if __name__ == "__main__":
+    unittest.main()
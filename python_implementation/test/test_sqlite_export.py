@@ -0,0 +1,188 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from typing import override
+
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.sqlite_export import INDEXES, SqliteExporter
+from python_implementation.test.helpers import JUMPS_BIN, get_binaries, random_program
+
+
+class TestSqliteExport(unittest.TestCase):
+    @classmethod
+    @override
+    def setUpClass(cls) -> None:
+        cls.disassembler = Disassembler.from_config()
+        cls.program = random_program(cls.disassembler, 8192, seed=10)
+
+    @override
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.dir = Path(temp_dir.name)
+        self.path = self.dir / "disassembly.sqlite"
+
+    def query(self, sql: str, *params) -> list[tuple]:
+        connection = sqlite3.connect(self.path)
+        try:
+            return connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+
+    def test_export(self):
+        # a small batch size so every table is inserted in several batches
+        with SqliteExporter(self.path, self.disassembler, batch_size=7) as exporter:
+            self.assertTrue(exporter.add("program", self.program))
+        stats = exporter.stats
+        disassembly = self.disassembler.decode(self.program)
+
+        [(binary_id, count)] = self.query("SELECT id, instructions FROM binaries")
+        self.assertEqual(count, len(disassembly.instructions))
+        texts = self.query(
+            "SELECT text FROM instructions WHERE binary_id = ? ORDER BY offset",
+            binary_id,
+        )
+        self.assertEqual(
+            [text for (text,) in texts],
+            [
+                str(inst)
+                for inst in disassembly.instructions_with_labels
+                if not isinstance(inst, str)
+            ],
+        )
+        labels = self.query("SELECT name FROM labels ORDER BY offset")
+        self.assertEqual(
+            [name + ":" for (name,) in labels],
+            [
+                inst
+                for inst in disassembly.instructions_with_labels
+                if isinstance(inst, str)
+            ],
+        )
+        rows = sum(
+            self.query(f"SELECT count(*) FROM {table}")[0][0]
+            for table in ["binaries", "instructions", "labels", "jumps"]
+        )
+        self.assertEqual(stats.rows, rows)
+        self.assertGreater(stats.rows_per_second, 0)
+        self.assertIn("rows/s", str(stats))
+
+    def test_jumps(self):
+        with SqliteExporter(self.path, self.disassembler) as exporter:
+            exporter.add("jumps", JUMPS_BIN)
+        self.assertEqual(
+            self.query(
+                "SELECT source, target, mnemonic, label FROM jumps ORDER BY source"
+            ),
+            [
+                (0, 0, "jne", "label_0"),
+                (4, 10, "jne", "label_2"),
+                (10, 2, "jne", "label_1"),
+            ],
+        )
+        self.assertEqual(
+            self.query("SELECT offset, name FROM labels ORDER BY offset"),
+            [(0, "label_0"), (2, "label_1"), (10, "label_2")],
+        )
+        # the jumps landing on an instruction, found through the indexes
+        self.assertEqual(
+            self.query(
+                "SELECT jumps.source, instructions.text FROM jumps "
+                "JOIN instructions ON instructions.binary_id = jumps.binary_id "
+                "AND instructions.offset = jumps.target ORDER BY jumps.source"
+            ),
+            [(0, "jne label_0"), (4, "jne label_1"), (10, "mov cx, bx")],
+        )
+
+    def test_config_hash_of_the_decoding_schemas(self):
+        disassembler = Disassembler(
+            list(reversed(self.disassembler.parsable_instructions))
+        )
+        with SqliteExporter(self.path, disassembler) as exporter:
+            exporter.add("jumps", JUMPS_BIN)
+        self.assertEqual(
+            self.query("SELECT config_hash FROM binaries"),
+            [(disassembler.schemas_hash,)],
+        )
+        self.assertNotEqual(disassembler.schemas_hash, self.disassembler.schemas_hash)
+
+    def index_names(self) -> list[str]:
+        return sorted(
+            name
+            for (name,) in self.query(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND name NOT LIKE 'sqlite_%'"
+            )
+        )
+
+    def test_indexes_only_rebuilt_for_large_loads(self):
+        with SqliteExporter(self.path, self.disassembler) as exporter:
+            exporter.add("program", self.program)
+        self.assertGreater(exporter.stats.index_seconds, 0)
+
+        # a small append keeps the indexes up to date as it goes
+        with SqliteExporter(self.path, self.disassembler) as exporter:
+            exporter.add("jumps", JUMPS_BIN)
+            self.assertFalse(exporter.indexes_deferred)
+        self.assertEqual(exporter.stats.index_seconds, 0)
+        self.assertEqual(self.index_names(), sorted(INDEXES))
+
+        # one as big as the database drops them and builds them again
+        with SqliteExporter(self.path, self.disassembler) as exporter:
+            exporter.add("other", random_program(self.disassembler, 8192, seed=11))
+            self.assertTrue(exporter.indexes_deferred)
+        self.assertGreater(exporter.stats.index_seconds, 0)
+        self.assertEqual(self.index_names(), sorted(INDEXES))
+
+    def test_abort_restores_dropped_indexes(self):
+        with SqliteExporter(self.path, self.disassembler) as exporter:
+            exporter.add("program", self.program)
+        with self.assertRaises(AssertionError):
+            # rows_per_transaction=1 commits the dropped indexes with the first binary
+            with SqliteExporter(
+                self.path, self.disassembler, rows_per_transaction=1
+            ) as exporter:
+                exporter.add("other", random_program(self.disassembler, 8192, seed=11))
+                exporter.add("truncated", JUMPS_BIN[:7])
+        self.assertEqual(
+            self.query("SELECT name FROM binaries ORDER BY id"),
+            [("program",), ("other",)],
+        )
+        self.assertEqual(self.index_names(), sorted(INDEXES))
+
+    def test_incremental_append(self):
+        binaries = get_binaries()
+        with SqliteExporter(self.path, self.disassembler) as exporter:
+            exporter.add("program", self.program)
+        # rows_per_transaction=1 commits after every binary
+        with SqliteExporter(
+            self.path, self.disassembler, rows_per_transaction=1
+        ) as exporter:
+            self.assertFalse(exporter.add("again", self.program))
+            for ind, binary in enumerate(binaries):
+                exporter.add(f"binary_{ind}", binary)
+        self.assertEqual(exporter.stats.skipped, 1)
+        names = [
+            name for (name,) in self.query("SELECT name FROM binaries ORDER BY id")
+        ]
+        self.assertEqual(len(names), 1 + len(set(binaries) - {self.program}))
+        self.assertEqual(names[0], "program")
+        self.assertEqual(self.index_names(), sorted(INDEXES))
+        self.assertEqual(self.query("PRAGMA journal_mode"), [("wal",)])
+
+    def test_failed_binary_is_rolled_back(self):
+        with SqliteExporter(self.path, self.disassembler) as exporter:
+            exporter.add("program", self.program)
+        with self.assertRaises(AssertionError):
+            with SqliteExporter(self.path, self.disassembler) as exporter:
+                exporter.add("jumps", JUMPS_BIN)
+                exporter.add("truncated", JUMPS_BIN[:7])
+        self.assertEqual(self.query("SELECT name FROM binaries"), [("program",)])
+        self.assertEqual(
+            self.query("SELECT count(*) FROM instructions"),
+            [(len(self.disassembler.decode(self.program).instructions),)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import gzip
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from typing import override
+
+from python_implementation.src.compressed_io import read_file
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.staged import STAGES, StagedPipeline
+from python_implementation.test.helpers import JUMPS_BIN, get_binaries, random_program
+
+
+class SlowWriter(StagedPipeline):
+    """Writes slowly and remembers how many listings were waiting at most"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.max_waiting = 0
+        self.waiting_lock = threading.Lock()
+
+    def _write(self, job, lines):
+        with self.waiting_lock:
+            self.max_waiting = max(self.max_waiting, self._queues[-1].qsize())
+        time.sleep(0.01)
+        return super()._write(job, lines)
+
+
+class TestStagedPipeline(unittest.TestCase):
+    @classmethod
+    @override
+    def setUpClass(cls) -> None:
+        cls.disassembler = Disassembler.from_config()
+
+    @override
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.input_dir = Path(temp_dir.name) / "in"
+        self.output_dir = Path(temp_dir.name) / "out"
+        self.input_dir.mkdir()
+        binaries = [*get_binaries(), random_program(self.disassembler, 8192, seed=8)]
+        self.input_paths = []
+        for ind, binary in enumerate(binaries):
+            self.input_paths.append(self.input_dir / f"binary_{ind}")
+            self.input_paths[-1].write_bytes(binary)
+
+    def assert_outputs(self, suffix: str = ".asm"):
+        for path in self.input_paths:
+            self.assertEqual(
+                read_file(self.output_dir / (path.name + suffix)).decode(),
+                str(self.disassembler.decode(path.read_bytes())),
+            )
+
+    def test_outputs_and_metrics(self):
+        pipeline = StagedPipeline(
+            self.disassembler,
+            self.output_dir,
+            output_suffix=".asm.gz",
+            workers={"decode": 3, "render": 2},
+            chunk_size=1024,
+        )
+        report = pipeline.run(self.input_paths)
+        self.assert_outputs(".asm.gz")
+        self.assertEqual(report.errors, [])
+        self.assertEqual([stage.name for stage in report.stages], list(STAGES))
+        self.assertEqual([stage.workers for stage in report.stages], [1, 3, 2, 1])
+        read, decode, render, write = report.stages
+        self.assertEqual(read.items, len(self.input_paths))
+        # the big binary is decoded in several pieces
+        self.assertGreater(decode.items, len(self.input_paths))
+        self.assertEqual(render.items, decode.items)
+        self.assertEqual(write.items, len(self.input_paths))
+        for stage in report.stages:
+            self.assertTrue(0 < stage.utilization(report.wall_seconds) <= 1)
+        self.assertIn(f"bottleneck: {report.bottleneck.name}", str(report))
+
+    def test_failed_files_are_reported(self):
+        self.input_paths.append(self.input_dir / "truncated")
+        self.input_paths[-1].write_bytes(JUMPS_BIN[:7])
+        missing = self.input_dir / "missing"
+        report = StagedPipeline(self.disassembler, self.output_dir).run(
+            self.input_paths + [missing]
+        )
+        self.assertEqual(
+            sorted(path.name for path, _ in report.errors), ["missing", "truncated"]
+        )
+        self.input_paths.pop()
+        self.assert_outputs()
+        self.assertFalse((self.output_dir / "truncated.asm").exists())
+
+    def test_backpressure(self):
+        self.input_paths *= 4
+        pipeline = SlowWriter(self.disassembler, self.output_dir, queue_size=2)
+        report = pipeline.run(self.input_paths)
+        self.assertLessEqual(pipeline.max_waiting, 2)
+        render = report.stages[STAGES.index("render")]
+        self.assertGreater(render.blocked_seconds, 0)
+        self.assertEqual(report.bottleneck.name, "write")
+
+    def test_same_name_in_different_directories(self):
+        other_dir = self.input_dir / "other"
+        other_dir.mkdir()
+        other_path = other_dir / self.input_paths[0].name
+        other_path.write_bytes(self.input_paths[1].read_bytes())
+        report = StagedPipeline(self.disassembler, self.output_dir).run(
+            [self.input_paths[0], other_path]
+        )
+        self.assertEqual(report.errors, [])
+        for path, output_path in [
+            (
+                self.input_paths[0],
+                self.output_dir / (self.input_paths[0].name + ".asm"),
+            ),
+            (other_path, self.output_dir / "other" / (other_path.name + ".asm")),
+        ]:
+            self.assertEqual(
+                output_path.read_text(),
+                str(self.disassembler.decode(path.read_bytes())),
+            )
+
+    def test_inputs_sharing_an_output_are_rejected(self):
+        compressed_path = self.input_dir / (self.input_paths[0].name + ".gz")
+        compressed_path.write_bytes(gzip.compress(self.input_paths[1].read_bytes()))
+        with self.assertRaises(ValueError):
+            StagedPipeline(self.disassembler, self.output_dir).run(
+                [self.input_paths[0], compressed_path]
+            )
+        self.assertFalse(self.output_dir.exists())
+
+    def test_unknown_stage(self):
+        with self.assertRaises(ValueError):
+            StagedPipeline(self.disassembler, self.output_dir, workers={"parse": 2})
+
+    def test_stage_without_workers(self):
+        with self.assertRaises(ValueError):
+            StagedPipeline(self.disassembler, self.output_dir, workers={"decode": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
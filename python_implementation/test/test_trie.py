@@ -322,3 +322,35 @@ class TestTrie(unittest.TestCase):
                 ),
             ]
         )
+
+    def test_frozen_after_build(self):
+        trie = Trie.from_parsable_instructions(
+            [InstructionSchema("move", LiteralField(0b101, 3), [NamedField.D], {})]
+        )
+        with self.assertRaises(TypeError):
+            trie.dummy_head.insert(
+                BitModeSchemaIterator(
+                    InstructionSchema("move", LiteralField(0b100, 3), [], {})
+                )
+            )
+
+    def test_rejected_insert_leaves_leaf_untouched(self):
+        trie = Trie.from_parsable_instructions(
+            [InstructionSchema("move", LiteralField(0b101, 3), [NamedField.D], {})]
+        )
+        leaf = trie.dummy_head
+        while leaf.coil is None:
+            leaf = next(child for child in leaf.children if child is not None)
+        coil, leaf_plan = leaf.coil, leaf.leaf
+        rest_of_coil = list(leaf.get_rest_of_coil())
+        inst = BitModeSchemaIterator(
+            InstructionSchema("move", LiteralField(0b1011, 4), [], {})
+        )
+        with self.assertRaises(TypeError):
+            leaf.insert(inst)
+        self.assertIs(leaf.coil, coil)
+        self.assertEqual(list(leaf.get_rest_of_coil()), rest_of_coil)
+        self.assertIs(leaf.leaf, leaf_plan)
+        self.assertEqual(leaf.children, (None, None, None))
+        # the rejected instruction was not consumed either
+        self.assertEqual(next(inst), True)
@@ -0,0 +1,107 @@
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from pathlib import Path
+
+from python_implementation.src.disassembled import DisassembledJumpInstruction
+from python_implementation.src.disassembler import Disassembler
+from python_implementation.src.xref import Xref, XrefIndex
+from python_implementation.test.helpers import JUMPS_BIN, random_program
+
+
+class TestXrefIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.disassembler = Disassembler.from_config()
+
+    def test_jumps_bin(self):
+        index = self.disassembler.xrefs(JUMPS_BIN)
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.jumps_to(0), [Xref(0, 0, "jne")])
+        self.assertEqual(index.jumps_to(10), [Xref(4, 10, "jne")])
+        self.assertEqual(index.jumps_to(4), [])
+        self.assertEqual(
+            index.jumps_into(1, 11), [Xref(10, 2, "jne"), Xref(4, 10, "jne")]
+        )
+        self.assertEqual(index.jump_target(4), 10)
+        self.assertIsNone(index.jump_target(2))
+
+    def test_matches_scan_of_disassembly(self):
+        program = random_program(self.disassembler, 4096, seed=3)
+        index = self.disassembler.xrefs(program)
+        expected = []
+        offset = 0
+        for inst in self.disassembler.decode(program).instructions:
+            if isinstance(inst, DisassembledJumpInstruction):
+                expected.append(
+                    Xref(offset, inst.get_abs_label_offset(offset), inst.mnemonic)
+                )
+            offset += inst.inst_size
+        found = [
+            xref for target in set(index.targets) for xref in index.jumps_to(target)
+        ]
+        self.assertCountEqual(found, expected)
+        for xref in expected:
+            self.assertEqual(index.jump_target(xref.source), xref.target)
+
+    def test_stored_next_to_binary(self):
+        schemas_hash = self.disassembler.schemas_hash
+        with tempfile.TemporaryDirectory() as temp_dir:
+            binary_path = Path(temp_dir) / "jumps"
+            binary_path.write_bytes(JUMPS_BIN)
+            built = self.disassembler.xrefs_for_file(binary_path)
+            self.assertTrue(XrefIndex.path_for(binary_path).exists())
+
+            loaded = XrefIndex.load(binary_path, JUMPS_BIN, schemas_hash)
+            assert loaded is not None
+            self.assertEqual(loaded.jumps_to(0), built.jumps_to(0))
+            self.assertEqual(loaded.jump_target(4), 10)
+
+            # a rebuilt binary makes the stored index stale
+            binary_path.write_bytes(JUMPS_BIN[:-2])
+            self.assertIsNone(XrefIndex.load(binary_path, JUMPS_BIN[:-2], schemas_hash))
+            self.assertEqual(len(self.disassembler.xrefs_for_file(binary_path)), 2)
+
+    def test_stale_for_other_schemas(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            binary_path = Path(temp_dir) / "jumps"
+            binary_path.write_bytes(JUMPS_BIN)
+            self.disassembler.xrefs_for_file(binary_path)
+            other = Disassembler(self.disassembler.parsable_instructions[::-1])
+            self.assertIsNone(
+                XrefIndex.load(binary_path, JUMPS_BIN, other.schemas_hash)
+            )
+            self.assertEqual(len(other.xrefs_for_file(binary_path)), 3)
+            self.assertIsNotNone(
+                XrefIndex.load(binary_path, JUMPS_BIN, other.schemas_hash)
+            )
+
+    def test_truncated_index_is_rebuilt(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            binary_path = Path(temp_dir) / "jumps"
+            binary_path.write_bytes(JUMPS_BIN)
+            self.disassembler.xrefs_for_file(binary_path)
+            index_path = XrefIndex.path_for(binary_path)
+            saved = index_path.read_bytes()
+            for size in (0, 10, len(saved) - 30, len(saved) - 1):
+                with self.subTest(size=size):
+                    index_path.write_bytes(saved[:size])
+                    index = self.disassembler.xrefs_for_file(binary_path)
+                    self.assertEqual(index.jump_target(4), 10)
+                    self.assertEqual(index_path.read_bytes(), saved)
+
+    def test_built_from_the_callers_decode(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            binary_path = Path(temp_dir) / "jumps"
+            binary_path.write_bytes(JUMPS_BIN)
+            columnar = self.disassembler.decode_columnar(JUMPS_BIN)
+            with mock.patch.object(
+                self.disassembler, "decode_columnar", side_effect=AssertionError
+            ):
+                index = self.disassembler.xrefs_for_file(binary_path, columnar)
+            self.assertEqual(index.jumps_to(10), [Xref(4, 10, "jne")])
+
+
+if __name__ == "__main__":
+    unittest.main()